@@ -1,17 +1,30 @@
 import logging
 from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
 from datetime import datetime, timedelta
 from app.models.models import StockRequest, DemandZone, MultiStockRequest
-from app.services.services import fetch_stock_data, identify_demand_zones, identify_ltf_zones
+from app.services.services import identify_demand_zones, identify_ltf_zones, earliest_available_date
 from app.services.zone_service import get_all_zones, get_zones_by_ticker, save_unique_zones
 from typing import List, Dict, Optional
 from dateutil import parser
 import json
 from app.utils.ticker_loader import load_tickers_from_json
+from app.utils.trading_calendar import trading_calendar
 import pandas as pd
 import asyncio
+import time
 from concurrent.futures import ThreadPoolExecutor
-from app.models.models import GetZonesRequest
+from app.models.models import GetZonesRequest, ConfluenceRequest, NearPriceRequest, MergeZonesRequest
+from app.services.zone_index import zone_index, normalize_ticker
+from app.services.tick_service import tick_service, TICK_MAX_AGE
+from app.services.confluence_service import build_confluence
+from app.services.candle_service import get_candles
+from app.services.indicator_service import apply_indicator_filters
+from app.services.zone_merge_service import merge_zones
+from app.services.lower_zone_service import get_lower_zones
+from app.services.export_service import export_zones, export_headers, zone_export_query, parquet_available
+from app.utils.metrics import stage, observe_stage
+from app.models.zone_table import ZoneTable
 
 logger = logging.getLogger(__name__)
 
@@ -20,12 +33,12 @@ async def find_demand_zones_controller(request: StockRequest) -> List[Dict]:
         if not request.start_date:
             request.start_date = (datetime.now().date() - timedelta(days=365))
         if not request.end_date:
-            request.end_date = datetime.now().date()
+            request.end_date = trading_calendar.default_end_date()
 
         logger.info(f"Processing {request.ticker} from {request.start_date} to {request.end_date}, "
                    f"higher interval: {request.higher_interval}, lower interval: {request.lower_interval}")
 
-        higher_data = fetch_stock_data(
+        higher_data = get_candles(
             request.ticker,
             request.start_date,
             request.end_date,
@@ -35,22 +48,36 @@ async def find_demand_zones_controller(request: StockRequest) -> List[Dict]:
             logger.warning(f"No data found for {request.ticker}, skipping.")
             return []
 
-        higher_zones = await identify_demand_zones(
-            data=higher_data,
-            ticker=request.ticker,
-            time_frame=request.higher_interval,
-            legin_min_body_percent=request.leginMinBodyPercent,
-            legout_min_body_percent=request.legoutMinBodyPercent,
-            base_max_body_percent=request.baseMaxBodyPercent,
-            min_base_candles=request.minBaseCandles,
-            max_base_candles=request.maxBaseCandles,
-            min_legout_movement=request.minLegoutMovement,
-            min_legin_movement=request.minLeginMovement
-        )
+        # Includes the freshness checks it awaits, which are also timed on their own
+        with stage("detection", request.higher_interval, items=len(higher_data)):
+            higher_zones = await identify_demand_zones(
+                data=higher_data,
+                ticker=request.ticker,
+                time_frame=request.higher_interval,
+                legin_min_body_percent=request.leginMinBodyPercent,
+                legout_min_body_percent=request.legoutMinBodyPercent,
+                base_max_body_percent=request.baseMaxBodyPercent,
+                min_base_candles=request.minBaseCandles,
+                max_base_candles=request.maxBaseCandles,
+                min_legout_movement=request.minLegoutMovement,
+                min_legin_movement=request.minLeginMovement
+            )
         logger.info(f"Found {len(higher_zones)} higher timeframe zones.")
 
+        if request.emaFilterPeriod or request.minLegoutAtrMultiple:
+            higher_zones = apply_indicator_filters(
+                higher_zones,
+                higher_data,
+                request.ticker,
+                request.higher_interval,
+                ema_period=request.emaFilterPeriod,
+                min_legout_atr_multiple=request.minLegoutAtrMultiple,
+                atr_period=request.atrPeriod
+            )
+
         # Map lower timeframe zones under corresponding higher timeframe zones
         if request.detectLowerZones:
+            ltf_started = time.perf_counter()
             for h_zone in higher_zones:
                 h_zone["timestamp"] = h_zone["start_timestamp"]
                 h_zone["coinciding_lower_zones"] = []
@@ -69,7 +96,7 @@ async def find_demand_zones_controller(request: StockRequest) -> List[Dict]:
                     logger.info(f"Fetching lower timeframe data from {start_date} to {end_date} "
                                f"for higher zone {h_zone['start_timestamp']}")
 
-                    lt_data = fetch_stock_data(
+                    lt_data = get_candles(
                         request.ticker,
                         start_date,
                         end_date,
@@ -96,11 +123,13 @@ async def find_demand_zones_controller(request: StockRequest) -> List[Dict]:
                     logger.error(f"Error processing lower timeframe zones for higher zone "
                                 f"{h_zone['start_timestamp']}: {str(e)}")
                     continue
+            observe_stage("ltf_mapping", time.perf_counter() - ltf_started, request.lower_interval, len(higher_zones))
         else:
             logger.info("Skipped lower timeframe demand zone detection as per request.")
 
         logger.info("Mapped lower timeframe zones under higher timeframe zones.")
-        higher_zone_models = [DemandZone(**zone) for zone in higher_zones]
+        with stage("serialization", request.higher_interval, items=len(higher_zones)):
+            higher_zone_models = [DemandZone(**zone) for zone in higher_zones]
 
         return higher_zone_models
 
@@ -110,6 +139,94 @@ async def find_demand_zones_controller(request: StockRequest) -> List[Dict]:
         logger.error(f"Unexpected error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
 
+async def find_confluence_zones_controller(request: ConfluenceRequest) -> List[DemandZone]:
+    """
+    Detect zones on every timeframe in `request.timeframes` and nest each level
+    under the one above it (e.g. 1wk -> 1d -> 1h -> 15m).
+
+    Every level is fetched once for the whole date range and joined with the
+    confluence sort-merge, instead of re-fetching lower timeframe data per zone.
+    """
+    try:
+        if not request.start_date:
+            request.start_date = (datetime.now().date() - timedelta(days=365))
+        if not request.end_date:
+            request.end_date = trading_calendar.default_end_date()
+
+        logger.info(f"Processing confluence for {request.ticker} from {request.start_date} to {request.end_date}, "
+                   f"timeframes: {request.timeframes}")
+
+        zones_by_timeframe = {}
+        for level, interval in enumerate(request.timeframes):
+            start_date = request.start_date
+            earliest = earliest_available_date(interval)
+            if earliest and start_date < earliest:
+                # The provider only keeps recent intraday history; ask for what it has
+                if earliest >= request.end_date:
+                    logger.warning(f"{interval} history starts {earliest}, after the requested range; "
+                                   f"skipping level for {request.ticker}.")
+                    zones_by_timeframe[interval] = []
+                    continue
+                logger.warning(f"{interval} history starts {earliest}; {interval} level of {request.ticker} "
+                               f"covers {earliest} to {request.end_date} instead of from {start_date}.")
+                start_date = earliest
+            data = get_candles(request.ticker, start_date, request.end_date, interval)
+            if data is None:
+                logger.warning(f"No {interval} data found for {request.ticker}, skipping level.")
+                zones_by_timeframe[interval] = []
+                continue
+
+            if level == 0:
+                zones = await identify_demand_zones(
+                    data=data,
+                    ticker=request.ticker,
+                    time_frame=interval,
+                    legin_min_body_percent=request.leginMinBodyPercent,
+                    legout_min_body_percent=request.legoutMinBodyPercent,
+                    base_max_body_percent=request.baseMaxBodyPercent,
+                    min_base_candles=request.minBaseCandles,
+                    max_base_candles=request.maxBaseCandles,
+                    min_legout_movement=request.minLegoutMovement,
+                    min_legin_movement=request.minLeginMovement
+                )
+                zones = apply_indicator_filters(
+                    zones,
+                    data,
+                    request.ticker,
+                    interval,
+                    ema_period=request.emaFilterPeriod,
+                    min_legout_atr_multiple=request.minLegoutAtrMultiple,
+                    atr_period=request.atrPeriod
+                )
+            else:
+                zones = await identify_ltf_zones(
+                    data=data,
+                    ticker=request.ticker,
+                    time_frame=interval,
+                    legin_min_body_percent=request.ltf_leginMinBodyPercent,
+                    legout_min_body_percent=request.ltf_legoutMinBodyPercent,
+                    base_max_body_percent=request.ltf_baseMaxBodyPercent,
+                    min_base_candles=request.minBaseCandles,
+                    max_base_candles=request.maxBaseCandles,
+                    min_legout_movement=request.ltf_minLegoutMovement,
+                    min_legin_movement=request.ltf_minLeginMovement
+                )
+            logger.info(f"Found {len(zones)} {interval} zones.")
+            zones_by_timeframe[interval] = zones
+
+        top_zones = build_confluence(zones_by_timeframe, request.timeframes)
+        for zone in top_zones:
+            zone["ticker"] = request.ticker
+            zone["timeframes"] = list(request.timeframes)
+
+        return [DemandZone(**zone) for zone in top_zones]
+
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        logger.error(f"Unexpected error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
+
 async def health_check_controller():
     return {"status": "healthy", "timestamp": datetime.utcnow().isoformat()}
 
@@ -125,7 +242,9 @@ async def find_multi_demand_zones_controller(request: MultiStockRequest) -> Dict
         tickers = load_tickers_from_json("data/tickers.json")
         logger.info(f"Loaded {len(tickers)} tickers")
 
-        all_results = {}
+        # Each ticker's zones, lower zones included, are held as columns until the response
+        all_results: Dict[str, ZoneTable] = {}
+        vocab = ZoneTable.empty_vocab()
         max_concurrent_tasks = 50  # Adjust based on system resources and API rate limits
 
         async def process_ticker(ticker: str) -> tuple:
@@ -150,6 +269,9 @@ async def find_multi_demand_zones_controller(request: MultiStockRequest) -> Dict
                     minBaseCandles=request.minBaseCandles,
                     maxBaseCandles=request.maxBaseCandles,
                     detectLowerZones=request.detectLowerZones,
+                    emaFilterPeriod=request.emaFilterPeriod,
+                    minLegoutAtrMultiple=request.minLegoutAtrMultiple,
+                    atrPeriod=request.atrPeriod,
                 )
                 result = await find_demand_zones_controller(stock_request)
                 return ticker, result
@@ -170,12 +292,14 @@ async def find_multi_demand_zones_controller(request: MultiStockRequest) -> Dict
                 results = await asyncio.gather(*chunk, return_exceptions=True)
                 for ticker, result in results:
                     if not isinstance(result, Exception):
-                        all_results[ticker] = result
+                        all_results[ticker] = ZoneTable.from_dicts([zone.model_dump() for zone in result], vocab)
 
-        # Save unique zones to MongoDB using the service
-        await save_unique_zones(all_results)
+        # Save unique zones to MongoDB using the service, one zone model at a time
+        await save_unique_zones({
+            ticker: (DemandZone(**zone) for zone in table.iter_dicts()) for ticker, table in all_results.items()
+        })
         logger.info(f"Completed processing for {len(all_results)} tickers")
-        return all_results
+        return {ticker: table.to_dicts() for ticker, table in all_results.items()}
 
     except Exception as e:
         logger.error(f"Error processing multi ticker demand zones: {str(e)}")
@@ -196,7 +320,8 @@ async def get_demand_zones_controller(request: GetZonesRequest) -> Dict[str, Lis
         zones_by_ticker = await get_zones_by_ticker(
             tickers=request.tickers,
             start_date=request.start_date,
-            end_date=request.end_date
+            end_date=request.end_date,
+            include_lower_zones=request.include_lower_zones
         )
         return zones_by_ticker
     except Exception as e:
@@ -211,7 +336,9 @@ async def get_all_zones_controller(
     sort_order: int = -1,
     ticker: Optional[str] = None,
     pattern: Optional[str] = None,
-    timeframe: Optional[str] = None
+    timeframe: Optional[str] = None,
+    include_merged: bool = False,
+    include_lower_zones: bool = False
 ) -> Dict:
     try:
         return await get_all_zones(
@@ -221,7 +348,9 @@ async def get_all_zones_controller(
             sort_order=sort_order,
 ticker=ticker,
             pattern=pattern,
-            timeframe=timeframe
+            timeframe=timeframe,
+            include_merged=include_merged,
+            include_lower_zones=include_lower_zones
         )
     except Exception as e:
         logger.error(f"Error retrieving all zones: {str(e)}")
@@ -249,3 +378,108 @@ async def delete_zone_controller(zone_id: str) -> dict:
         if isinstance(e, HTTPException):
             raise e
         raise HTTPException(status_code=500, detail=f"Error deleting zone: {str(e)}")
+
+
+async def get_zones_near_price_controller(request: NearPriceRequest) -> Dict:
+    """
+    Find active zones containing, or within `within_percent` of, each given price.
+
+    Args:
+        request: NearPriceRequest with a batch of (ticker, price) pairs.
+
+    Returns:
+        Dictionary with the matching zones per ticker and the lookup time in ms.
+    """
+    try:
+        started = time.perf_counter()
+        results = {}
+        for item in request.items:
+            price = item.price
+            if price is None:
+                live = tick_service.table.get(normalize_ticker(item.ticker), max_age=TICK_MAX_AGE)
+                if not live:
+                    results[item.ticker] = []
+                    continue
+                price = live["ltp"]
+            results[item.ticker] = zone_index.query(
+                item.ticker,
+                price,
+                within_percent=request.within_percent,
+                include_breached=request.include_breached
+            )
+        took_ms = (time.perf_counter() - started) * 1000
+        logger.info(f"Near-price lookup for {len(request.items)} tickers took {took_ms:.2f} ms")
+        return {"results": results, "took_ms": round(took_ms, 3)}
+    except Exception as e:
+        logger.error(f"Error in near-price lookup: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
+
+
+async def merge_zones_controller(request: MergeZonesRequest) -> Dict:
+    """
+    Fold zones covering nearly the same price band into one canonical zone.
+
+    Args:
+        request: MergeZonesRequest with optional tickers, overlap ratio,
+                 delete_duplicates and dry_run flags.
+
+    Returns:
+        Dictionary with merge counts, a sample of the merges and timings.
+    """
+    if not 0 < request.min_overlap <= 1:
+        raise HTTPException(status_code=400, detail="min_overlap must be in (0, 1]")
+    try:
+        return await merge_zones(
+            tickers=request.tickers,
+            min_overlap=request.min_overlap,
+            delete_duplicates=request.delete_duplicates,
+            dry_run=request.dry_run
+        )
+    except Exception as e:
+        logger.error(f"Error merging zones: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
+
+
+async def get_lower_zones_controller(
+    parent_zone_id: Optional[str] = None,
+    ticker: Optional[str] = None,
+    timeframe: Optional[str] = None,
+    page: int = 1,
+    limit: int = 50
+) -> Dict:
+    if page < 1 or limit < 1:
+        raise HTTPException(status_code=400, detail="page and limit must be positive")
+    try:
+        return await get_lower_zones(
+            parent_zone_id=parent_zone_id,
+            ticker=ticker,
+            timeframe=timeframe,
+            page=page,
+            limit=limit
+        )
+    except Exception as e:
+        logger.error(f"Error retrieving lower zones: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
+
+
+def export_zones_controller(
+    fmt: str = "csv",
+    tickers: Optional[List[str]] = None,
+    timeframe: Optional[str] = None,
+    pattern: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    include_merged: bool = False
+) -> StreamingResponse:
+    """
+    Stream the zones matching the filters as CSV or Parquet, batch by batch
+    from one cursor, so neither the zones nor the file are held in memory.
+    """
+    if fmt == "parquet" and not parquet_available():
+        raise HTTPException(status_code=501, detail="Parquet export needs pyarrow; install it or use format=csv")
+    try:
+        query = zone_export_query(tickers, timeframe, pattern, start_date, end_date, include_merged)
+    except (ValueError, OverflowError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid date format: {str(e)}")
+    media_type, headers = export_headers("zones", fmt)
+    return StreamingResponse(export_zones(query, fmt), media_type=media_type, headers=headers)
@@ -1,8 +1,10 @@
 import logging
+from bisect import bisect_left
 from fastapi import HTTPException
 from datetime import datetime, timedelta
 from app.models.models import StockRequest, DemandZone
 from app.services.services import fetch_stock_data, identify_demand_zones
+from app.utils.trading_calendar import trading_calendar
 from typing import List, Dict
 
 
@@ -13,13 +15,15 @@ async def find_demand_zones_controller(request: StockRequest) -> List[Dict]:
         if not request.start_date:
             request.start_date = (datetime.now().date() - timedelta(days=365))
         if not request.end_date:
-            request.end_date = datetime.now().date()
+            request.end_date = trading_calendar.default_end_date()
 
         logger.info(f"Processing {request.ticker} from {request.start_date} to {request.end_date}, higher interval: {request.higher_interval}, lower interval: {request.lower_interval}")
 
         higher_data = fetch_stock_data(request.ticker, request.start_date, request.end_date, request.higher_interval)
-        higher_zones = identify_demand_zones(
+        higher_zones = await identify_demand_zones(
             higher_data,
+            ticker=request.ticker,
+            time_frame=request.higher_interval,
             legin_min_body_percent=request.leginMinBodyPercent,
             legout_min_body_percent=request.legoutMinBodyPercent,
             base_max_body_percent=request.baseMaxBodyPercent,
@@ -29,8 +33,10 @@ async def find_demand_zones_controller(request: StockRequest) -> List[Dict]:
         logger.info(f"Found {len(higher_zones)} higher timeframe zones.")
 
         lower_data = fetch_stock_data(request.ticker, request.start_date, request.end_date, request.lower_interval)
-        lower_zones = identify_demand_zones(
+        lower_zones = await identify_demand_zones(
             lower_data,
+            ticker=request.ticker,
+            time_frame=request.lower_interval,
             legin_min_body_percent=request.leginMinBodyPercent,
             legout_min_body_percent=request.legoutMinBodyPercent,
             base_max_body_percent=request.baseMaxBodyPercent,
@@ -39,19 +45,19 @@ async def find_demand_zones_controller(request: StockRequest) -> List[Dict]:
         )
         logger.info(f"Found {len(lower_zones)} lower timeframe zones.")
 
-        # Map lower timeframe zones under corresponding higher timeframe zones
+        # Map lower timeframe zones under corresponding higher timeframe zones: every lower
+        # zone whose band fits inside the higher zone's band, at any time, in detection order
+        for l_zone in lower_zones:
+            l_zone["timestamp"] = l_zone["start_timestamp"]
+        by_distal = sorted(range(len(lower_zones)), key=lambda k: lower_zones[k]["distal_line"])
+        distals = [lower_zones[k]["distal_line"] for k in by_distal]
         for h_zone in higher_zones:
-            # logger.info(f"Processing higher zone: {h_zone}")
             h_zone["timestamp"] = h_zone["start_timestamp"]  # Ensure 'timestamp' exists
-            h_zone["coinciding_lower_zones"] = []
-
-            for l_zone in lower_zones:
-                if (
-                    l_zone["proximal_line"] <= h_zone["proximal_line"]
-                    and l_zone["distal_line"] >= h_zone["distal_line"]
-                ):
-                    l_zone["timestamp"] = l_zone["start_timestamp"]
-                    h_zone["coinciding_lower_zones"].append(l_zone)
+            inside = [
+                k for k in by_distal[bisect_left(distals, h_zone["distal_line"]):]
+                if lower_zones[k]["proximal_line"] <= h_zone["proximal_line"]
+            ]
+            h_zone["coinciding_lower_zones"] = [lower_zones[k] for k in sorted(inside)]
 
         logger.info(f"Mapped lower timeframe zones under higher timeframe zones.")
 
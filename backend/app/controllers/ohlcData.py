@@ -7,6 +7,7 @@ from typing import List, Dict
 from dateutil import parser
 import json
 from app.utils.ticker_loader import load_tickers_from_json
+from app.utils.trading_calendar import trading_calendar
 import pandas as pd
 import asyncio
 from concurrent.futures import ThreadPoolExecutor
@@ -21,7 +22,7 @@ async def ohlc_data_controller(ticker: str, start_date: date, end_date: date, in
         if not start_date:
             start_date = (datetime.now().date() - timedelta(days=365))
         if not end_date:
-            end_date = datetime.now().date()
+            end_date = trading_calendar.default_end_date()
         
         logger.info(f"Processing {ticker} from {start_date} to {end_date}, "
                    f"interval: {interval}")
@@ -0,0 +1,40 @@
+import os
+import logging
+from typing import Dict
+from app.models.models import MultiStockRequest
+from app.controllers.controllers import find_multi_demand_zones_controller
+from app.services.quote_service import refresh_all_ltp
+from app.services.zone_freshness_service import refresh_freshness
+from app.services.scheduler import Scheduler, Job, CronTrigger, MarketHoursTrigger
+
+logger = logging.getLogger(__name__)
+
+# Empty (or 0 for the interval) disables a job; times are in SCHEDULER_TZ
+SCHEDULE_EOD_SCAN = os.environ.get("SCHEDULE_EOD_SCAN", "30 16 * * 1-5")
+SCHEDULE_FRESHNESS = os.environ.get("SCHEDULE_FRESHNESS", "0 18 * * 1-5")
+SCHEDULE_LTP_INTERVAL = float(os.environ.get("SCHEDULE_LTP_INTERVAL", 300))
+
+
+async def eod_scan() -> Dict:
+    """Scan every ticker with the default settings after the close."""
+    results = await find_multi_demand_zones_controller(MultiStockRequest())
+    return {"tickers": len(results), "zones": sum(len(zones) for zones in results.values())}
+
+
+async def ltp_refresh() -> Dict:
+    return await refresh_all_ltp()
+
+
+async def freshness_upkeep() -> Dict:
+    return await refresh_freshness()
+
+
+def register_jobs(scheduler: Scheduler) -> None:
+    if SCHEDULE_EOD_SCAN:
+        scheduler.add_job(Job("eod_scan", CronTrigger(SCHEDULE_EOD_SCAN, trading_days_only=True), eod_scan, catch_up=True, lease_seconds=4 * 3600))
+    if SCHEDULE_FRESHNESS:
+        scheduler.add_job(Job("freshness_upkeep", CronTrigger(SCHEDULE_FRESHNESS, trading_days_only=True), freshness_upkeep,
+                              catch_up=True, lease_seconds=2 * 3600))
+    if SCHEDULE_LTP_INTERVAL > 0:
+        scheduler.add_job(Job("ltp_refresh", MarketHoursTrigger(SCHEDULE_LTP_INTERVAL), ltp_refresh, lease_seconds=900))
+    logger.info(f"Registered scheduled jobs: {', '.join(scheduler.jobs) or 'none'}")
@@ -17,10 +17,20 @@ db = client[DATABASE_NAME]
 collection = db[COLLECTION_NAME]
 trade_collection = db['trades']
 symbol_collection = db['symbols']
+alert_collection = db['alerts']
+scheduler_collection = db['scheduler_state']
+lower_zone_collection = db['lower_zones']
 
 async def init_db():
     """Initialize MongoDB with a unique index on zone_id"""
     index = IndexModel([("zone_id", ASCENDING)], unique=True)
     await collection.create_indexes([index])
     index = IndexModel([("symbol", ASCENDING)], unique=True)
-    await symbol_collection.create_indexes([index])
\ No newline at end of file
+    await symbol_collection.create_indexes([index])
+    index = IndexModel([("job", ASCENDING)], unique=True)
+    await scheduler_collection.create_indexes([index])
+    await lower_zone_collection.create_indexes([
+        IndexModel([("parent_zone_id", ASCENDING), ("zone_id", ASCENDING)], unique=True),
+        IndexModel([("parent_zone_id", ASCENDING), ("timestamp", ASCENDING)]),
+        IndexModel([("ticker", ASCENDING), ("timeframe", ASCENDING)]),
+    ])
\ No newline at end of file
@@ -9,11 +9,28 @@ class GetZonesRequest(BaseModel):
     tickers: Optional[List[str]] = None
     start_date: Optional[str] = None
     end_date: Optional[str] = None
+    include_lower_zones: bool = False
+
+class TickerPrice(BaseModel):
+    ticker: str
+    price: Optional[float] = None  # None uses the live tick price
+
+class NearPriceRequest(BaseModel):
+    items: List[TickerPrice]
+    within_percent: float = 0.0
+    include_breached: bool = False
+
+class MergeZonesRequest(BaseModel):
+    tickers: Optional[List[str]] = None
+    min_overlap: float = 0.8
+    delete_duplicates: bool = False
+    dry_run: bool = False
 
 class RealtimeData(BaseModel):
     symbol: str
     ltp: Optional[float] = None
     day_low: Optional[float] = None
+    age_seconds: Optional[float] = None
 
 class StockRequest(BaseModel):
     ticker: str
@@ -34,6 +51,12 @@ class StockRequest(BaseModel):
     minBaseCandles: float = 1
     maxBaseCandles: float = 5
     detectLowerZones: Optional[bool] = True
+    emaFilterPeriod: Optional[int] = None
+    minLegoutAtrMultiple: Optional[float] = None
+    atrPeriod: int = 14
+
+class ConfluenceRequest(StockRequest):
+    timeframes: List[str] = ["1wk", "1d", "1h", "15m"]
 
 class DemandZone(BaseModel):
     zone_id: str
@@ -68,3 +91,35 @@ class MultiStockRequest(BaseModel):
     minBaseCandles: float = 1
     maxBaseCandles: float = 5
     detectLowerZones: Optional[bool] = True
+    emaFilterPeriod: Optional[int] = None
+    minLegoutAtrMultiple: Optional[float] = None
+    atrPeriod: int = 14
+
+class BacktestRequest(BaseModel):
+    tickers: Optional[List[str]] = None
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+    r_multiple: float = 2.0
+    max_holding_bars: Optional[int] = None
+    workers: Optional[int] = None
+
+class WalkForwardRequest(BaseModel):
+    tickers: Optional[List[str]] = None
+    start_date: date
+    end_date: Optional[date] = None
+    interval: str = "1d"
+    # Keys from walkforward_service.DEFAULT_PARAMS; others are rejected with a 400
+    grid: Dict[str, List[float]] = {
+        "leginMinBodyPercent": [40, 50, 60],
+        "baseMaxBodyPercent": [40, 50],
+        "minLeginMovement": [3, 5, 7],
+        "minTradeScore": [0, 5.5],
+    }
+    train_days: int = 730
+    test_days: int = 180
+    step_days: Optional[int] = None
+    metric: str = "expectancy_r"
+    min_trades: int = 30
+    r_multiple: float = 2.0
+    max_holding_bars: Optional[int] = None
+    workers: Optional[int] = None
@@ -26,6 +26,9 @@ class LowerZone(BaseModel):
     base_candles: float
     freshness: float
     timestamp: str
+    timeframe: Optional[str] = None
+    parent_zone_id: Optional[str] = None
+    ticker: Optional[str] = None
 
     class Config:
         arbitrary_types_allowed = True
@@ -45,6 +48,7 @@ class DemandZone(BaseModel):
     base_candles: float
     freshness: float
     parent_zone_id: Optional[str]=None
+    merged_into: Optional[str] = None
     coinciding_lower_zones: List[LowerZone] = []
 
     class Config:
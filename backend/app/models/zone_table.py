@@ -0,0 +1,265 @@
+import sys
+import numpy as np
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional, Sequence
+
+FLOAT_COLUMNS = ["proximal_line", "distal_line", "trade_score", "base_candles", "freshness"]
+TIME_COLUMNS = ["timestamp", "end_timestamp", "start_timestamp"]
+CODE_COLUMNS = ["ticker", "pattern", "timeframe", "timeframes"]
+OBJECT_COLUMNS = ["zone_id", "parent_zone_id", "merged_into"]
+
+NAT = np.iinfo(np.int64).min
+NAIVE = np.iinfo(np.int16).min   # offset marker for timestamps stored without a timezone
+
+
+def zone_timeframe(zone: Dict) -> str:
+    """Timeframe a zone was detected on: first of `timeframes`, else the one in its zone_id."""
+    if zone.get("timeframes"):
+        return zone["timeframes"][0]
+    if zone.get("timeframe"):
+        return zone["timeframe"]
+    ticker = zone.get("ticker") or zone["zone_id"].split("-")[0]
+    return zone["zone_id"][len(ticker) + 1:].split("-")[0]
+
+
+class Vocabulary:
+    """Interned values behind a code column; tables derived from one another share it."""
+
+    def __init__(self, values: Optional[List] = None):
+        self.values: List = []
+        self._codes: Dict = {}
+        for value in values or []:
+            self.code(value)
+
+    def code(self, value) -> int:
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def lookup(self, value) -> int:
+        """Code of `value`, or -1 when it never occurs."""
+        return self._codes.get(value, -1)
+
+
+def _parse_time(value: Optional[str]) -> tuple:
+    if not value:
+        return NAT, 0
+    ts = datetime.fromisoformat(value)
+    offset = ts.utcoffset()
+    if offset is None:
+        return int((ts - datetime(1970, 1, 1)) // timedelta(microseconds=1)) * 1000, NAIVE
+    utc = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return int((utc - datetime(1970, 1, 1)) // timedelta(microseconds=1)) * 1000, int(offset.total_seconds() // 60)
+
+
+def _format_time(ns: int, offset: int) -> Optional[str]:
+    if ns == NAT:
+        return None
+    ts = datetime(1970, 1, 1) + timedelta(microseconds=ns // 1000)
+    if offset == NAIVE:
+        return ts.isoformat()
+    tz = timezone(timedelta(minutes=int(offset)))
+    return ts.replace(tzinfo=timezone.utc).astimezone(tz).isoformat()
+
+
+class ZoneTable:
+    """
+    Struct-of-arrays zone set.
+
+    Prices and scores are float64 columns, timestamps int64 nanoseconds since
+    the epoch (UTC) with their original UTC offset in minutes, and ticker,
+    pattern and timeframe(s) small integer codes into shared vocabularies.
+    `coinciding_lower_zones` live in a child ZoneTable addressed through CSR
+    offsets, so nesting costs two integers per zone instead of a list of dicts.
+    Filters, sorts and groups are NumPy index operations that return new tables
+    sharing the vocabularies; rows only become dicts at the API boundary through
+    `iter_dicts` / `to_dicts`.
+    """
+
+    def __init__(self, columns: Dict[str, np.ndarray], vocab: Dict[str, Vocabulary],
+                 lower: Optional["ZoneTable"] = None, lower_offsets: Optional[np.ndarray] = None):
+        self.columns = columns
+        self.vocab = vocab
+        self.lower = lower
+        self.lower_offsets = lower_offsets if lower_offsets is not None else np.zeros(len(columns["zone_id"]) + 1, dtype=np.int64)
+
+    @classmethod
+    def empty_vocab(cls) -> Dict[str, Vocabulary]:
+        return {name: Vocabulary() for name in CODE_COLUMNS}
+
+    @classmethod
+    def from_dicts(cls, zones: Sequence[Dict], vocab: Optional[Dict[str, Vocabulary]] = None) -> "ZoneTable":
+        """Build a table from zone dicts (Mongo documents, detector output or model dumps)."""
+        vocab = vocab or cls.empty_vocab()
+        n = len(zones)
+        columns = {name: np.full(n, np.nan) for name in FLOAT_COLUMNS}
+        for name in TIME_COLUMNS:
+            columns[name] = np.full(n, NAT, dtype=np.int64)
+            columns[f"{name}_offset"] = np.zeros(n, dtype=np.int16)
+        for name in CODE_COLUMNS:
+            columns[name] = np.zeros(n, dtype=np.int32)
+        for name in OBJECT_COLUMNS:
+            columns[name] = np.empty(n, dtype=object)
+
+        lower_rows: List[Dict] = []
+        offsets = np.zeros(n + 1, dtype=np.int64)
+        for i, zone in enumerate(zones):
+            for name in FLOAT_COLUMNS:
+                value = zone.get(name)
+                if value is not None:
+                    columns[name][i] = value
+            for name in TIME_COLUMNS:
+                columns[name][i], columns[f"{name}_offset"][i] = _parse_time(zone.get(name))
+            ticker = zone.get("ticker") or zone["zone_id"].split("-")[0]
+            columns["ticker"][i] = vocab["ticker"].code(ticker)
+            columns["pattern"][i] = vocab["pattern"].code(zone.get("pattern"))
+            columns["timeframe"][i] = vocab["timeframe"].code(zone_timeframe({**zone, "ticker": ticker}))
+            timeframes = zone.get("timeframes")
+            columns["timeframes"][i] = vocab["timeframes"].code(tuple(timeframes) if timeframes is not None else None)
+            columns["zone_id"][i] = zone["zone_id"]
+            columns["parent_zone_id"][i] = zone.get("parent_zone_id")
+            columns["merged_into"][i] = zone.get("merged_into")
+            lower_rows.extend(zone.get("coinciding_lower_zones") or [])
+            offsets[i + 1] = len(lower_rows)
+
+        table = cls(columns, vocab, lower_offsets=offsets)
+        if lower_rows:
+            table.lower = cls.from_dicts(
+                [
+                    {"ticker": columns["zone_id"][i].split("-")[0], **row}
+                    for i in range(n) for row in zones[i].get("coinciding_lower_zones") or []
+                ],
+                vocab
+            )
+        return table
+
+    def __len__(self) -> int:
+        return len(self.columns["zone_id"])
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.columns[name]
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the columns (object columns count their strings)."""
+        total = 0
+        for name, column in self.columns.items():
+            total += column.nbytes
+            if column.dtype == object:
+                total += sum(sys.getsizeof(value) for value in column if value is not None)
+        total += self.lower_offsets.nbytes
+        return total + (self.lower.nbytes if self.lower is not None else 0)
+
+    def values(self, name: str) -> np.ndarray:
+        """Decoded values of a code column."""
+        decoded = np.empty(len(self.vocab[name].values), dtype=object)
+        decoded[:] = self.vocab[name].values
+        return decoded[self.columns[name]]
+
+    def mask(
+        self,
+        ticker: Optional[str] = None,
+        pattern: Optional[str] = None,
+        timeframe: Optional[str] = None,
+        min_score: Optional[float] = None,
+        fresh: Optional[bool] = None,
+        top_level: Optional[bool] = None
+    ) -> np.ndarray:
+        """Boolean row mask combining the given conditions."""
+        keep = np.ones(len(self), dtype=bool)
+        if ticker is not None:
+            keep &= self.columns["ticker"] == self.vocab["ticker"].lookup(ticker)
+        if pattern is not None:
+            keep &= self.columns["pattern"] == self.vocab["pattern"].lookup(pattern)
+        if timeframe is not None:
+            keep &= self.columns["timeframe"] == self.vocab["timeframe"].lookup(timeframe)
+        if min_score is not None:
+            keep &= self.columns["trade_score"] >= min_score
+        if fresh is not None:
+            keep &= (self.columns["freshness"] > 0) == fresh
+        if top_level is not None:
+            keep &= np.array([value is None for value in self.columns["parent_zone_id"]], dtype=bool) == top_level
+        return keep
+
+    def filter(self, mask: Optional[np.ndarray] = None, **conditions) -> "ZoneTable":
+        """Rows where `mask` and every keyword condition of `mask()` hold."""
+        keep = self.mask(**conditions)
+        if mask is not None:
+            keep &= mask
+        return self.take(np.flatnonzero(keep))
+
+    def take(self, indices: np.ndarray) -> "ZoneTable":
+        indices = np.asarray(indices, dtype=np.int64)
+        columns = {name: column[indices] for name, column in self.columns.items()}
+        counts = np.diff(self.lower_offsets)[indices]
+        offsets = np.zeros(len(indices) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        lower = None
+        if self.lower is not None and offsets[-1]:
+            starts = self.lower_offsets[indices]
+            # Positions of every child row of the taken parents, in parent order
+            rows = np.repeat(starts - offsets[:-1], counts) + np.arange(offsets[-1])
+            lower = self.lower.take(rows)
+        return ZoneTable(columns, self.vocab, lower, offsets)
+
+    def sort(self, by, descending: bool = False) -> "ZoneTable":
+        """Sort by one column or a list of columns (first is the primary key)."""
+        keys = [by] if isinstance(by, str) else list(by)
+        order = np.lexsort([self.columns[key] for key in reversed(keys)])
+        return self.take(order[::-1] if descending else order)
+
+    def group_by(self, *names: str) -> Dict[tuple, "ZoneTable"]:
+        """
+        Split into one table per distinct combination of the given columns.
+        Code columns are keyed by their decoded values.
+        """
+        if not len(self):
+            return {}
+        stacked = np.stack([self.columns[name] for name in names], axis=1)
+        keys, inverse = np.unique(stacked, axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        order = np.argsort(inverse, kind="stable")
+        bounds = np.searchsorted(inverse[order], np.arange(len(keys) + 1))
+        groups = {}
+        for g, key in enumerate(keys):
+            decoded = tuple(
+                self.vocab[name].values[int(value)] if name in self.vocab else value.item()
+                for name, value in zip(names, key)
+            )
+            groups[decoded if len(names) > 1 else decoded[0]] = self.take(order[bounds[g]:bounds[g + 1]])
+        return groups
+
+    def _row(self, i: int, nested: bool) -> Dict:
+        c = self.columns
+        zone = {"zone_id": c["zone_id"][i]}
+        if nested:
+            zone["timeframe"] = self.vocab["timeframe"].values[c["timeframe"][i]]
+        else:
+            timeframes = self.vocab["timeframes"].values[c["timeframes"][i]]
+            zone["ticker"] = self.vocab["ticker"].values[c["ticker"][i]]
+            zone["timeframes"] = list(timeframes) if timeframes is not None else None
+        zone["pattern"] = self.vocab["pattern"].values[c["pattern"][i]]
+        for name in FLOAT_COLUMNS:
+            value = c[name][i]
+            zone[name] = None if np.isnan(value) else float(value)
+        for name in TIME_COLUMNS:
+            value = _format_time(int(c[name][i]), int(c[f"{name}_offset"][i]))
+            if value is not None or name != "start_timestamp":
+                zone[name] = value
+        zone["parent_zone_id"] = c["parent_zone_id"][i]
+        if not nested:
+            zone["merged_into"] = c["merged_into"][i]
+            start, stop = self.lower_offsets[i], self.lower_offsets[i + 1]
+            zone["coinciding_lower_zones"] = [self.lower._row(j, nested=True) for j in range(start, stop)]
+        return zone
+
+    def iter_dicts(self) -> Iterator[Dict]:
+        """Rows as zone dicts in the stored document shape, one at a time."""
+        for i in range(len(self)):
+            yield self._row(i, nested=False)
+
+    def to_dicts(self) -> List[Dict]:
+        """All rows as dicts, ready for JSON responses or Mongo writes."""
+        return list(self.iter_dicts())
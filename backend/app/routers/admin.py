@@ -0,0 +1,60 @@
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import Response
+from typing import Optional
+from app.utils.profiling import profile_store, token_matches
+from app.utils.loop_watchdog import loop_watchdog
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+
+async def require_admin(x_profile_token: Optional[str] = Header(None)):
+    """Admin endpoints take the same token as profiled requests; disabled when none is configured."""
+    if not token_matches(x_profile_token):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+
+@router.get("/profiles", dependencies=[Depends(require_admin)])
+async def list_profiles():
+    """Summaries of the stored request profiles, newest first."""
+    return {"profiles": [
+        {key: value for key, value in summary.items() if key not in ("top_functions", "stages")}
+        for summary in profile_store.summaries()
+    ]}
+
+
+@router.get("/profiles/{request_id}", dependencies=[Depends(require_admin)])
+async def get_profile(request_id: str):
+    """Time split by stage and the top functions of one profiled request."""
+    entry = profile_store.get(request_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail=f"No profile for request {request_id}")
+    return entry["summary"]
+
+
+@router.get("/profiles/{request_id}/download", dependencies=[Depends(require_admin)])
+async def download_profile(request_id: str):
+    """
+    Raw profile: a pstats file for cprofile mode (`python -m pstats`, snakeviz),
+    collapsed stacks for sample mode (flamegraph.pl, speedscope).
+    """
+    entry = profile_store.get(request_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail=f"No profile for request {request_id}")
+    if entry["summary"]["mode"] == "cprofile":
+        filename, media_type = f"{request_id}.prof", "application/octet-stream"
+    else:
+        filename, media_type = f"{request_id}.folded", "text/plain"
+    return Response(
+        content=entry["data"],
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@router.get("/loop-stalls", dependencies=[Depends(require_admin)])
+async def loop_stalls(recent: int = 20):
+    """
+    Event loop stalls by route, ranked by total time blocked, with the
+    blocking call sites seen for each and the stacks of the latest stalls.
+    """
+    return loop_watchdog.report(recent)
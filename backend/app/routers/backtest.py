@@ -0,0 +1,73 @@
+from fastapi import APIRouter, HTTPException
+import logging
+from datetime import datetime
+from app.models.models import BacktestRequest, WalkForwardRequest
+from app.services.backtest_service import run_backtest
+from app.services.walkforward_service import run_walk_forward
+from app.controllers.controllers import load_tickers_from_json
+
+router = APIRouter(prefix="/backtest", tags=["backtest"])
+
+logger = logging.getLogger(__name__)
+
+@router.post("/")
+async def backtest_zones(request: BacktestRequest):
+    """
+    Backtest stored zones: enter at proximal_line after the leg-out, stop at
+    distal_line and target `r_multiple` times the zone height.
+    
+    Args:
+        request: BacktestRequest with optional tickers, date range, R multiple,
+                 holding limit and worker count
+        
+    Returns:
+        Hit rate, expectancy and holding time overall and per pattern,
+        timeframe, base candles, score bucket and freshness
+    """
+    try:
+        return await run_backtest(
+            tickers=request.tickers,
+            start_date=request.start_date,
+            end_date=request.end_date,
+            r_multiple=request.r_multiple,
+            max_holding_bars=request.max_holding_bars,
+            workers=request.workers
+        )
+    except Exception as e:
+        logger.error(f"Error running backtest: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
+
+@router.post("/walk-forward")
+async def walk_forward(request: WalkForwardRequest):
+    """
+    Walk-forward optimization of detection and scoring thresholds.
+    
+    Args:
+        request: WalkForwardRequest with the parameter grid (StockRequest field
+                 names plus minTradeScore), window sizes and ranking metric
+        
+    Returns:
+        Best parameters per window with train and test metrics, how often each
+        value was chosen, and the recommended configuration
+    """
+    try:
+        return await run_walk_forward(
+            tickers=request.tickers or load_tickers_from_json("data/tickers.json"),
+            start_date=request.start_date,
+            end_date=request.end_date or datetime.now().date(),
+            grid=request.grid,
+            interval=request.interval,
+            train_days=request.train_days,
+            test_days=request.test_days,
+            step_days=request.step_days,
+            metric=request.metric,
+            min_trades=request.min_trades,
+            r_multiple=request.r_multiple,
+            max_holding_bars=request.max_holding_bars,
+            workers=request.workers
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error running walk-forward optimization: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
@@ -0,0 +1,34 @@
+from fastapi import APIRouter, HTTPException
+import logging
+from app.services.scheduler import scheduler, SCHEDULER_ENABLED, SCHEDULER_MAX_CONCURRENT
+
+router = APIRouter(prefix="/scheduler", tags=["scheduler"])
+
+logger = logging.getLogger(__name__)
+
+@router.get("/")
+async def scheduler_status():
+    """
+    Scheduled jobs with their trigger, next run, whether they are running
+    and the outcome of the last run.
+    """
+    try:
+        return {
+            "enabled": SCHEDULER_ENABLED,
+            "max_concurrent": SCHEDULER_MAX_CONCURRENT,
+            "jobs": await scheduler.status()
+        }
+    except Exception as e:
+        logger.error(f"Error reading scheduler status: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
+
+@router.post("/{job}/run")
+async def run_job_now(job: str):
+    """Run a job at the next dispatch instead of waiting for its trigger."""
+    if job not in scheduler.jobs:
+        raise HTTPException(status_code=404, detail=f"Unknown job {job}")
+    if not SCHEDULER_ENABLED:
+        raise HTTPException(status_code=409, detail="Scheduler is disabled")
+    if not scheduler.run_now(job):
+        raise HTTPException(status_code=409, detail=f"Job {job} is already running")
+    return {"job": job, "scheduled": True}
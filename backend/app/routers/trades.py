@@ -4,13 +4,17 @@ from app.db.database import trade_collection
 from bson import ObjectId
 from app.models.trade_models import TradeCreate, VerifyTrade
 from app.models.models import RealtimeData
-import yfinance as yf
+from app.services.price_cache import quote_cache
+from app.services.tick_service import tick_service, TICK_MAX_AGE
+from app.services.trade_alert_service import trade_alert_evaluator
+from app.services.trade_verification_service import verify_trades
+from app.services.export_service import export_trades, export_headers, trade_export_query, parquet_available
+from fastapi.responses import StreamingResponse
 import logging
 from typing import List
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from datetime import datetime, timedelta
-import pandas as pd
 import numpy as np
 import math
 
@@ -38,6 +42,7 @@ async def create_trade(trade: TradeCreate):
     try:
         trade_dict = trade.dict()
         result = await trade_collection.insert_one(trade_dict)
+        trade_alert_evaluator.mark_dirty()
         created_trade = await trade_collection.find_one({"_id": ObjectId(result.inserted_id)})
         created_trade["_id"] = str(created_trade["_id"])
         return {"message": "Trade added successfully!", "trade_id": str(result.inserted_id), "trade": created_trade}
@@ -63,6 +68,24 @@ async def get_trade_by_symbol(symbol: str):
         logger.error(f"Error fetching trades by symbol {symbol}: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
 
+# Export trades as a streamed CSV or Parquet file
+@router.get("/export")
+async def export_trades_file(
+    format: str = Query("csv", regex="^(csv|parquet)$", description="csv, or parquet (needs pyarrow)"),
+    symbol: Optional[str] = Query("", description="Search by symbol (partial match)"),
+    status: Optional[str] = Query("", regex="^(OPEN|CLOSED|CANCELLED|)$", description="Filter by status"),
+    start_date: Optional[str] = Query(None, description="Earliest created_at (ISO format)"),
+    end_date: Optional[str] = Query(None, description="Latest created_at (ISO format)")
+):
+    if format == "parquet" and not parquet_available():
+        raise HTTPException(status_code=501, detail="Parquet export needs pyarrow; install it or use format=csv")
+    try:
+        query = trade_export_query(symbol, status, start_date, end_date)
+    except (ValueError, OverflowError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid date format: {str(e)}")
+    media_type, headers = export_headers("trades", format)
+    return StreamingResponse(export_trades(query, format), media_type=media_type, headers=headers)
+
 # Get a single trade
 @router.get("/{trade_id}")
 async def get_trade(trade_id: str):
@@ -94,7 +117,7 @@ async def get_trades(
         valid_sort_fields = [
             "symbol", "entry_price", "stop_loss", "target_price",
             "trade_type", "status", "created_at", "alert_sent",
-            "entry_alert_sent", "note", "verified"
+            "entry_alert_sent", "note", "verified", "outcome", "realized_r", "exit_time"
         ]
         if sort_by not in valid_sort_fields:
             raise HTTPException(
@@ -148,6 +171,7 @@ async def update_trade(trade_id: str, trade: TradeCreate):
             {"_id": ObjectId(trade_id)},
             {"$set": trade_dict}
         )
+        trade_alert_evaluator.mark_dirty()
 
         if result.matched_count == 0:
             raise HTTPException(status_code=404, detail="Trade not found")
@@ -168,6 +192,7 @@ async def delete_trade(trade_id: str):
             raise HTTPException(status_code=400, detail="Invalid trade ID")
 
         result = await trade_collection.delete_one({"_id": ObjectId(trade_id)})
+        trade_alert_evaluator.mark_dirty()
         if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail="Trade not found")
 
@@ -177,6 +202,18 @@ async def delete_trade(trade_id: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
 
+# Verify all trades against OHLC candles
+@router.post("/verify-all")
+async def verify_all_trades(
+    interval: str = Query("1d", description="Candle interval used to resolve trades"),
+    include_verified: bool = Query(False, description="Re-verify trades already marked verified")
+):
+    try:
+        return await verify_trades(interval=interval, include_verified=include_verified)
+    except Exception as e:
+        logger.error(f"Error verifying trades: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
+
 # Toggle verified status
 @router.patch("/{trade_id}/verify")
 async def toggle_trade_verified(trade_id: str, verify_data: VerifyTrade):
@@ -216,62 +253,29 @@ async def get_realtime_data(
         else:
             tickers = payload
             date_str = None
-        tickers = list(set([t + ".NS" for t in tickers if t.strip()]))
+        tickers = list(set([t.strip() for t in tickers if t.strip()]))
         if not tickers:
             return {"realtime_data": []}
 
         logger.info(f"Fetching real-time data for tickers: {tickers}, date: {date_str}")
 
-        yf_kwargs = {
-            "tickers": tickers,
-            "interval": "1d",
-            "group_by": "ticker",
-            "threads": True,
-            "ignore_tz": True
-        }
-        if date_str:
-            from datetime import datetime, timedelta
-            start = datetime.strptime(date_str, "%Y-%m-%d")
-            end = start + timedelta(days=1)
-            yf_kwargs["start"] = start.strftime("%Y-%m-%d")
-            yf_kwargs["end"] = end.strftime("%Y-%m-%d")
-        else:
-            yf_kwargs["period"] = "1d"
-
-        # Fetch data using yfinance
-        data = yf.download(**yf_kwargs)
+        # Live ticks first; the rest from the shared quote cache, misses batched into one download
+        quotes = {} if date_str else tick_service.table.snapshot(tickers, max_age=TICK_MAX_AGE)
+        remaining = [ticker for ticker in tickers if ticker not in quotes]
+        if remaining:
+            quotes.update(await quote_cache.get_many(remaining, date_str))
 
         realtime_data = []
         for ticker in tickers:
-            try:
-                # Remove .NS for response to match original symbol
-                original_ticker = ticker.replace(".NS", "")
-                ticker_data = data[ticker] if len(tickers) > 1 else data
-                if not ticker_data.empty:
-                    ltp = ticker_data['Close'].iloc[-1]
-                    day_low = ticker_data['Low'].iloc[-1]
-                    # Convert NaN to None and handle non-finite values
-                    ltp_val = None if pd.isna(ltp) or not np.isfinite(ltp) else round(float(ltp), 2)
-                    day_low_val = None if pd.isna(day_low) or not np.isfinite(day_low) else round(float(day_low), 2)
-                    realtime_data.append({
-                        "symbol": original_ticker,
-                        "ltp": ltp_val,
-                        "day_low": day_low_val
-                    })
-                else:
-                    logger.warning(f"No data found for ticker {ticker}")
-                    realtime_data.append({
-                        "symbol": original_ticker,
-                        "ltp": None,
-                        "day_low": None
-                    })
-            except (KeyError, IndexError, ValueError) as e:
-                logger.error(f"Error processing ticker {ticker}: {str(e)}")
-                realtime_data.append({
-                    "symbol": original_ticker,
-                    "ltp": None,
-                    "day_low": None
-                })
+            quote = quotes[ticker]
+            if quote["ltp"] is None:
+                logger.warning(f"No data found for ticker {ticker}")
+            realtime_data.append({
+                "symbol": ticker,
+                "ltp": quote["ltp"],
+                "day_low": quote["day_low"],
+                "age_seconds": quote["age_seconds"]
+            })
 
         return {"realtime_data": realtime_data}
     except Exception as e:
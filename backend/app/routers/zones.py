@@ -1,8 +1,10 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
 from typing import List, Optional
 from pydantic import BaseModel
-from app.controllers.controllers import get_all_zones_controller, get_demand_zones_controller, delete_zone_controller
-from app.models.models import GetZonesRequest
+from app.controllers.controllers import get_all_zones_controller, get_demand_zones_controller, delete_zone_controller, get_zones_near_price_controller, merge_zones_controller, get_lower_zones_controller, export_zones_controller
+from app.models.models import GetZonesRequest, NearPriceRequest, MergeZonesRequest
+from app.services.alert_service import alert_dispatcher
+from app.services.ranking_service import zone_ranking
 
 router = APIRouter(prefix="/zones", tags=["zones"])
 
@@ -32,7 +34,9 @@ async def get_all_zones(
     sort_order: int = -1,
     ticker: Optional[str] = None,
     pattern: Optional[str] = None,
-    timeframe: Optional[str] = None
+    timeframe: Optional[str] = None,
+    include_merged: bool = False,
+    include_lower_zones: bool = False
 ):
     """
     Retrieve all trading zones with pagination and filtering.
@@ -45,6 +49,8 @@ async def get_all_zones(
         ticker: Filter by ticker symbol
         pattern: Filter by pattern (DBR/RBR)
         timeframe: Filter by timeframe (e.g., '1d', '4h', '15m')
+        include_merged: Also list duplicates folded into another zone by /zones/merge
+        include_lower_zones: Join each zone's coinciding lower zones
         
     Returns:
         Dictionary containing paginated zones and metadata
@@ -57,7 +63,153 @@ async def get_all_zones(
             sort_order=sort_order,
             ticker=ticker,
             pattern=pattern,
-            timeframe=timeframe
+            timeframe=timeframe,
+            include_merged=include_merged,
+            include_lower_zones=include_lower_zones
+        )
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
+
+@router.get("/export")
+async def export_zones(
+    format: str = Query("csv", regex="^(csv|parquet)$", description="csv, or parquet (needs pyarrow)"),
+    tickers: Optional[List[str]] = Query(None, description="Repeat to export several tickers"),
+    timeframe: Optional[str] = None,
+    pattern: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    include_merged: bool = False
+):
+    """
+    Download every zone matching the filters as a CSV or Parquet file, streamed
+    in batches instead of built in memory like /zones/demand-zones.
+    
+    Args:
+        format: csv or parquet
+        tickers: Filter by ticker symbols
+        timeframe: Filter by timeframe (e.g., '1d', '4h', '15m')
+        pattern: Filter by pattern (DBR/RBR)
+        start_date: Earliest zone timestamp (ISO format)
+        end_date: Latest zone timestamp (ISO format)
+        include_merged: Also export duplicates folded into another zone by /zones/merge
+        
+    Returns:
+        Streaming file download
+    """
+    try:
+        return export_zones_controller(
+            fmt=format,
+            tickers=tickers,
+            timeframe=timeframe,
+            pattern=pattern,
+            start_date=start_date,
+            end_date=end_date,
+            include_merged=include_merged
+        )
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
+
+@router.post("/near-price")
+async def get_zones_near_price(request: NearPriceRequest):
+    """
+    Find active zones that contain, or lie within a percentage of, the given prices.
+    
+    Args:
+        request: NearPriceRequest with a batch of (ticker, price) pairs,
+                 within_percent tolerance and include_breached flag
+        
+    Returns:
+        Dictionary mapping each ticker to its matching zones, closest first
+    """
+    try:
+        return await get_zones_near_price_controller(request)
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
+
+@router.get("/alerts")
+async def get_recent_alerts(limit: int = 100):
+    """
+    Retrieve the most recent zone entered/breached alerts raised by this process.
+    
+    Args:
+        limit: Maximum number of alerts to return, newest first
+        
+    Returns:
+        List of alert events
+    """
+    return list(alert_dispatcher.recent)[::-1][:limit]
+
+@router.get("/actionable")
+async def get_actionable_zones(timeframe: Optional[str] = None, limit: int = 50):
+    """
+    Retrieve the highest ranked fresh zones, by trade score and distance from LTP.
+    
+    Args:
+        timeframe: Restrict the ranking to one timeframe (e.g., '1d'); all timeframes if omitted
+        limit: Maximum number of zones to return
+        
+    Returns:
+        Ranked zones with their ticker's ltp and distance_percent
+    """
+    return {
+        "timeframe": timeframe or "all",
+        "timeframes": zone_ranking.timeframes(),
+        "zones": zone_ranking.top(timeframe, limit)
+    }
+
+@router.post("/merge")
+async def merge_duplicate_zones(request: MergeZonesRequest):
+    """
+    De-duplicate zones of the same ticker whose price bands overlap.
+    
+    Args:
+        request: MergeZonesRequest with optional tickers, min_overlap (intersection
+                 over union of the bands), delete_duplicates and dry_run
+        
+    Returns:
+        Merge counts and the canonical zone of each cluster with its merged timeframes
+    """
+    try:
+        return await merge_zones_controller(request)
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
+
+@router.get("/lower-zones")
+async def get_lower_zones(
+    parent_zone_id: Optional[str] = None,
+    ticker: Optional[str] = None,
+    timeframe: Optional[str] = None,
+    page: int = 1,
+    limit: int = 50
+):
+    """
+    Retrieve coinciding lower timeframe zones on their own, newest first.
+    
+    Args:
+        parent_zone_id: Only the lower zones of this zone
+        ticker: Filter by ticker symbol
+        timeframe: Filter by the lower zone's timeframe (e.g., '15m')
+        page: Page number (1-based)
+        limit: Number of items per page
+        
+    Returns:
+        Dictionary containing paginated lower zones and metadata
+    """
+    try:
+        return await get_lower_zones_controller(
+            parent_zone_id=parent_zone_id,
+            ticker=ticker,
+            timeframe=timeframe,
+            page=page,
+            limit=limit
         )
     except HTTPException as e:
         raise e
@@ -0,0 +1,208 @@
+import os
+import json
+import asyncio
+import logging
+import threading
+import urllib.request
+from abc import ABC, abstractmethod
+from bisect import bisect_left, bisect_right
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Optional
+from motor.motor_asyncio import AsyncIOMotorCollection
+from app.db.database import alert_collection
+from app.services.zone_index import zone_index, normalize_ticker
+
+logger = logging.getLogger(__name__)
+
+# Comma separated: log, mongo, webhook, memory
+ALERT_SINKS = os.environ.get("ALERT_SINKS", "log")
+ALERT_WEBHOOK_URL = os.environ.get("ALERT_WEBHOOK_URL", "")
+
+
+class AlertSink(ABC):
+    @abstractmethod
+    async def emit(self, events: List[Dict]) -> None:
+        ...
+
+
+class LogSink(AlertSink):
+    async def emit(self, events: List[Dict]) -> None:
+        for event in events:
+            logger.info(f"ALERT {event['type']}: {event.get('zone_id') or event.get('trade_id')} "
+                        f"{event['ticker']} @ {event['price']}")
+
+
+class MongoSink(AlertSink):
+    def __init__(self, db_collection: AsyncIOMotorCollection = alert_collection):
+        self.db_collection = db_collection
+
+    async def emit(self, events: List[Dict]) -> None:
+        await self.db_collection.insert_many([dict(event) for event in events], ordered=False)
+
+
+class WebhookSink(AlertSink):
+    def __init__(self, url: str, timeout: float = 5):
+        self.url = url
+        self.timeout = timeout
+
+    def _post(self, events: List[Dict]) -> None:
+        body = json.dumps({"events": events}).encode()
+        request = urllib.request.Request(self.url, data=body, headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+    async def emit(self, events: List[Dict]) -> None:
+        await asyncio.to_thread(self._post, events)
+
+
+class MemorySink(AlertSink):
+    """Local stand-in for WebhookSink: keeps the payloads it would have posted."""
+
+    def __init__(self, maxlen: int = 1000):
+        self.events = deque(maxlen=maxlen)
+
+    async def emit(self, events: List[Dict]) -> None:
+        self.events.extend(events)
+
+
+def build_sinks(names: str = ALERT_SINKS) -> List[AlertSink]:
+    sinks = []
+    for name in filter(None, (n.strip().lower() for n in names.split(","))):
+        if name == "log":
+            sinks.append(LogSink())
+        elif name == "mongo":
+            sinks.append(MongoSink())
+        elif name == "webhook" and ALERT_WEBHOOK_URL:
+            sinks.append(WebhookSink(ALERT_WEBHOOK_URL))
+        elif name == "memory":
+            sinks.append(MemorySink())
+        else:
+            logger.warning(f"Unknown or unconfigured alert sink: {name}")
+    return sinks
+
+
+class AlertDispatcher:
+    """Hands events to the sinks on the event loop, whichever thread raised them."""
+
+    def __init__(self, sinks: Optional[List[AlertSink]] = None):
+        self.sinks = sinks if sinks is not None else build_sinks()
+        self.recent = deque(maxlen=500)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+        self._tasks = set()   # the loop only keeps weak references to tasks
+
+    def attach(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._loop = loop
+        self._loop_thread = threading.get_ident()
+
+    def dispatch(self, events: List[Dict]) -> None:
+        if not events:
+            return
+        self.recent.extend(events)
+        if self._loop is None:
+            return
+        if threading.get_ident() == self._loop_thread:
+            task = self._loop.create_task(self._emit(events))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        else:
+            asyncio.run_coroutine_threadsafe(self._emit(events), self._loop)
+
+    async def _emit(self, events: List[Dict]) -> None:
+        for sink in self.sinks:
+            try:
+                await sink.emit(events)
+            except Exception as e:
+                logger.error(f"Alert sink {type(sink).__name__} failed: {str(e)}")
+
+
+class ZoneAlertEngine:
+    """
+    Raises zone_entered / zone_breached events as prices move.
+
+    Per ticker the proximal and distal lines of active zones are kept in sorted
+    lists. A price update bisects the range between the previous and the new
+    price, so only zones actually crossed are touched. Demand zones are entered
+    when price falls to the proximal line and breached when it falls below the
+    distal line. Each (zone, event) fires once while the zone stays active; its
+    record is dropped when the ticker's levels are rebuilt without the zone.
+    The first price seen for a ticker only sets the baseline.
+    """
+
+    def __init__(self, dispatcher: AlertDispatcher):
+        self.dispatcher = dispatcher
+        self._levels: Dict[str, tuple] = {}       # ticker -> (proximals, prox_zones, distals, distal_zones)
+        self._dirty = set()
+        self._last_price: Dict[str, float] = {}
+        self._emitted: Dict[str, set] = {}   # ticker -> {(zone_id, kind)} already raised
+        self._lock = threading.Lock()
+
+    def mark_dirty(self, ticker: str) -> None:
+        self._dirty.add(ticker)
+
+    def _build(self, ticker: str) -> tuple:
+        zones = [
+            z for z in zone_index.zones_for(ticker)
+            if (z["freshness"] or 0) > 0 and not z.get("merged_into")
+        ]
+        by_proximal = sorted(zones, key=lambda z: z["proximal_line"])
+        by_distal = sorted(zones, key=lambda z: z["distal_line"])
+        return (
+            [z["proximal_line"] for z in by_proximal], by_proximal,
+            [z["distal_line"] for z in by_distal], by_distal
+        )
+
+    def on_price(self, ticker: str, price: float) -> List[Dict]:
+        ticker = normalize_ticker(ticker)
+        with self._lock:
+            previous = self._last_price.get(ticker)
+            self._last_price[ticker] = price
+            if previous is None or price >= previous:
+                return []
+            if ticker in self._dirty or ticker not in self._levels:
+                self._dirty.discard(ticker)
+                self._levels[ticker] = self._build(ticker)
+                active = {zone["zone_id"] for zone in self._levels[ticker][1]}
+                emitted = {key for key in self._emitted.get(ticker, ()) if key[0] in active}
+                if emitted:
+                    self._emitted[ticker] = emitted
+                else:
+                    self._emitted.pop(ticker, None)
+            proximals, prox_zones, distals, distal_zones = self._levels[ticker]
+
+            crossed = []
+            # Proximal lines in [price, previous): price fell onto or through them
+            for zone in prox_zones[bisect_left(proximals, price):bisect_left(proximals, previous)]:
+                crossed.append(("zone_entered", zone))
+            # Distal lines in (price, previous]: price closed the gap below them
+            for zone in distal_zones[bisect_right(distals, price):bisect_right(distals, previous)]:
+                crossed.append(("zone_breached", zone))
+
+            events = []
+            now = datetime.utcnow().isoformat()
+            for kind, zone in crossed:
+                key = (zone["zone_id"], kind)
+                emitted = self._emitted.setdefault(ticker, set())
+                if key in emitted:
+                    continue
+                emitted.add(key)
+                events.append({
+                    "type": kind,
+                    "zone_id": zone["zone_id"],
+                    "ticker": ticker,
+                    "price": price,
+                    "proximal_line": zone["proximal_line"],
+                    "distal_line": zone["distal_line"],
+                    "trade_score": zone["trade_score"],
+                    "timeframes": zone["timeframes"],
+                    "timestamp": now,
+                })
+
+        self.dispatcher.dispatch(events)
+        return events
+
+
+alert_dispatcher = AlertDispatcher()
+zone_alert_engine = ZoneAlertEngine(alert_dispatcher)
+zone_index.add_listener(zone_alert_engine.mark_dirty)
@@ -0,0 +1,247 @@
+import os
+import math
+import time
+import asyncio
+import logging
+import numpy as np
+import pandas as pd
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+from motor.motor_asyncio import AsyncIOMotorCollection
+from app.db.database import collection
+from app.services.candle_service import get_candles, candle_arrays, shared_array_pool, attach_arrays
+from app.models.zone_table import ZoneTable
+
+logger = logging.getLogger(__name__)
+
+BACKTEST_WORKERS = int(os.environ.get("BACKTEST_WORKERS", os.cpu_count() or 2))
+# Upper bound on zones x candles cells evaluated at once per worker
+MAX_CELLS = 4_000_000
+
+OUTCOME_NOT_FILLED = 0
+OUTCOME_TARGET = 1
+OUTCOME_STOP = -1
+OUTCOME_OPEN = 2
+
+BREAKDOWNS = ["pattern", "timeframe", "base_candles", "score_bucket", "freshness"]
+
+
+def _first_true(mask: np.ndarray) -> tuple:
+    return mask.any(axis=1), mask.argmax(axis=1)
+
+
+def simulate_zones(
+    times: np.ndarray,
+    high: np.ndarray,
+    low: np.ndarray,
+    close: np.ndarray,
+    proximal: np.ndarray,
+    distal: np.ndarray,
+    start_idx: np.ndarray,
+    r_multiple: float = 2.0,
+    max_holding_bars: Optional[int] = None
+) -> Dict[str, np.ndarray]:
+    """
+    Simulate every zone of one ticker against its candles with array operations.
+
+    Each zone is entered with a limit order at `proximal` from `start_idx` (the
+    bar after the leg-out) on, stopped at `distal` and targeted at `r_multiple`
+    times the zone height above the entry. Zones are evaluated as a
+    zones x candles mask in chunks bounded by MAX_CELLS. A stop on the fill bar
+    counts; a target on the fill bar does not, since the intrabar order is unknown.
+    Positions still running at the last candle (or after `max_holding_bars`) are
+    marked to market at that close.
+
+    Returns:
+        Arrays per zone: outcome, r, entry_idx, exit_idx and holding_seconds.
+    """
+    n = len(high)
+    z = len(proximal)
+    outcome = np.zeros(z, dtype=np.int8)
+    r = np.full(z, np.nan)
+    entry_idx = np.full(z, -1, dtype=np.int64)
+    exit_idx = np.full(z, -1, dtype=np.int64)
+    if n == 0 or z == 0:
+        return {"outcome": outcome, "r": r, "entry_idx": entry_idx, "exit_idx": exit_idx,
+                "holding_seconds": np.full(z, np.nan)}
+
+    risk = proximal - distal
+    target = proximal + r_multiple * risk
+    bars = np.arange(n)
+    chunk = max(1, MAX_CELLS // n)
+
+    for lo in range(0, z, chunk):
+        hi = min(lo + chunk, z)
+        p, d, t, s = proximal[lo:hi, None], distal[lo:hi, None], target[lo:hi, None], start_idx[lo:hi, None]
+
+        filled, fill = _first_true((bars >= s) & (low <= p))
+        window_end = np.full(hi - lo, n - 1) if max_holding_bars is None else np.minimum(fill + max_holding_bars, n - 1)
+        in_trade = (bars >= fill[:, None]) & (bars <= window_end[:, None]) & filled[:, None]
+
+        stopped, stop_at = _first_true(in_trade & (low <= d))
+        hit, target_at = _first_true(in_trade & (bars > fill[:, None]) & (high >= t))
+
+        is_stop = stopped & (~hit | (stop_at <= target_at))
+        is_target = hit & ~is_stop
+        is_open = filled & ~is_stop & ~is_target
+
+        o = np.where(is_stop, OUTCOME_STOP, np.where(is_target, OUTCOME_TARGET, np.where(is_open, OUTCOME_OPEN, OUTCOME_NOT_FILLED)))
+        x = np.where(is_stop, stop_at, np.where(is_target, target_at, np.where(is_open, window_end, -1)))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            open_r = (close[np.clip(x, 0, n - 1)] - proximal[lo:hi]) / risk[lo:hi]
+        outcome[lo:hi] = o
+        exit_idx[lo:hi] = x
+        entry_idx[lo:hi] = np.where(filled, fill, -1)
+        r[lo:hi] = np.where(is_stop, -1.0, np.where(is_target, r_multiple, np.where(is_open, open_r, np.nan)))
+
+    holding = np.where(
+        outcome != OUTCOME_NOT_FILLED,
+        (times[np.clip(exit_idx, 0, n - 1)] - times[np.clip(entry_idx, 0, n - 1)]) / 1e9,
+        np.nan
+    )
+    return {"outcome": outcome, "r": r, "entry_idx": entry_idx, "exit_idx": exit_idx, "holding_seconds": holding}
+
+
+def backtest_ticker(candles: Dict[str, np.ndarray], zones: Dict[str, np.ndarray], r_multiple: float,
+                    max_holding_bars: Optional[int]) -> Dict[str, np.ndarray]:
+    """Simulate the zone columns of one (ticker, timeframe) against its candle arrays."""
+    start_idx = np.searchsorted(candles["times"], zones["end_ns"], side="right")
+    return simulate_zones(
+        candles["times"], candles["high"], candles["low"], candles["close"],
+        zones["proximal"], zones["distal"], start_idx, r_multiple, max_holding_bars
+    )
+
+
+# Candles of every (ticker, timeframe) group, mapped from shared memory by _init_worker
+_CANDLES: Dict[tuple, Dict[str, np.ndarray]] = {}
+
+
+def _init_worker(descriptor: Dict) -> None:
+    global _CANDLES
+    _CANDLES = attach_arrays(descriptor)
+
+
+def backtest_group(key: tuple, zones: Dict[str, np.ndarray], r_multiple: float,
+                   max_holding_bars: Optional[int]) -> Dict[str, np.ndarray]:
+    """Process-pool entry point: zone columns of one (ticker, timeframe) against its shared candles."""
+    return backtest_ticker(_CANDLES[key], zones, r_multiple, max_holding_bars)
+
+
+def _summarize(rows: List[Dict]) -> Dict:
+    filled = [row for row in rows if row["outcome"] != OUTCOME_NOT_FILLED]
+    closed = [row for row in filled if row["outcome"] in (OUTCOME_TARGET, OUTCOME_STOP)]
+    wins = sum(1 for row in closed if row["outcome"] == OUTCOME_TARGET)
+    holding = [row["holding_seconds"] for row in closed]
+    return {
+        "zones": len(rows),
+        "filled": len(filled),
+        "targets": wins,
+        "stops": len(closed) - wins,
+        "open": len(filled) - len(closed),
+        "hit_rate": round(wins / len(closed), 4) if closed else None,
+        "expectancy_r": round(float(np.mean([row["r"] for row in closed])), 4) if closed else None,
+        "avg_holding_days": round(float(np.mean(holding)) / 86400, 2) if holding else None,
+    }
+
+
+def build_report(rows: List[Dict]) -> Dict:
+    report = {"overall": _summarize(rows), "by": {}}
+    for field in BREAKDOWNS:
+        groups: Dict = {}
+        for row in rows:
+            groups.setdefault(row[field], []).append(row)
+        report["by"][field] = {str(key): _summarize(group) for key, group in sorted(groups.items(), key=lambda g: str(g[0]))}
+    return report
+
+
+async def run_backtest(
+    tickers: Optional[List[str]] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    r_multiple: float = 2.0,
+    max_holding_bars: Optional[int] = None,
+    workers: Optional[int] = None,
+    db_collection: AsyncIOMotorCollection = collection
+) -> Dict:
+    """
+    Backtest stored zones and report hit rate, expectancy and holding time,
+    overall and broken down by pattern, timeframe, base candles, score bucket
+    and freshness.
+
+    Zones are held in a ZoneTable and grouped by (ticker, timeframe); candles are
+    loaded once per group through the candle store and published to shared
+    memory, and every group's zone columns are simulated in one array pass on a
+    process pool whose workers map the candles instead of receiving copies.
+    """
+    started = time.perf_counter()
+    query = {"merged_into": None}
+    if tickers:
+        query["ticker"] = {"$in": tickers}
+    if start_date or end_date:
+        query["timestamp"] = {}
+        if start_date:
+            query["timestamp"]["$gte"] = start_date.isoformat()
+        if end_date:
+            query["timestamp"]["$lt"] = end_date.isoformat()
+    projection = {"_id": 0, "coinciding_lower_zones": 0}
+    table = ZoneTable.from_dicts(await db_collection.find(query, projection).to_list(length=None))
+    end_date = end_date or datetime.now().date() + timedelta(days=1)
+
+    groups = table.group_by("ticker", "timeframe")
+    logger.info(f"Backtesting {len(table)} zones in {len(groups)} ticker/timeframe groups")
+
+    semaphore = asyncio.Semaphore(16)
+
+    async def load(ticker: str, timeframe: str, group: ZoneTable):
+        first = pd.Timestamp(int(group["timestamp"].min()), tz="UTC").date()
+        async with semaphore:
+            try:
+                data = await asyncio.to_thread(get_candles, ticker, first, end_date, timeframe)
+            except Exception as e:
+                logger.error(f"Error loading candles for {ticker} ({timeframe}): {str(e)}")
+                return None
+        return None if data is None else candle_arrays(data)
+
+    keys = list(groups)
+    candles = await asyncio.gather(*(load(t, tf, groups[(t, tf)]) for t, tf in keys))
+    load_seconds = time.perf_counter() - started
+
+    loop = asyncio.get_running_loop()
+    rows: List[Dict] = []
+    loaded = {key: arrays for key, arrays in zip(keys, candles) if arrays is not None}
+    async with shared_array_pool(loaded, _init_worker, workers or BACKTEST_WORKERS) as (shared, pool):
+        jobs = []
+        for key in shared.descriptor["series"]:
+            group = groups[key]
+            zone_columns = {
+                "proximal": group["proximal_line"],
+                "distal": group["distal_line"],
+                "end_ns": group["end_timestamp"],
+            }
+            jobs.append((key, loop.run_in_executor(pool, backtest_group, key, zone_columns, r_multiple, max_holding_bars)))
+
+        for (ticker, timeframe), job in jobs:
+            result = await job
+            group = groups[(ticker, timeframe)]
+            patterns = group.values("pattern")
+            for i in range(len(group)):
+                rows.append({
+                    "ticker": ticker,
+                    "timeframe": timeframe,
+                    "pattern": patterns[i],
+                    "base_candles": int(group["base_candles"][i]),
+                    "score_bucket": math.floor(group["trade_score"][i]),
+                    "freshness": float(group["freshness"][i]),
+                    "outcome": int(result["outcome"][i]),
+                    "r": float(result["r"][i]),
+                    "holding_seconds": float(result["holding_seconds"][i]),
+                })
+
+    report = build_report(rows)
+    report["r_multiple"] = r_multiple
+    report["timings"] = {
+        "load_candles": round(load_seconds, 3),
+        "total": round(time.perf_counter() - started, 3),
+    }
+    logger.info(f"Backtest finished in {report['timings']['total']}s: {report['overall']}")
+    return report
@@ -0,0 +1,229 @@
+import os
+import time
+import asyncio
+import logging
+import multiprocessing
+import numpy as np
+import pandas as pd
+from contextlib import asynccontextmanager
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+from multiprocessing import shared_memory
+from typing import AsyncIterator, Callable, Dict, Hashable, Optional, Tuple
+from app.services.services import fetch_stock_data
+from app.utils.trading_calendar import trading_calendar, IST
+from app.utils.byte_lru import ByteLRU, frame_nbytes
+from app.utils.metrics import Gauge
+
+logger = logging.getLogger(__name__)
+
+# Bars of the running session can still change, so a cached series that
+# reaches today is re-fetched from its last bar once it is older than this.
+LIVE_TTL_SECONDS = float(os.environ.get("CANDLE_LIVE_TTL", 60))
+# Batch jobs load the whole universe through the store; least recently used series go first
+CANDLE_STORE_MAX_BYTES = int(os.environ.get("CANDLE_STORE_MAX_BYTES", 256 * 1024 * 1024))
+
+CANDLE_STORE_BYTES = Gauge("candle_store_bytes", "Memory held by the in-process candle store")
+
+# (ticker, interval) -> {"data": DataFrame, "start": date, "end": date, "fetched_at": float}
+_candles: ByteLRU[Dict] = ByteLRU(CANDLE_STORE_MAX_BYTES, lambda entry: frame_nbytes(entry["data"]), CANDLE_STORE_BYTES)
+
+
+def _key(ticker: str, interval: str) -> Tuple[str, str]:
+    ticker = ticker.upper()
+    if ticker.endswith(".NS"):
+        ticker = ticker[:-3]
+    return ticker, interval
+
+
+def _slice(data: pd.DataFrame, start_date: date, end_date: date) -> Optional[pd.DataFrame]:
+    dates = data.index.date
+    sliced = data[(dates >= start_date) & (dates < end_date)]
+    return None if sliced.empty else sliced
+
+
+def _missing_bars(data: pd.DataFrame, since: date, end_date: date, interval: str) -> int:
+    """Bars the provider should have in [since, end_date) by now that `data` does not hold."""
+    stored = int((data.index.date >= since).sum())
+    return trading_calendar.expected_bars(since, end_date, interval) - stored
+
+
+def get_candles(ticker: str, start_date: date, end_date: date, interval: str) -> Optional[pd.DataFrame]:
+    """
+    Return OHLC candles for [start_date, end_date), served from the in-process store.
+
+    The first request for a (ticker, interval) fetches from the provider; later
+    requests reuse the stored series and only fetch what is missing: the tail
+    beyond the stored range (re-fetched from the last stored bar so a partial bar
+    is replaced) or, if an earlier start is asked for, the whole widened range.
+    The trading calendar decides whether the tail can hold anything new: the
+    bars it expects from the last stored session on are compared with the bars
+    stored, so a complete series is extended without a provider call, and a
+    short one (fetched mid-session, or cut off by the provider) is re-fetched
+    from its last bar once LIVE_TTL_SECONDS have passed. A series reaching
+    today is also refreshed after that TTL while the market has been open,
+    since its last bar may still be changing.
+
+    Returns:
+        DataFrame indexed by timestamp, or None when the provider has no data.
+    """
+    key = _key(ticker, interval)
+    entry = _candles.get(key)
+
+    today = datetime.now().date()
+    if entry is None or start_date < entry["start"]:
+        fetch_end = max(end_date, entry["end"]) if entry else end_date
+        data = fetch_stock_data(ticker, start_date, fetch_end, interval)
+        if data is None:
+            return None
+        entry = {"data": data, "start": start_date, "end": fetch_end, "fetched_at": time.time()}
+    else:
+        fetch_end = max(end_date, entry["end"])
+        tail_start = entry["data"].index[-1].date()
+        missing = _missing_bars(entry["data"], tail_start, fetch_end, interval)
+        extends = end_date > entry["end"] and missing > 0
+        is_stale = time.time() - entry["fetched_at"] > LIVE_TTL_SECONDS and (
+            missing > 0
+            or (entry["end"] > today
+                and trading_calendar.was_open_between(datetime.fromtimestamp(entry["fetched_at"], IST)))
+        )
+        if extends or is_stale:
+            logger.info(f"Extending {key[0]} ({interval}) candles from {tail_start} to {fetch_end}")
+            tail = fetch_stock_data(ticker, tail_start, fetch_end, interval)
+            data = entry["data"]
+            if tail is not None:
+                data = pd.concat([data, tail])
+                data = data[~data.index.duplicated(keep="last")].sort_index()
+            entry = {"data": data, "start": entry["start"], "end": fetch_end, "fetched_at": time.time()}
+        elif end_date > entry["end"]:
+            entry = {**entry, "end": end_date}
+
+    _candles.put(key, entry)
+    return _slice(entry["data"], start_date, end_date)
+
+
+def clear_candles(ticker: Optional[str] = None, interval: Optional[str] = None) -> None:
+    """Drop stored candles, optionally only for one ticker and/or interval."""
+    for key in _candles.keys():
+        if (ticker is None or key[0] == _key(ticker, "")[0]) and (interval is None or key[1] == interval):
+            _candles.pop(key)
+
+
+def candle_arrays(data: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """OHLCV columns of a candle frame as NumPy arrays, with UTC epoch nanoseconds as `times`."""
+    index = data.index.tz_convert("UTC") if data.index.tz is not None else data.index
+    arrays = {"times": index.as_unit("ns").asi8.copy()}   # pandas may keep us or s resolution
+    for field in ["Open", "High", "Low", "Close", "Volume"]:
+        arrays[field.lower()] = data[field].to_numpy(dtype=float) if field in data else np.full(len(data), np.nan)
+    return arrays
+
+
+def _aligned(size: int) -> int:
+    return (size + 63) // 64 * 64
+
+
+class SharedArrays:
+    """
+    Many array series packed into one shared memory block.
+
+    Every series must have the same fields. Each field is one contiguous
+    region holding all series back to back, and `descriptor` (block name,
+    field dtypes and offsets, and each series' start and length) is all a
+    worker process needs to map them with `attach_arrays`, so process pools
+    receive a few hundred bytes instead of pickled frames. The creating process
+    owns the block and must `close()` it (or use it as a context manager) once
+    the workers are done.
+    """
+
+    def __init__(self, series: Dict[Hashable, Dict[str, np.ndarray]]):
+        first = next(iter(series.values()), {})
+        fields = {name: np.asarray(values).dtype for name, values in first.items()}
+        lengths = {key: len(next(iter(arrays.values()))) if arrays else 0 for key, arrays in series.items()}
+        total = sum(lengths.values())
+
+        offsets, size = {}, 0
+        for name, dtype in fields.items():
+            offsets[name] = size
+            size += _aligned(total * dtype.itemsize)
+        self._shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+
+        spans, start = {}, 0
+        for key, length in lengths.items():
+            spans[key] = (start, length)
+            start += length
+        for name, dtype in fields.items():
+            region = np.ndarray(total, dtype=dtype, buffer=self._shm.buf, offset=offsets[name])
+            for key, (start, length) in spans.items():
+                region[start:start + length] = series[key][name]
+            del region
+
+        self.descriptor = {
+            "name": self._shm.name,
+            "total": total,
+            "fields": {name: (dtype.str, offsets[name]) for name, dtype in fields.items()},
+            "series": spans,
+        }
+        logger.info(f"Published {len(spans)} series ({total} rows, {size / 1e6:.1f} MB) to shared memory {self._shm.name}")
+
+    @property
+    def nbytes(self) -> int:
+        return self._shm.size
+
+    def close(self) -> None:
+        self._shm.close()
+        self._shm.unlink()
+
+    def __enter__(self) -> "SharedArrays":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+@asynccontextmanager
+async def shared_array_pool(
+    series: Dict[Hashable, Dict[str, np.ndarray]],
+    initializer: Callable[[Dict], None],
+    max_workers: int
+) -> AsyncIterator[Tuple[SharedArrays, ProcessPoolExecutor]]:
+    """
+    `series` published as SharedArrays and a process pool whose workers run
+    `initializer(descriptor)` to map them.
+
+    Workers are spawned rather than forked, so a request does not copy the
+    server with its feed, watchdog and driver threads. On exit, also after a
+    failed job, queued work is cancelled and the pool shutdown and the block's
+    release run in a thread, so the event loop never waits for workers.
+    """
+    shared = SharedArrays(series)
+    pool = None
+    try:
+        pool = ProcessPoolExecutor(
+            max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"),
+            initializer=initializer, initargs=(shared.descriptor,)
+        )
+        yield shared, pool
+    finally:
+        if pool is not None:
+            await asyncio.to_thread(pool.shutdown, wait=True, cancel_futures=True)
+        await asyncio.to_thread(shared.close)
+
+
+# Blocks attached in this process, kept open for the views handed out
+_attached: Dict[str, shared_memory.SharedMemory] = {}
+
+
+def attach_arrays(descriptor: Dict) -> Dict[Hashable, Dict[str, np.ndarray]]:
+    """Map a SharedArrays block into this process; the returned arrays are read-only views, not copies."""
+    shm = _attached.get(descriptor["name"])
+    if shm is None:
+        shm = _attached[descriptor["name"]] = shared_memory.SharedMemory(name=descriptor["name"])
+    columns = {}
+    for name, (dtype, offset) in descriptor["fields"].items():
+        column = np.ndarray(descriptor["total"], dtype=np.dtype(dtype), buffer=shm.buf, offset=offset)
+        column.flags.writeable = False
+        columns[name] = column
+    return {
+        key: {name: column[start:start + length] for name, column in columns.items()}
+        for key, (start, length) in descriptor["series"].items()
+    }
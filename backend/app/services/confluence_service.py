@@ -0,0 +1,150 @@
+import heapq
+import logging
+from bisect import bisect_left, bisect_right, insort
+from datetime import timedelta
+from typing import Dict, List, Optional
+from dateutil import parser
+
+logger = logging.getLogger(__name__)
+
+# Bar length for each supported interval, used to close a higher timeframe
+# zone's time window one bar after its leg-out candle.
+INTERVAL_DELTAS = {
+    "1m": timedelta(minutes=1),
+    "2m": timedelta(minutes=2),
+    "5m": timedelta(minutes=5),
+    "15m": timedelta(minutes=15),
+    "30m": timedelta(minutes=30),
+    "60m": timedelta(hours=1),
+    "90m": timedelta(minutes=90),
+    "1h": timedelta(hours=1),
+    "1d": timedelta(days=1),
+    "5d": timedelta(days=5),
+    "1wk": timedelta(weeks=1),
+    "1mo": timedelta(days=31),
+    "3mo": timedelta(days=92),
+}
+
+DEFAULT_TIMEFRAMES = ["1wk", "1d", "1h", "15m"]
+
+
+def _epoch(timestamp: str) -> float:
+    return parser.parse(timestamp).timestamp()
+
+
+def link_zones(parents: List[Dict], children: List[Dict], parent_interval: str) -> Dict[str, List[Dict]]:
+    """
+    Nest lower timeframe zones under the higher timeframe zones that contain them.
+
+    A child belongs to a parent when its [distal_line, proximal_line] band lies
+    inside the parent's band and its candles fall inside the parent's time window
+    (leg-in of the parent up to one parent bar after the leg-out). Both lists are
+    sorted once and swept in time order while the open parent windows are kept
+    sorted by distal line, so a child is only compared with parents whose
+    window is open and whose distal line is at or below its own, tightest first.
+    That is a handful of parents when few windows overlap in time, but the
+    worst case (many open windows below the child's proximal line, or ending
+    before it) is still O(H x L) comparisons.
+    When several parents qualify, the tightest one (highest distal line) wins.
+
+    Args:
+        parents: Higher timeframe zone dicts.
+        children: Lower timeframe zone dicts. Matched children get `parent_zone_id` set.
+        parent_interval: Interval of the parent zones (e.g. '1d').
+
+    Returns:
+        Dictionary mapping parent zone_id to its list of child zone dicts.
+    """
+    bar_seconds = INTERVAL_DELTAS.get(parent_interval, timedelta(0)).total_seconds()
+
+    windows = sorted(
+        (
+            (_epoch(p["start_timestamp"]), _epoch(p["end_timestamp"]) + bar_seconds, seq, p)
+            for seq, p in enumerate(parents)
+        ),
+        key=lambda w: w[0]
+    )
+    ordered_children = sorted(
+        ((_epoch(c["start_timestamp"]), _epoch(c["end_timestamp"]), c) for c in children),
+        key=lambda c: c[0]
+    )
+
+    mapping: Dict[str, List[Dict]] = {}
+    active_keys: List[tuple] = []      # (distal_line, seq), kept sorted
+    active: Dict[int, tuple] = {}      # seq -> (window_end, parent)
+    expiry: List[tuple] = []           # heap of (window_end, distal_line, seq)
+    next_window = 0
+
+    for child_start, child_end, child in ordered_children:
+        # Open every parent window that has started by now
+        while next_window < len(windows) and windows[next_window][0] <= child_start:
+            _, window_end, seq, parent = windows[next_window]
+            insort(active_keys, (parent["distal_line"], seq))
+            active[seq] = (window_end, parent)
+            heapq.heappush(expiry, (window_end, parent["distal_line"], seq))
+            next_window += 1
+
+        # Close windows that ended before this child started
+        while expiry and expiry[0][0] < child_start:
+            _, distal, seq = heapq.heappop(expiry)
+            del active_keys[bisect_left(active_keys, (distal, seq))]
+            del active[seq]
+
+        # Parents with distal <= child distal, scanned from the tightest band down
+        pos = bisect_right(active_keys, (child["distal_line"], float("inf")))
+        for k in range(pos - 1, -1, -1):
+            window_end, parent = active[active_keys[k][1]]
+            if parent["proximal_line"] >= child["proximal_line"] and child_end <= window_end:
+                child["parent_zone_id"] = parent["zone_id"]
+                mapping.setdefault(parent["zone_id"], []).append(child)
+                break
+
+    return mapping
+
+
+def build_confluence(zones_by_timeframe: Dict[str, List[Dict]], timeframes: Optional[List[str]] = None) -> List[Dict]:
+    """
+    Link zones across an ordered chain of timeframes (e.g. 1wk -> 1d -> 1h -> 15m).
+
+    Each level is joined to the level directly above it with `link_zones`. Every
+    top-level zone collects all of its descendants in `coinciding_lower_zones`;
+    the exact nesting is kept through each descendant's `parent_zone_id`.
+
+    Args:
+        zones_by_timeframe: Dictionary mapping interval to the zone dicts found on it.
+        timeframes: Intervals ordered from highest to lowest. Defaults to DEFAULT_TIMEFRAMES.
+
+    Returns:
+        List of top-level (highest timeframe) zone dicts.
+    """
+    timeframes = timeframes or DEFAULT_TIMEFRAMES
+    for tf in timeframes:
+        for zone in zones_by_timeframe.get(tf, []):
+            zone.setdefault("timeframe", tf)
+            zone.setdefault("coinciding_lower_zones", [])
+
+    for higher_tf, lower_tf in zip(timeframes, timeframes[1:]):
+        mapping = link_zones(
+            zones_by_timeframe.get(higher_tf, []),
+            zones_by_timeframe.get(lower_tf, []),
+            higher_tf
+        )
+        logger.info(f"Linked {sum(len(v) for v in mapping.values())} {lower_tf} zones "
+                    f"under {len(mapping)} {higher_tf} zones")
+
+    # Flatten every chain of descendants onto its top-level ancestor
+    by_id = {
+        zone["zone_id"]: zone
+        for tf in timeframes
+        for zone in zones_by_timeframe.get(tf, [])
+    }
+    top_level = zones_by_timeframe.get(timeframes[0], [])
+    for tf in timeframes[1:]:
+        for zone in zones_by_timeframe.get(tf, []):
+            ancestor = zone
+            while ancestor.get("parent_zone_id") in by_id:
+                ancestor = by_id[ancestor["parent_zone_id"]]
+            if ancestor is not zone and ancestor.get("timeframe") == timeframes[0]:
+                ancestor["coinciding_lower_zones"].append(zone)
+
+    return top_level
@@ -0,0 +1,245 @@
+import io
+import os
+import csv
+import time
+import asyncio
+import logging
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from dateutil import parser
+from motor.motor_asyncio import AsyncIOMotorCollection
+from app.db.database import collection, trade_collection
+from app.utils.metrics import observe_stage
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:   # Parquet export is optional; CSV needs nothing extra
+    pa = pq = None
+
+logger = logging.getLogger(__name__)
+
+EXPORT_BATCH_SIZE = int(os.environ.get("EXPORT_BATCH_SIZE", 5000))
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+# (field, type) in output order; "list" columns are ";"-joined in CSV
+ZONE_COLUMNS: List[Tuple[str, str]] = [
+    ("zone_id", "str"), ("ticker", "str"), ("timeframes", "list"), ("pattern", "str"),
+    ("proximal_line", "float"), ("distal_line", "float"), ("trade_score", "float"),
+    ("freshness", "float"), ("base_candles", "float"), ("timestamp", "str"),
+    ("end_timestamp", "str"), ("parent_zone_id", "str"), ("merged_into", "str"),
+]
+TRADE_COLUMNS: List[Tuple[str, str]] = [
+    ("_id", "str"), ("symbol", "str"), ("trade_type", "str"), ("status", "str"),
+    ("entry_price", "float"), ("stop_loss", "float"), ("target_price", "float"),
+    ("created_at", "datetime"), ("verified", "bool"), ("outcome", "str"),
+    ("exit_time", "datetime"), ("exit_price", "float"), ("realized_r", "float"),
+    ("alert_sent", "bool"), ("entry_alert_sent", "bool"), ("note", "str"),
+]
+
+
+def parquet_available() -> bool:
+    return pq is not None
+
+
+def export_headers(name: str, fmt: str) -> Tuple[str, Dict[str, str]]:
+    """Media type and attachment headers of a `name` export in `fmt`."""
+    media_type, extension = EXPORT_FORMATS[fmt]
+    filename = f"{name}-{datetime.utcnow():%Y%m%d-%H%M%S}.{extension}"
+    return media_type, {"Content-Disposition": f'attachment; filename="{filename}"'}
+
+
+def _date_range(start_date: Optional[str], end_date: Optional[str], as_string: bool) -> Dict:
+    bounds = {}
+    if start_date:
+        start = parser.parse(start_date)
+        bounds["$gte"] = start.isoformat() if as_string else start
+    if end_date:
+        end = parser.parse(end_date)
+        bounds["$lte"] = end.isoformat() if as_string else end
+    return bounds
+
+
+def zone_export_query(tickers: Optional[List[str]] = None, timeframe: Optional[str] = None,
+                      pattern: Optional[str] = None, start_date: Optional[str] = None,
+                      end_date: Optional[str] = None, include_merged: bool = False) -> Dict:
+    """Filters of /zones/export, matching those of the zone list endpoints. Raises ValueError on bad dates."""
+    query = {}
+    if not include_merged:
+        query["merged_into"] = None
+    if tickers:
+        query["ticker"] = {"$in": [t.strip().upper() for t in tickers]}
+    if timeframe:
+        query["timeframes"] = timeframe.lower()
+    if pattern:
+        query["pattern"] = pattern.upper()
+    timestamp = _date_range(start_date, end_date, as_string=True)   # zone timestamps are stored as ISO strings
+    if timestamp:
+        query["timestamp"] = timestamp
+    return query
+
+
+def trade_export_query(symbol: Optional[str] = None, status: Optional[str] = None,
+                       start_date: Optional[str] = None, end_date: Optional[str] = None) -> Dict:
+    """Filters of /trades/export on symbol, status and `created_at`. Raises ValueError on bad dates."""
+    query = {}
+    if symbol:
+        query["symbol"] = {"$regex": symbol, "$options": "i"}
+    if status:
+        query["status"] = status
+    created_at = _date_range(start_date, end_date, as_string=False)
+    if created_at:
+        query["created_at"] = created_at
+    return query
+
+
+async def iter_batches(db_collection: AsyncIOMotorCollection, query: Dict, columns: List[Tuple[str, str]],
+                       batch_size: int = EXPORT_BATCH_SIZE) -> AsyncIterator[List[Dict]]:
+    """
+    Documents matching `query` in lists of `batch_size`, fetched through one
+    cursor. Only the exported fields are projected and the order is `_id`,
+    which MongoDB walks by index instead of sorting the whole result.
+    """
+    projection = {field: 1 for field, _ in columns}
+    cursor = db_collection.find(query, projection).sort("_id", 1).batch_size(batch_size)
+    batch = []
+    async for doc in cursor:
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _csv_value(value, kind: str):
+    if value is None:
+        return ""
+    if kind == "list":
+        return ";".join(str(v) for v in value) if isinstance(value, list) else str(value)
+    if kind == "datetime" and isinstance(value, datetime):
+        return value.isoformat()
+    return value if kind in ("float", "bool") else str(value)
+
+
+def _csv_chunk(batch: List[Dict], columns: List[Tuple[str, str]], header: bool) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow([field for field, _ in columns])
+    for doc in batch:
+        writer.writerow([_csv_value(doc.get(field), kind) for field, kind in columns])
+    return buffer.getvalue().encode("utf-8")
+
+
+def _arrow_schema(columns: List[Tuple[str, str]]):
+    types = {"str": pa.string(), "float": pa.float64(), "bool": pa.bool_(),
+             "datetime": pa.timestamp("us"), "list": pa.list_(pa.string())}
+    return pa.schema([(field, types[kind]) for field, kind in columns])
+
+
+def _arrow_value(value, kind: str):
+    if value is None:
+        return None
+    if kind == "str":
+        return str(value)
+    if kind == "float":
+        return float(value)
+    if kind == "bool":
+        return bool(value)
+    if kind == "list":
+        return [str(v) for v in value] if isinstance(value, list) else [str(value)]
+    if kind == "datetime" and not isinstance(value, datetime):
+        return parser.parse(str(value))
+    return value
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file for ParquetWriter whose bytes are taken out after every row group."""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def drain(self) -> bytes:
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+
+async def stream_csv(batches: AsyncIterator[List[Dict]], columns: List[Tuple[str, str]]) -> AsyncIterator[bytes]:
+    """CSV with a header row, one chunk per batch; rows are formatted off the event loop."""
+    header = True
+    async for batch in batches:
+        yield await asyncio.to_thread(_csv_chunk, batch, columns, header)
+        header = False
+    if header:
+        yield _csv_chunk([], columns, header=True)
+
+
+async def stream_parquet(batches: AsyncIterator[List[Dict]], columns: List[Tuple[str, str]]) -> AsyncIterator[bytes]:
+    """
+    Parquet with one row group per batch. Each row group is sent as soon as it
+    is encoded and only the footer is held until the end, so memory stays at
+    about one batch.
+    """
+    schema = _arrow_schema(columns)
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+
+    def encode(batch: List[Dict]) -> bytes:
+        rows = {field: [_arrow_value(doc.get(field), kind) for doc in batch] for field, kind in columns}
+        writer.write_table(pa.Table.from_pydict(rows, schema=schema))
+        return sink.drain()
+
+    try:
+        async for batch in batches:
+            chunk = await asyncio.to_thread(encode, batch)
+            if chunk:
+                yield chunk
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+async def export_documents(db_collection: AsyncIOMotorCollection, query: Dict, columns: List[Tuple[str, str]],
+                           fmt: str, stage_name: str, batch_size: int = EXPORT_BATCH_SIZE) -> AsyncIterator[bytes]:
+    """Bytes of the `fmt` export of the documents matching `query`, for a streaming response."""
+    started = time.perf_counter()
+    rows = 0
+
+    async def counted() -> AsyncIterator[List[Dict]]:
+        nonlocal rows
+        async for batch in iter_batches(db_collection, query, columns, batch_size):
+            rows += len(batch)
+            yield batch
+
+    stream = stream_parquet if fmt == "parquet" else stream_csv
+    async for chunk in stream(counted(), columns):
+        yield chunk
+    seconds = time.perf_counter() - started
+    observe_stage(stage_name, seconds, items=rows)
+    logger.info(f"Exported {rows} documents as {fmt} in {seconds:.1f}s")
+
+
+def export_zones(query: Dict, fmt: str, db_collection: AsyncIOMotorCollection = collection) -> AsyncIterator[bytes]:
+    return export_documents(db_collection, query, ZONE_COLUMNS, fmt, "zone_export")
+
+
+def export_trades(query: Dict, fmt: str, db_collection: AsyncIOMotorCollection = trade_collection) -> AsyncIterator[bytes]:
+    return export_documents(db_collection, query, TRADE_COLUMNS, fmt, "trade_export")
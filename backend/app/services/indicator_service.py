@@ -0,0 +1,146 @@
+import os
+import logging
+import pandas as pd
+from typing import Callable, Dict, List, Optional, Tuple
+from app.utils.byte_lru import ByteLRU, frame_nbytes
+from app.utils.metrics import Gauge
+
+logger = logging.getLogger(__name__)
+
+
+def ema(data: pd.DataFrame, period: int = 125) -> pd.Series:
+    return data["Close"].ewm(span=period, adjust=False).mean()
+
+
+def sma(data: pd.DataFrame, period: int = 20) -> pd.Series:
+    return data["Close"].rolling(period).mean()
+
+
+def true_range(data: pd.DataFrame) -> pd.Series:
+    prev_close = data["Close"].shift(1)
+    ranges = pd.concat([
+        data["High"] - data["Low"],
+        (data["High"] - prev_close).abs(),
+        (data["Low"] - prev_close).abs()
+    ], axis=1)
+    return ranges.max(axis=1)
+
+
+def atr(data: pd.DataFrame, period: int = 14) -> pd.Series:
+    # Wilder smoothing
+    return true_range(data).ewm(alpha=1 / period, adjust=False).mean()
+
+
+def _extend_ewm(values: pd.Series, seed: pd.Series, alpha: float) -> pd.Series:
+    # Seeding adjust=False smoothing with the last known value continues the
+    # recursion exactly where the cached series stopped.
+    return pd.concat([seed.iloc[-1:], values]).ewm(alpha=alpha, adjust=False).mean().iloc[1:]
+
+
+def _extend_ema(data: pd.DataFrame, cached: pd.Series, pos: int, period: int = 125) -> pd.Series:
+    return _extend_ewm(data["Close"].iloc[pos:], cached, 2 / (period + 1))
+
+
+def _extend_atr(data: pd.DataFrame, cached: pd.Series, pos: int, period: int = 14) -> pd.Series:
+    # One extra candle in front supplies the previous close for the first true range
+    ranges = true_range(data.iloc[max(pos - 1, 0):])
+    return _extend_ewm(ranges.iloc[1:] if pos > 0 else ranges, cached, 1 / period)
+
+
+def _extend_sma(data: pd.DataFrame, cached: pd.Series, pos: int, period: int = 20) -> pd.Series:
+    window_start = max(pos - period + 1, 0)
+    return data["Close"].iloc[window_start:].rolling(period).mean().iloc[pos - window_start:]
+
+
+# name -> (full computation, incremental extension)
+INDICATORS: Dict[str, Tuple[Callable, Callable]] = {
+    "ema": (ema, _extend_ema),
+    "sma": (sma, _extend_sma),
+    "atr": (atr, _extend_atr),
+}
+
+INDICATOR_CACHE_MAX_BYTES = int(os.environ.get("INDICATOR_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+
+INDICATOR_CACHE_BYTES = Gauge("indicator_cache_bytes", "Memory held by cached indicator series")
+
+# (ticker, interval, indicator, params) -> series over every candle seen so far
+_cache: ByteLRU[pd.Series] = ByteLRU(INDICATOR_CACHE_MAX_BYTES, frame_nbytes, INDICATOR_CACHE_BYTES)
+
+
+def get_indicator(ticker: str, interval: str, name: str, data: pd.DataFrame, **params) -> pd.Series:
+    """
+    Return indicator `name` for the candles in `data`, aligned to `data.index`.
+
+    Results are cached per (ticker, interval, indicator, params). The cache is
+    only used for `data` starting at the cached series' first candle, since
+    smoothed indicators depend on where their warm-up began, so the result is
+    always `full(data)`. When `data` carries candles newer than the cached
+    series, only the new tail is computed from the last cached state; the last
+    cached bar is recomputed too since it may have been a partial bar. A
+    series shorter than the cached one never replaces it.
+    """
+    full, extend = INDICATORS[name]
+    key = (ticker.upper(), interval, name, tuple(sorted(params.items())))
+    cached = _cache.get(key)
+    same_start = cached is not None and len(cached) > 1 and cached.index[0] == data.index[0]
+
+    if same_start and data.index[-1] <= cached.index[-1]:
+        return cached.reindex(data.index)
+    if same_start and cached.index[-1] in data.index:
+        pos = data.index.get_loc(cached.index[-1])
+        head = cached.iloc[:-1]
+        series = pd.concat([head, extend(data, head, pos, **params)])
+    else:
+        series = full(data, **params)
+
+    if cached is None or len(series) >= len(cached):
+        _cache.put(key, series)
+    return series.reindex(data.index)
+
+
+def apply_indicator_filters(
+    zones: List[Dict],
+    data: pd.DataFrame,
+    ticker: str,
+    interval: str,
+    ema_period: Optional[int] = None,
+    min_legout_atr_multiple: Optional[float] = None,
+    atr_period: int = 14
+) -> List[Dict]:
+    """
+    Keep only zones that pass the optional trend and strength filters.
+
+    Args:
+        zones: Zone dicts detected on `data`.
+        data: Candles the zones were detected on.
+        ema_period: If set, the zone's distal line must sit above this EMA at the leg-out candle.
+        min_legout_atr_multiple: If set, the leg-out body must be at least this many ATRs
+            (ATR as of the candle before the leg-out).
+        atr_period: ATR lookback used by `min_legout_atr_multiple`.
+    """
+    if not zones or (ema_period is None and min_legout_atr_multiple is None):
+        return zones
+
+    ema_values = get_indicator(ticker, interval, "ema", data, period=ema_period) if ema_period else None
+    atr_values = get_indicator(ticker, interval, "atr", data, period=atr_period) if min_legout_atr_multiple else None
+
+    filtered = []
+    for zone in zones:
+        try:
+            pos = data.index.get_loc(pd.Timestamp(zone["end_timestamp"]))
+        except KeyError:
+            logger.warning(f"Leg-out candle {zone['end_timestamp']} not in data for {ticker}, keeping zone unfiltered")
+            filtered.append(zone)
+            continue
+
+        if ema_values is not None and not zone["distal_line"] > ema_values.iloc[pos]:
+            continue
+        if atr_values is not None and pos > 0:
+            leg_out = data.iloc[pos]
+            body = abs(leg_out["Close"] - leg_out["Open"])
+            if not body >= min_legout_atr_multiple * atr_values.iloc[pos - 1]:
+                continue
+        filtered.append(zone)
+
+    logger.info(f"Indicator filters kept {len(filtered)} of {len(zones)} zones for {ticker} ({interval})")
+    return filtered
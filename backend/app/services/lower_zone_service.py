@@ -0,0 +1,122 @@
+import time
+import logging
+from typing import Dict, List, Optional
+from pymongo import UpdateOne, DeleteMany
+from motor.motor_asyncio import AsyncIOMotorCollection
+from app.db.database import collection, lower_zone_collection
+from app.models.zone_models import LowerZone
+from app.models.zone_table import zone_timeframe
+
+logger = logging.getLogger(__name__)
+
+MIGRATION_BATCH_SIZE = 200
+
+
+def lower_zone_docs(parent_zone_id: str, ticker: str, lower_zones: List) -> List[Dict]:
+    """Documents for the lower_zones collection, linked to their parent and carrying ticker and timeframe."""
+    docs = []
+    for lower_zone in lower_zones:
+        doc = (lower_zone if isinstance(lower_zone, LowerZone) else LowerZone(**lower_zone)).model_dump()
+        doc["parent_zone_id"] = parent_zone_id
+        doc["ticker"] = doc.get("ticker") or ticker
+        doc["timeframe"] = doc.get("timeframe") or zone_timeframe(doc)
+        docs.append(doc)
+    return docs
+
+
+def replace_lower_zones_operations(parent_zone_id: str, docs: List[Dict]) -> List:
+    """
+    Bulk operations making `docs` the parent's whole set of lower zones:
+    upserts by (parent, zone_id), and removal of the parent's other lower zones.
+    Unchanged lower zones are matched but not rewritten.
+    """
+    operations = [
+        UpdateOne({"parent_zone_id": parent_zone_id, "zone_id": doc["zone_id"]}, {"$set": doc}, upsert=True)
+        for doc in docs
+    ]
+    operations.append(DeleteMany({"parent_zone_id": parent_zone_id, "zone_id": {"$nin": [doc["zone_id"] for doc in docs]}}))
+    return operations
+
+
+async def attach_lower_zones(zones: List[Dict], lower_collection: AsyncIOMotorCollection = lower_zone_collection) -> List[Dict]:
+    """Fill `coinciding_lower_zones` of `zones` with one query, in timestamp order."""
+    if not zones:
+        return zones
+    by_parent: Dict[str, List[Dict]] = {zone["zone_id"]: [] for zone in zones}
+    cursor = lower_collection.find({"parent_zone_id": {"$in": list(by_parent)}}, {"_id": 0}).sort("timestamp", 1)
+    for doc in await cursor.to_list(length=None):
+        by_parent[doc["parent_zone_id"]].append(doc)
+    for zone in zones:
+        zone["coinciding_lower_zones"] = by_parent[zone["zone_id"]]
+    return zones
+
+
+async def get_lower_zones(
+    parent_zone_id: Optional[str] = None,
+    ticker: Optional[str] = None,
+    timeframe: Optional[str] = None,
+    page: int = 1,
+    limit: int = 50,
+    lower_collection: AsyncIOMotorCollection = lower_zone_collection
+) -> Dict:
+    """
+    Lower timeframe zones on their own, by parent or by ticker and timeframe,
+    newest first.
+
+    Returns:
+        Dictionary with the page of lower zones, total count, page and total pages.
+    """
+    query = {}
+    if parent_zone_id:
+        query["parent_zone_id"] = parent_zone_id
+    if ticker:
+        query["ticker"] = ticker.strip().upper()
+    if timeframe:
+        query["timeframe"] = timeframe.lower()
+
+    total = await lower_collection.count_documents(query)
+    cursor = lower_collection.find(query, {"_id": 0}).sort("timestamp", -1).skip((page - 1) * limit).limit(limit)
+    zones = await cursor.to_list(length=limit)
+    logger.info(f"Retrieved {len(zones)} lower zones (page {page}, limit {limit})")
+    return {
+        "data": [LowerZone(**zone).model_dump() for zone in zones],
+        "total": total,
+        "page": page,
+        "total_pages": (total + limit - 1) // limit
+    }
+
+
+async def migrate_embedded_lower_zones(
+    db_collection: AsyncIOMotorCollection = collection,
+    lower_collection: AsyncIOMotorCollection = lower_zone_collection,
+    batch_size: int = MIGRATION_BATCH_SIZE
+) -> int:
+    """
+    Move `coinciding_lower_zones` arrays still embedded in zone documents to
+    the lower_zones collection and drop the arrays. Safe to repeat: a parent
+    only loses its array after its lower zones are written.
+
+    Returns:
+        Number of parent zones migrated.
+    """
+    started = time.perf_counter()
+    query = {"coinciding_lower_zones": {"$exists": True}}
+    projection = {"_id": 0, "zone_id": 1, "ticker": 1, "coinciding_lower_zones": 1}
+    migrated = 0
+    while True:
+        parents = await db_collection.find(query, projection).limit(batch_size).to_list(length=batch_size)
+        if not parents:
+            break
+        operations = []
+        for parent in parents:
+            ticker = parent.get("ticker") or parent["zone_id"].split("-")[0]
+            docs = lower_zone_docs(parent["zone_id"], ticker, parent.get("coinciding_lower_zones") or [])
+            operations.extend(replace_lower_zones_operations(parent["zone_id"], docs))
+        await lower_collection.bulk_write(operations, ordered=False)
+        parent_ids = [parent["zone_id"] for parent in parents]
+        await db_collection.update_many({"zone_id": {"$in": parent_ids}}, {"$unset": {"coinciding_lower_zones": ""}})
+        migrated += len(parents)
+    if migrated:
+        logger.info(f"Moved embedded lower zones of {migrated} zones to their own collection "
+                    f"in {time.perf_counter() - started:.1f}s")
+    return migrated
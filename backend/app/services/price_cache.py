@@ -0,0 +1,144 @@
+import os
+import sys
+import time
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from app.services.quote_service import download_quotes
+from app.utils.trading_calendar import trading_calendar, IST
+from app.utils.byte_lru import ByteLRU
+from app.utils.metrics import Gauge
+
+logger = logging.getLogger(__name__)
+
+QUOTE_CACHE_TTL = float(os.environ.get("QUOTE_CACHE_TTL", 5))
+# Misses arriving within this window are merged into one provider download
+QUOTE_BATCH_WINDOW = float(os.environ.get("QUOTE_BATCH_WINDOW", 0.05))
+# Keys come from clients (any symbol, any date), so least recently used quotes go first
+QUOTE_CACHE_MAX_BYTES = int(os.environ.get("QUOTE_CACHE_MAX_BYTES", 16 * 1024 * 1024))
+
+QUOTE_CACHE_BYTES = Gauge("quote_cache_bytes", "Memory held by cached quotes")
+
+
+def _quote_nbytes(entry: Tuple[Optional[Dict], float]) -> int:
+    quote, _ = entry
+    return sys.getsizeof(entry) + (sys.getsizeof(quote) + sum(sys.getsizeof(v) for v in quote.values()) if quote else 0)
+
+
+class QuoteCache:
+    """
+    Process-wide quote cache keyed by (symbol, date).
+
+    Quotes younger than `ttl` seconds are served from memory, and so are older
+    ones when no session has run since they were fetched (or, for a past date,
+    they were fetched after that day ended). The cache is bounded by memory
+    and drops the least recently used quotes first. Misses are queued
+    for `batch_window` seconds and then fetched together with one batched
+    download, so concurrent requests for overlapping symbol sets share a single
+    provider call. Symbols already being fetched are awaited, never re-fetched.
+    """
+
+    def __init__(self, ttl: float = QUOTE_CACHE_TTL, batch_window: float = QUOTE_BATCH_WINDOW,
+                 max_bytes: int = QUOTE_CACHE_MAX_BYTES):
+        self.ttl = ttl
+        self.batch_window = batch_window
+        # (symbol, date) -> (quote, fetched_at)
+        self._quotes: ByteLRU[Tuple[Optional[Dict], float]] = ByteLRU(max_bytes, _quote_nbytes, QUOTE_CACHE_BYTES)
+        self._pending: Dict[Tuple[str, Optional[str]], asyncio.Future] = {}
+        self._queued: List[Tuple[str, Optional[str]]] = []
+        self._flush_scheduled = False
+        self._tasks = set()
+        self.provider_calls = 0
+
+    async def get_many(self, symbols: List[str], date: Optional[str] = None) -> Dict[str, Dict]:
+        """
+        Return quotes for `symbols` on `date` (None for the latest session).
+
+        Returns:
+            Dictionary mapping symbol to {"ltp", "day_low", "day_high", "age_seconds"};
+            ltp and day_low are None when the provider has no data.
+        """
+        loop = asyncio.get_running_loop()
+        now = time.time()
+        waiting = {}
+        for symbol in symbols:
+            key = (symbol, date)
+            cached = self._quotes.get(key)
+            if cached and self._is_current(date, cached[1], now):
+                continue
+            if key not in self._pending:
+                self._pending[key] = loop.create_future()
+                self._queued.append(key)
+            waiting[symbol] = self._pending[key]
+
+        if self._queued and not self._flush_scheduled:
+            self._flush_scheduled = True
+            loop.call_later(self.batch_window, self._flush)
+
+        if waiting:
+            # Shielded so one client disconnecting does not cancel a shared fetch
+            outcomes = await asyncio.gather(*(asyncio.shield(f) for f in waiting.values()), return_exceptions=True)
+            errors = [outcome for outcome in outcomes if isinstance(outcome, Exception)]
+            if errors:
+                raise errors[0]
+
+        now = time.time()
+        result = {}
+        for symbol in symbols:
+            quote, fetched_at = self._quotes.get((symbol, date)) or (None, now)
+            result[symbol] = {
+                "ltp": quote["ltp"] if quote else None,
+                "day_low": quote["day_low"] if quote else None,
+                "day_high": quote["day_high"] if quote else None,
+                "age_seconds": round(now - fetched_at, 3),
+            }
+        return result
+
+    def _is_current(self, day: Optional[str], fetched_at: float, now: float) -> bool:
+        if now - fetched_at <= self.ttl:
+            return True
+        fetched = datetime.fromtimestamp(fetched_at, IST)
+        if day is not None:
+            return fetched.date().isoformat() > day
+        return not trading_calendar.was_open_between(fetched, datetime.fromtimestamp(now, IST))
+
+    def _flush(self) -> None:
+        self._flush_scheduled = False
+        queued, self._queued = self._queued, []
+        by_date: Dict[Optional[str], List[str]] = {}
+        for symbol, date in queued:
+            by_date.setdefault(date, []).append(symbol)
+        for date, symbols in by_date.items():
+            task = asyncio.create_task(self._fetch(symbols, date))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _fetch(self, symbols: List[str], date: Optional[str]) -> None:
+        start = end = None
+        if date:
+            start_dt = datetime.strptime(date, "%Y-%m-%d")
+            start = start_dt.strftime("%Y-%m-%d")
+            end = (start_dt + timedelta(days=1)).strftime("%Y-%m-%d")
+        error = None
+        try:
+            self.provider_calls += 1
+            logger.info(f"Fetching quotes for {len(symbols)} symbols, date: {date}")
+            quotes = await asyncio.to_thread(download_quotes, symbols, start, end)
+            fetched_at = time.time()
+            for symbol in symbols:
+                self._quotes.put((symbol, date), (quotes.get(symbol), fetched_at))
+        except Exception as e:
+            logger.error(f"Failed to fetch quotes: {str(e)}")
+            error = e
+        finally:
+            for symbol in symbols:
+                future = self._pending.pop((symbol, date), None)
+                if future and not future.done():
+                    if error:
+                        future.set_exception(error)
+                    else:
+                        future.set_result(None)
+
+
+quote_cache = QuoteCache()
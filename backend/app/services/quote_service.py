@@ -0,0 +1,145 @@
+import time
+import asyncio
+import logging
+import numpy as np
+import pandas as pd
+import yfinance as yf
+from datetime import datetime
+from typing import Dict, List, Optional
+from pymongo import UpdateOne
+from motor.motor_asyncio import AsyncIOMotorCollection
+from app.db.database import symbol_collection
+from app.services.alert_service import zone_alert_engine
+from app.services.ranking_service import zone_ranking
+from app.utils.trading_calendar import trading_calendar
+
+logger = logging.getLogger(__name__)
+
+LTP_CHUNK_SIZE = 300
+
+
+def _clean(value) -> Optional[float]:
+    if value is None or pd.isna(value) or not np.isfinite(value):
+        return None
+    return round(float(value), 2)
+
+
+def download_quotes(symbols: List[str], start: Optional[str] = None, end: Optional[str] = None) -> Dict[str, Dict]:
+    """
+    Fetch the latest daily bar for many NSE symbols with one batched yfinance call.
+
+    This is blocking; call it through `asyncio.to_thread` from async code.
+
+    Args:
+        symbols: Bare symbols (without the .NS suffix).
+        start, end: Optional 'YYYY-MM-DD' bounds; without them the last few sessions are used.
+
+    Returns:
+        Dictionary mapping each symbol with data to {"ltp", "day_low", "day_high", "bar_time"}.
+    """
+    yf_symbols = [f"{symbol}.NS" for symbol in symbols]
+    if not yf_symbols:
+        return {}
+
+    yf_kwargs = {
+        "tickers": yf_symbols,
+        "interval": "1d",
+        "group_by": "ticker",
+        "threads": True,
+        "ignore_tz": True,
+        "progress": False,
+        "auto_adjust": False,
+    }
+    if start:
+        yf_kwargs["start"] = start
+        yf_kwargs["end"] = end
+    else:
+        # A few sessions back so symbols without a bar today still get their last close
+        yf_kwargs["period"] = "5d"
+    data = yf.download(**yf_kwargs)
+
+    quotes = {}
+    if data is None or data.empty:
+        return quotes
+    for symbol, yf_symbol in zip(symbols, yf_symbols):
+        try:
+            if isinstance(data.columns, pd.MultiIndex):
+                if yf_symbol not in data.columns.get_level_values(0):
+                    continue
+                bars = data[yf_symbol]
+            else:
+                bars = data
+            bars = bars.dropna(subset=["Close"])
+            if bars.empty:
+                continue
+            last = bars.iloc[-1]
+            quotes[symbol] = {
+                "ltp": _clean(last["Close"]),
+                "day_low": _clean(last["Low"]),
+                "day_high": _clean(last["High"]),
+                "bar_time": bars.index[-1].isoformat(),
+            }
+        except (KeyError, IndexError, ValueError) as e:
+            logger.error(f"Error reading quote for {symbol}: {str(e)}")
+    return quotes
+
+
+async def refresh_all_ltp(db_collection: AsyncIOMotorCollection = symbol_collection) -> Dict:
+    """
+    Refresh `ltp` for every stored symbol.
+
+    Each chunk of symbols costs one threaded `yf.download` (run off the event
+    loop) and one unordered `bulk_write`. Symbols updated since the market was
+    last open are skipped, as their price cannot have moved.
+
+    Returns:
+        Dictionary with the number of updated and skipped symbols and timings in seconds.
+    """
+    started = time.perf_counter()
+    docs = await db_collection.find({}, {"symbol": 1, "last_updated": 1, "_id": 0}).to_list(length=None)
+    # last_updated is written as naive local time
+    symbols = [
+        doc["symbol"] for doc in docs
+        if not doc.get("last_updated") or trading_calendar.was_open_between(doc["last_updated"].astimezone())
+    ]
+    skipped = len(docs) - len(symbols)
+    if not symbols:
+        if skipped:
+            logger.info(f"LTP of all {skipped} symbols is current, market closed since the last refresh")
+        return {"updated": 0, "symbols": 0, "skipped": skipped, "timings": {}}
+
+    download_seconds = 0.0
+    write_seconds = 0.0
+    total_updates = 0
+    for i in range(0, len(symbols), LTP_CHUNK_SIZE):
+        chunk = symbols[i:i + LTP_CHUNK_SIZE]
+
+        step = time.perf_counter()
+        quotes = await asyncio.to_thread(download_quotes, chunk)
+        download_seconds += time.perf_counter() - step
+
+        for symbol, quote in quotes.items():
+            if quote["ltp"] is not None:
+                zone_alert_engine.on_price(symbol, quote["ltp"])
+                zone_ranking.on_price(symbol, quote["ltp"])
+
+        now = datetime.now()
+        operations = [
+            UpdateOne({"symbol": symbol}, {"$set": {"ltp": quote["ltp"], "last_updated": now}})
+            for symbol, quote in quotes.items()
+            if quote["ltp"] is not None
+        ]
+        if operations:
+            step = time.perf_counter()
+            result = await db_collection.bulk_write(operations, ordered=False)
+            write_seconds += time.perf_counter() - step
+            total_updates += result.matched_count
+        logger.info(f"LTP chunk {i // LTP_CHUNK_SIZE + 1}: {len(quotes)}/{len(chunk)} quotes")
+
+    timings = {
+        "download": round(download_seconds, 3),
+        "write": round(write_seconds, 3),
+        "total": round(time.perf_counter() - started, 3),
+    }
+    logger.info(f"Updated LTP for {total_updates} of {len(symbols)} symbols in {timings['total']}s")
+    return {"updated": total_updates, "symbols": len(symbols), "skipped": skipped, "timings": timings}
@@ -0,0 +1,134 @@
+import os
+import math
+import logging
+import threading
+from bisect import bisect_left
+from typing import Dict, List, Optional
+from motor.motor_asyncio import AsyncIOMotorCollection
+from app.db.database import symbol_collection
+from app.services.zone_index import zone_index, normalize_ticker
+from app.models.zone_table import zone_timeframe
+
+logger = logging.getLogger(__name__)
+
+RANKING_TOP_K = int(os.environ.get("RANKING_TOP_K", 100))
+
+OVERALL = "all"
+
+
+def distance_percent(zone: Dict, price: Optional[float]) -> Optional[float]:
+    """Percent distance from `price` down to the zone (0 inside it); None without a price or once price is below it."""
+    if not price:
+        return None
+    if price < zone["distal_line"]:
+        return None
+    if price <= zone["proximal_line"]:
+        return 0.0
+    return (price - zone["proximal_line"]) / price * 100
+
+
+class ZoneRanking:
+    """
+    Materialized "actionable zones" ranking, overall and per timeframe.
+
+    Fresh top-level zones are ordered by trade_score (highest first) and then by
+    percent distance from the ticker's LTP (closest first); zones without an LTP
+    sort after every priced zone of the same score, and zones price has already
+    fallen through are left out. Every bucket is a sorted list maintained with
+    bisect, so a zone write or price change only re-keys the zones of that
+    ticker. The top RANKING_TOP_K rows of each bucket are cached and dropped only
+    when a change lands inside them, so reads are a cached slice.
+    """
+
+    def __init__(self, top_k: int = RANKING_TOP_K):
+        self.top_k = top_k
+        self._buckets: Dict[str, List[tuple]] = {OVERALL: []}   # bucket -> sorted [(key, zone_id)]
+        self._entries: Dict[str, List[tuple]] = {}               # ticker -> [(bucket, key, zone_id)]
+        self._zones: Dict[str, Dict] = {}                        # zone_id -> zone
+        self._prices: Dict[str, float] = {}
+        self._top: Dict[str, List[Dict]] = {}
+        self._lock = threading.Lock()
+
+    def _insert(self, bucket: str, item: tuple) -> None:
+        rows = self._buckets.setdefault(bucket, [])
+        position = bisect_left(rows, item)
+        rows.insert(position, item)
+        if position < self.top_k:
+            self._top.pop(bucket, None)
+
+    def _delete(self, bucket: str, item: tuple) -> None:
+        rows = self._buckets[bucket]
+        position = bisect_left(rows, item)
+        if position < len(rows) and rows[position] == item:
+            del rows[position]
+            if position < self.top_k:
+                self._top.pop(bucket, None)
+
+    def _rank_ticker(self, ticker: str, zones: List[Dict]) -> None:
+        for bucket, key, zone_id in self._entries.pop(ticker, []):
+            self._delete(bucket, (key, zone_id))
+            self._zones.pop(zone_id, None)
+
+        price = self._prices.get(ticker)
+        entries = []
+        for zone in zones:
+            distance = distance_percent(zone, price)
+            if price and distance is None:
+                continue
+            key = (-(zone["trade_score"] or 0), math.inf if distance is None else distance)
+            self._zones[zone["zone_id"]] = zone
+            for bucket in [OVERALL, *(zone.get("timeframes") or [zone_timeframe(zone)])]:
+                self._insert(bucket, (key, zone["zone_id"]))
+                entries.append((bucket, key, zone["zone_id"]))
+        if entries:
+            self._entries[ticker] = entries
+
+    def on_zones_changed(self, ticker: str) -> None:
+        """zone_index listener: re-rank the zones of `ticker`."""
+        zones = [
+            z for z in zone_index.zones_for(ticker)
+            if (z["freshness"] or 0) > 0 and not z.get("merged_into")
+        ]
+        with self._lock:
+            self._rank_ticker(ticker, zones)
+
+    def on_price(self, ticker: str, price: float) -> None:
+        """Price listener (ticks and LTP refresh): re-key the zones of `ticker`."""
+        ticker = normalize_ticker(ticker)
+        with self._lock:
+            if self._prices.get(ticker) == price:
+                return
+            self._prices[ticker] = price
+        if zone_index.zones_for(ticker):
+            self.on_zones_changed(ticker)
+
+    async def load_prices(self, db_collection: AsyncIOMotorCollection = symbol_collection) -> None:
+        """Seed LTPs from the symbols collection."""
+        docs = await db_collection.find({"ltp": {"$ne": None}}, {"symbol": 1, "ltp": 1, "_id": 0}).to_list(length=None)
+        for doc in docs:
+            self.on_price(doc["symbol"], doc["ltp"])
+        logger.info(f"Zone ranking seeded with {len(docs)} prices, {len(self._zones)} zones ranked")
+
+    def timeframes(self) -> List[str]:
+        return [bucket for bucket in self._buckets if bucket != OVERALL]
+
+    def top(self, timeframe: Optional[str] = None, limit: Optional[int] = None) -> List[Dict]:
+        """Highest ranked zones overall or for one timeframe, at most RANKING_TOP_K."""
+        bucket = timeframe or OVERALL
+        with self._lock:
+            rows = self._top.get(bucket)
+            if rows is None:
+                rows = []
+                for (score, distance), zone_id in self._buckets.get(bucket, [])[:self.top_k]:
+                    zone = self._zones[zone_id]
+                    rows.append({
+                        **zone,
+                        "ltp": self._prices.get(zone["ticker"]),
+                        "distance_percent": None if distance == math.inf else round(distance, 4),
+                    })
+                self._top[bucket] = rows
+        return rows if limit is None else rows[:limit]
+
+
+zone_ranking = ZoneRanking()
+zone_index.add_listener(zone_ranking.on_zones_changed)
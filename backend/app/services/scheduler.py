@@ -0,0 +1,333 @@
+import os
+import math
+import socket
+import asyncio
+import logging
+import time as _time
+from dataclasses import dataclass
+from datetime import datetime, date, time, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+from zoneinfo import ZoneInfo
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from motor.motor_asyncio import AsyncIOMotorCollection
+from app.db.database import scheduler_collection
+from app.utils.metrics import Counter, Histogram
+from app.utils.trading_calendar import trading_calendar, SESSION_OPEN, SESSION_CLOSE
+
+logger = logging.getLogger(__name__)
+
+SCHEDULER_ENABLED = os.environ.get("SCHEDULER_ENABLED", "true").lower() == "true"
+SCHEDULER_TZ = ZoneInfo(os.environ.get("SCHEDULER_TZ", "Asia/Kolkata"))
+SCHEDULER_MAX_CONCURRENT = int(os.environ.get("SCHEDULER_MAX_CONCURRENT", 1))
+SCHEDULER_MAX_SLEEP = 30.0   # upper bound on one sleep of the dispatch loop, seconds
+
+SCHEDULER_RUNS = Counter("scheduler_runs_total", "Scheduled job runs by outcome", ["job", "status"])
+SCHEDULER_SECONDS = Histogram(
+    "scheduler_job_seconds", "Scheduled job run time", ["job"],
+    buckets=(1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600, 7200)
+)
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _aware(value: Optional[datetime]) -> Optional[datetime]:
+    """MongoDB hands datetimes back naive, in UTC."""
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def _parse_cron_field(spec: str, low: int, high: int) -> Set[int]:
+    values = set()
+    for part in spec.split(","):
+        step = 1
+        if "/" in part:
+            part, step_text = part.split("/", 1)
+            step = int(step_text)
+        if part == "*":
+            start, end = low, high
+        elif "-" in part:
+            start, end = (int(v) for v in part.split("-", 1))
+        else:
+            start = int(part)
+            end = high if step > 1 else start
+        if start < low or end > high or start > end or step < 1:
+            raise ValueError(f"Invalid cron field '{spec}' (allowed {low}-{high})")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronTrigger:
+    """
+    Five-field cron expression (minute hour day-of-month month day-of-week,
+    0 or 7 = Sunday) evaluated in `tz`. As in cron, when both day fields are
+    restricted a day matching either one qualifies. With `trading_days_only`,
+    days that are not sessions of the trading calendar never match.
+    """
+
+    def __init__(self, expression: str, tz: ZoneInfo = SCHEDULER_TZ, trading_days_only: bool = False):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression needs 5 fields: '{expression}'")
+        self.expression = expression
+        self.tz = tz
+        self.minutes = _parse_cron_field(fields[0], 0, 59)
+        self.hours = _parse_cron_field(fields[1], 0, 23)
+        self.days = _parse_cron_field(fields[2], 1, 31)
+        self.months = _parse_cron_field(fields[3], 1, 12)
+        # cron counts weekdays from Sunday, Python from Monday
+        self.weekdays = {(d - 1) % 7 for d in _parse_cron_field(fields[4], 0, 7)}
+        self._any_day = fields[2] == "*"
+        self._any_weekday = fields[4] == "*"
+        self.trading_days_only = trading_days_only
+
+    def _day_matches(self, day: datetime) -> bool:
+        if self.trading_days_only and not trading_calendar.is_trading_day(day.date()):
+            return False
+        in_month = day.day in self.days
+        in_week = day.weekday() in self.weekdays
+        if self._any_day or self._any_weekday:
+            return in_month and in_week
+        return in_month or in_week
+
+    def next_after(self, after: datetime) -> Optional[datetime]:
+        t = after.astimezone(self.tz).replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = t + timedelta(days=5 * 366)
+        while t < limit:
+            if t.month not in self.months:
+                t = (t.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(t):
+                t = t.replace(hour=0, minute=0) + timedelta(days=1)
+            elif t.hour not in self.hours:
+                t = t.replace(minute=0) + timedelta(hours=1)
+            elif t.minute not in self.minutes:
+                t += timedelta(minutes=1)
+            else:
+                return t
+        return None
+
+    def describe(self) -> str:
+        return f"cron '{self.expression}'{' on trading days' if self.trading_days_only else ''} ({self.tz.key})"
+
+
+class MarketHoursTrigger:
+    """Fires every `every_seconds` from the open to the close of each session of the trading calendar."""
+
+    def __init__(self, every_seconds: float, open_time: time = SESSION_OPEN, close_time: time = SESSION_CLOSE,
+                 tz: ZoneInfo = SCHEDULER_TZ):
+        if every_seconds <= 0:
+            raise ValueError("every_seconds must be positive")
+        self.every = timedelta(seconds=every_seconds)
+        self.open_time = open_time
+        self.close_time = close_time
+        self.tz = tz
+
+    def is_trading_day(self, day: date) -> bool:
+        return trading_calendar.is_trading_day(day)
+
+    def next_after(self, after: datetime) -> Optional[datetime]:
+        local = after.astimezone(self.tz)
+        for offset in range(15):
+            day = local.date() + timedelta(days=offset)
+            if not self.is_trading_day(day):
+                continue
+            session_open = datetime.combine(day, self.open_time, self.tz)
+            session_close = datetime.combine(day, self.close_time, self.tz)
+            if local < session_open:
+                return session_open
+            if local < session_close:
+                steps = math.floor((local - session_open) / self.every) + 1
+                candidate = session_open + steps * self.every
+                if candidate <= session_close:
+                    return candidate
+        return None
+
+    def describe(self) -> str:
+        return (f"every {int(self.every.total_seconds())}s, {self.open_time:%H:%M}-{self.close_time:%H:%M} "
+                f"on trading days ({self.tz.key})")
+
+
+@dataclass
+class Job:
+    name: str
+    trigger: Any
+    func: Callable[[], Awaitable[Any]]
+    catch_up: bool = False          # run once at startup if a fire time was missed while down
+    lease_seconds: float = 3600     # after this, a run still marked active elsewhere counts as abandoned
+    next_run: Optional[datetime] = None
+    runs: int = 0
+    failures: int = 0
+    skipped: int = 0
+
+
+class Scheduler:
+    """
+    In-process asyncio scheduler. Due jobs run as tasks, at most
+    `max_concurrent` at a time; a job that is still running when it comes due
+    again is skipped rather than queued. Each run takes a lease on the job's
+    document in `scheduler_state`, which also keeps the last run so a restart
+    neither repeats a run nor, for catch-up jobs, silently drops a missed one.
+    The lease keeps several app instances from running the same job at once.
+    """
+
+    def __init__(self, db_collection: AsyncIOMotorCollection = scheduler_collection,
+                 max_concurrent: int = SCHEDULER_MAX_CONCURRENT):
+        self.db_collection = db_collection
+        self.max_concurrent = max_concurrent
+        self.jobs: Dict[str, Job] = {}
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._running: Dict[str, asyncio.Task] = {}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def add_job(self, job: Job) -> None:
+        if job.name in self.jobs:
+            raise ValueError(f"Job {job.name} already registered")
+        self.jobs[job.name] = job
+
+    async def start(self) -> None:
+        self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        self._wakeup = asyncio.Event()
+        states = {
+            doc["job"]: doc
+            for doc in await self.db_collection.find({"job": {"$in": list(self.jobs)}}).to_list(length=None)
+        }
+        now = _now()
+        for job in self.jobs.values():
+            last = _aware(states.get(job.name, {}).get("last_started_at"))
+            next_run = job.trigger.next_after(last or now)
+            if next_run is not None and next_run <= now:
+                logger.info(f"Job {job.name} missed its run at {next_run.isoformat()}"
+                            + (", catching up now" if job.catch_up else ""))
+                next_run = now if job.catch_up else job.trigger.next_after(now)
+            job.next_run = next_run
+        self._task = asyncio.create_task(self._dispatch_loop())
+        logger.info("Scheduler started: " + ", ".join(
+            f"{job.name} next at {job.next_run.isoformat() if job.next_run else 'never'}" for job in self.jobs.values()
+        ))
+
+    async def stop(self) -> None:
+        tasks = [task for task in [self._task, *self._running.values()] if task]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def run_now(self, name: str) -> bool:
+        """Bring a job's next run forward to now; False if it is already running."""
+        job = self.jobs[name]
+        if name in self._running:
+            return False
+        job.next_run = _now()
+        if self._wakeup:
+            self._wakeup.set()
+        return True
+
+    async def _dispatch_loop(self) -> None:
+        while True:
+            now = _now()
+            for job in self.jobs.values():
+                if job.next_run is not None and job.next_run <= now:
+                    self._dispatch(job)
+                    job.next_run = job.trigger.next_after(now)
+            upcoming = [job.next_run for job in self.jobs.values() if job.next_run is not None]
+            delay = min([(t - _now()).total_seconds() for t in upcoming] + [SCHEDULER_MAX_SLEEP])
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=max(delay, 0.0))
+            except asyncio.TimeoutError:
+                pass
+
+    def _dispatch(self, job: Job) -> None:
+        if job.name in self._running:
+            job.skipped += 1
+            SCHEDULER_RUNS.inc(job=job.name, status="skipped_overlap")
+            logger.warning(f"Job {job.name} still running, skipping this run")
+            return
+        self._running[job.name] = asyncio.create_task(self._run(job), name=f"job:{job.name}")
+
+    async def _acquire(self, job: Job, now: datetime) -> bool:
+        try:
+            await self.db_collection.find_one_and_update(
+                {"job": job.name, "$or": [{"lease_until": None}, {"lease_until": {"$lt": now}}]},
+                {"$set": {"lease_until": now + timedelta(seconds=job.lease_seconds), "owner": self.owner}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+            return True
+        except DuplicateKeyError:
+            # The document exists with a live lease, so the upsert tried to insert a second one
+            return False
+
+    async def _run(self, job: Job) -> None:
+        try:
+            async with self._semaphore:
+                started_at = _now()
+                if not await self._acquire(job, started_at):
+                    job.skipped += 1
+                    SCHEDULER_RUNS.inc(job=job.name, status="skipped_lease")
+                    logger.info(f"Job {job.name} is running on another instance, skipping")
+                    return
+
+                logger.info(f"Job {job.name} started")
+                started = _time.perf_counter()
+                state = {"last_started_at": started_at, "last_error": None}
+                try:
+                    result = await job.func()
+                    state.update(last_status="success", last_result=result if isinstance(result, dict) else None)
+                    job.runs += 1
+                except asyncio.CancelledError:
+                    state.update(last_status="cancelled")
+                    raise
+                except Exception as e:
+                    logger.error(f"Job {job.name} failed: {str(e)}")
+                    state.update(last_status="error", last_error=str(e))
+                    job.failures += 1
+                finally:
+                    seconds = _time.perf_counter() - started
+                    SCHEDULER_RUNS.inc(job=job.name, status=state["last_status"])
+                    SCHEDULER_SECONDS.observe(seconds, job=job.name)
+                    state.update(last_finished_at=_now(), last_duration=round(seconds, 3), lease_until=None)
+                    await asyncio.shield(self.db_collection.update_one({"job": job.name}, {"$set": state}))
+                    logger.info(f"Job {job.name} {state['last_status']} in {seconds:.1f}s")
+        finally:
+            self._running.pop(job.name, None)
+
+    async def status(self) -> List[Dict]:
+        """Schedule and counters of each job here, with the last run as persisted (from any instance)."""
+        states = {
+            doc["job"]: doc
+            for doc in await self.db_collection.find({"job": {"$in": list(self.jobs)}}, {"_id": 0}).to_list(length=None)
+        }
+        jobs = []
+        for job in self.jobs.values():
+            state = states.get(job.name, {})
+            leased = (_aware(state.get("lease_until")) or _now()) > _now()
+            jobs.append({
+                "name": job.name,
+                "trigger": job.trigger.describe(),
+                "next_run": job.next_run.isoformat() if job.next_run else None,
+                "running": job.name in self._running,
+                "catch_up": job.catch_up,
+                "runs": job.runs,
+                "failures": job.failures,
+                "skipped": job.skipped,
+                "last_started_at": _iso(state.get("last_started_at")),
+                "last_finished_at": _iso(state.get("last_finished_at")),
+                "last_status": state.get("last_status"),
+                "last_duration": state.get("last_duration"),
+                "last_error": state.get("last_error"),
+                "last_result": state.get("last_result"),
+                "lease_owner": state.get("owner") if leased else None,
+            })
+        return jobs
+
+
+def _iso(value: Optional[datetime]) -> Optional[str]:
+    return _aware(value).isoformat() if value else None
+
+
+scheduler = Scheduler()
@@ -1,22 +1,42 @@
 import yfinance as yf
 import pandas as pd
+import time
 import logging
 from fastapi import HTTPException
-from typing import List, Dict
-from datetime import date
+from typing import List, Dict, Optional
+from datetime import date, timedelta
 import uuid
 from app.utils.freshness_service import get_freshness
+from app.utils.metrics import PROVIDER_FETCH_SECONDS, PROVIDER_FETCH_ROWS, PROVIDER_FETCH_ERRORS, PROVIDER_FETCH_SKIPPED, PROVIDER_SHORT_SERIES
+from app.utils.trading_calendar import trading_calendar
 
 logger = logging.getLogger(__name__)
 
+# Days of history the provider serves for intraday intervals; daily and longer have no limit
+PROVIDER_HISTORY_DAYS = {"1m": 7, "2m": 60, "5m": 60, "15m": 60, "30m": 60, "90m": 60, "60m": 730, "1h": 730}
+
+def earliest_available_date(interval: str, today: Optional[date] = None) -> Optional[date]:
+    """First date the provider still has `interval` bars for, or None when the whole history is served."""
+    days = PROVIDER_HISTORY_DAYS.get(interval)
+    if days is None:
+        return None
+    return (today or date.today()) - timedelta(days=days - 1)
+
 def fetch_stock_data(ticker: str, start_date: date, end_date: date, interval: str) -> pd.DataFrame:
     try:
         # Normalize ticker: uppercase and append .NS if not present
         ticker = ticker.upper()
         if not ticker.endswith(".NS"):
             ticker = f"{ticker}.NS"
-        
+
+        expected = trading_calendar.expected_bars(start_date, end_date, interval)
+        if not expected:
+            PROVIDER_FETCH_SKIPPED.inc(interval=interval, source="candles")
+            logger.info(f"No session between {start_date} and {end_date}, not fetching {ticker}")
+            return None
+
         stock = yf.Ticker(ticker)
+        started = time.perf_counter()
         data = stock.history(
                 start=start_date, 
                 end=end_date, 
@@ -24,9 +44,16 @@ def fetch_stock_data(ticker: str, start_date: date, end_date: date, interval: st
                 auto_adjust=False, 
                 actions=False
                 )
+        PROVIDER_FETCH_SECONDS.observe(time.perf_counter() - started, interval=interval, source="candles")
+        PROVIDER_FETCH_ROWS.inc(len(data), interval=interval, source="candles")
         if data.empty:
+            PROVIDER_FETCH_ERRORS.inc(interval=interval, source="candles")
             logger.error(f"No data found for ticker {ticker}")
             return None
+        if len(data) < expected:
+            # Suspensions and unlisted holidays also end here; the candle store re-checks the tail later
+            PROVIDER_SHORT_SERIES.inc(interval=interval, source="candles")
+            logger.info(f"{ticker} ({interval}): {len(data)} of {expected} expected bars from {start_date} to {end_date}")
         return data
     except Exception as e:
         logger.error(f"Error fetching data for {ticker}: {str(e)}")
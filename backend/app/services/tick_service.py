@@ -0,0 +1,249 @@
+import os
+import time
+import random
+import asyncio
+import logging
+import threading
+import numpy as np
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+from motor.motor_asyncio import AsyncIOMotorCollection
+from app.db.database import symbol_collection
+
+logger = logging.getLogger(__name__)
+
+# "kotak" for the broker socket, "simulated" for the local feed, empty to disable
+TICK_FEED = os.environ.get("TICK_FEED", "").lower()
+TICK_MAX_SUBSCRIPTIONS = int(os.environ.get("TICK_MAX_SUBSCRIPTIONS", 3000))
+# Ticks older than this are not trusted as a live price
+TICK_MAX_AGE = float(os.environ.get("TICK_MAX_AGE", 30))
+
+TickCallback = Callable[[str, float, Optional[float], Optional[float]], None]
+
+
+class LastPriceTable:
+    """
+    Last price, day high and day low per symbol, stored in parallel NumPy arrays.
+
+    Symbols are mapped to fixed slots; the arrays double in size when full.
+    Safe to update from the feed thread while the event loop reads.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self._slots: Dict[str, int] = {}
+        self.ltp = np.full(capacity, np.nan)
+        self.day_high = np.full(capacity, np.nan)
+        self.day_low = np.full(capacity, np.nan)
+        self.updated_at = np.zeros(capacity)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def _slot(self, symbol: str) -> int:
+        slot = self._slots.get(symbol)
+        if slot is None:
+            slot = len(self._slots)
+            if slot >= len(self.ltp):
+                grow = len(self.ltp)
+                self.ltp = np.concatenate([self.ltp, np.full(grow, np.nan)])
+                self.day_high = np.concatenate([self.day_high, np.full(grow, np.nan)])
+                self.day_low = np.concatenate([self.day_low, np.full(grow, np.nan)])
+                self.updated_at = np.concatenate([self.updated_at, np.zeros(grow)])
+            self._slots[symbol] = slot
+        return slot
+
+    def update(self, symbol: str, ltp: float, day_high: Optional[float] = None, day_low: Optional[float] = None,
+               timestamp: Optional[float] = None) -> None:
+        timestamp = timestamp or time.time()
+        with self._lock:
+            slot = self._slot(symbol)
+            new_day = datetime.fromtimestamp(self.updated_at[slot]).date() != datetime.fromtimestamp(timestamp).date()
+            if new_day:
+                self.day_high[slot] = np.nan
+                self.day_low[slot] = np.nan
+            self.ltp[slot] = ltp
+            self.day_high[slot] = day_high if day_high is not None else np.fmax(self.day_high[slot], ltp)
+            self.day_low[slot] = day_low if day_low is not None else np.fmin(self.day_low[slot], ltp)
+            self.updated_at[slot] = timestamp
+
+    def get(self, symbol: str, max_age: Optional[float] = None) -> Optional[Dict]:
+        slot = self._slots.get(symbol)
+        if slot is None:
+            return None
+        age = time.time() - self.updated_at[slot]
+        if max_age is not None and age > max_age:
+            return None
+        return {
+            "ltp": round(float(self.ltp[slot]), 2),
+            "day_high": round(float(self.day_high[slot]), 2),
+            "day_low": round(float(self.day_low[slot]), 2),
+            "age_seconds": round(float(age), 3),
+        }
+
+    def snapshot(self, symbols: Optional[List[str]] = None, max_age: Optional[float] = None) -> Dict[str, Dict]:
+        """Latest prices for `symbols` (all if None), skipping unknown or stale symbols."""
+        symbols = list(self._slots) if symbols is None else symbols
+        quotes = {}
+        for symbol in symbols:
+            quote = self.get(symbol, max_age)
+            if quote:
+                quotes[symbol] = quote
+        return quotes
+
+
+class TickFeed(ABC):
+    """Source of live ticks; calls `on_tick(symbol, ltp, day_high, day_low)` from its own thread."""
+
+    @abstractmethod
+    def start(self, symbols: List[str], on_tick: TickCallback) -> None:
+        ...
+
+    def stop(self) -> None:
+        pass
+
+
+class KotakNeoFeed(TickFeed):
+    """Live feed from the Kotak Neo WebSocket (see app/dmats/login/kotak_neo.py)."""
+
+    def __init__(self):
+        self.client = None
+        self.instrument_tokens = []
+        self.on_tick = None
+
+    def start(self, symbols: List[str], on_tick: TickCallback) -> None:
+        from app.controllers.kotakControllers import kotak_login_controller
+
+        self.on_tick = on_tick
+        self.client = kotak_login_controller()
+        if not self.client:
+            raise RuntimeError("Kotak login failed, cannot subscribe to ticks")
+        self.client.on_message = self._on_message
+        self.client.on_error = lambda error: logger.error(f"Kotak feed error: {error}")
+        self.client.on_close = lambda message: logger.warning(f"Kotak feed closed: {message}")
+        self.client.on_open = lambda message: logger.info(f"Kotak feed opened: {message}")
+        self.instrument_tokens = [
+            {"instrument_token": f"NSE:{symbol}-EQ", "exchange_segment": "nse_cm"}
+            for symbol in symbols
+        ]
+        self.client.subscribe(instrument_tokens=self.instrument_tokens, isIndex=False, isDepth=False)
+        logger.info(f"Subscribed to Kotak feed for {len(symbols)} symbols")
+
+    def _on_message(self, message) -> None:
+        items = message.get("data", []) if isinstance(message, dict) else []
+        for item in items:
+            try:
+                symbol = item.get("ts", "")
+                if symbol.endswith("-EQ"):
+                    symbol = symbol[:-3]
+                if not symbol or item.get("ltp") is None:
+                    continue
+                high = float(item["h"]) if item.get("h") is not None else None
+                low = float(item["lo"]) if item.get("lo") is not None else None
+                self.on_tick(symbol, float(item["ltp"]), high, low)
+            except (TypeError, ValueError) as e:
+                logger.error(f"Bad Kotak tick {item}: {str(e)}")
+
+    def stop(self) -> None:
+        if self.client and self.instrument_tokens:
+            try:
+                self.client.un_subscribe(instrument_tokens=self.instrument_tokens, isIndex=False, isDepth=False)
+            except Exception as e:
+                logger.error(f"Error unsubscribing Kotak feed: {str(e)}")
+
+
+class SimulatedFeed(TickFeed):
+    """
+    Local stand-in for the broker socket.
+
+    Emits a seeded random walk for every symbol each `interval` seconds from a
+    background thread; `push` injects an exact tick for deterministic tests.
+    """
+
+    def __init__(self, start_prices: Optional[Dict[str, float]] = None, interval: float = 1.0,
+                 volatility: float = 0.001, seed: int = 0):
+        self.prices = dict(start_prices or {})
+        self.interval = interval
+        self.volatility = volatility
+        self.random = random.Random(seed)
+        self.on_tick = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self, symbols: List[str], on_tick: TickCallback) -> None:
+        self.on_tick = on_tick
+        for symbol in symbols:
+            self.prices.setdefault(symbol, 100.0)
+        self._stop.clear()
+        if self.interval > 0:
+            self._thread = threading.Thread(target=self._run, name="simulated-tick-feed", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            for symbol, price in list(self.prices.items()):
+                self.push(symbol, price * (1 + self.random.gauss(0, self.volatility)))
+
+    def push(self, symbol: str, ltp: float, day_high: Optional[float] = None, day_low: Optional[float] = None) -> None:
+        self.prices[symbol] = ltp
+        if self.on_tick:
+            self.on_tick(symbol, ltp, day_high, day_low)
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.interval * 2)
+
+
+class TickIngestionService:
+    """Owns the active feed and feeds every tick into the last-price table and listeners."""
+
+    def __init__(self, table: Optional[LastPriceTable] = None):
+        self.table = table or LastPriceTable()
+        self.feed: Optional[TickFeed] = None
+        self.symbols: List[str] = []
+        self.tick_count = 0
+        self._listeners: List[Callable[[str, float], None]] = []
+
+    @property
+    def running(self) -> bool:
+        return self.feed is not None
+
+    def add_listener(self, listener: Callable[[str, float], None]) -> None:
+        """Register `listener(symbol, ltp)`; it runs on the feed thread, so keep it cheap."""
+        self._listeners.append(listener)
+
+    def _on_tick(self, symbol: str, ltp: float, day_high: Optional[float], day_low: Optional[float]) -> None:
+        self.table.update(symbol, ltp, day_high, day_low)
+        self.tick_count += 1
+        for listener in self._listeners:
+            try:
+                listener(symbol, ltp)
+            except Exception as e:
+                logger.error(f"Tick listener failed for {symbol}: {str(e)}")
+
+    async def start(self, feed: TickFeed, db_collection: AsyncIOMotorCollection = symbol_collection) -> None:
+        """Subscribe `feed` to the stored symbols, watchlisted symbols first."""
+        docs = await db_collection.find({}, {"symbol": 1, "watchlists": 1, "_id": 0}).to_list(length=None)
+        docs.sort(key=lambda doc: not doc.get("watchlists"))
+        self.symbols = [doc["symbol"] for doc in docs][:TICK_MAX_SUBSCRIPTIONS]
+        await asyncio.to_thread(feed.start, self.symbols, self._on_tick)
+        self.feed = feed
+        logger.info(f"Tick ingestion started for {len(self.symbols)} symbols")
+
+    async def stop(self) -> None:
+        if self.feed:
+            await asyncio.to_thread(self.feed.stop)
+            self.feed = None
+
+
+def build_feed(name: str = TICK_FEED) -> Optional[TickFeed]:
+    if name == "kotak":
+        return KotakNeoFeed()
+    if name == "simulated":
+        return SimulatedFeed()
+    return None
+
+
+tick_service = TickIngestionService()
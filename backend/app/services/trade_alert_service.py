@@ -0,0 +1,158 @@
+import os
+import asyncio
+import logging
+import numpy as np
+from datetime import datetime
+from typing import Dict, List, Optional
+from pymongo import UpdateOne
+from motor.motor_asyncio import AsyncIOMotorCollection
+from app.db.database import trade_collection
+from app.services.alert_service import AlertDispatcher, alert_dispatcher
+from app.services.price_cache import quote_cache
+from app.services.tick_service import tick_service, TICK_MAX_AGE
+
+logger = logging.getLogger(__name__)
+
+TRADE_ALERT_INTERVAL = float(os.environ.get("TRADE_ALERT_INTERVAL", 5))
+TRADE_ALERTS_ENABLED = os.environ.get("TRADE_ALERTS_ENABLED", "true").lower() == "true"
+
+
+def _column(trades: List[Dict], field: str) -> np.ndarray:
+    return np.array([t.get(field) if t.get(field) is not None else np.nan for t in trades], dtype=float)
+
+
+class TradeAlertEvaluator:
+    """
+    Checks every OPEN trade against the latest prices in one vectorized step.
+
+    OPEN trades are loaded once into columnar arrays (entry, stop_loss, target,
+    side, flags) and reloaded only after a trade is written. Each evaluation
+    flips `entry_alert_sent` when price reaches the entry and `alert_sent` when
+    it then reaches the stop loss or target, persists all flips with a single
+    `bulk_write` and sends one event per flip to the alert sinks. It runs every
+    TRADE_ALERT_INTERVAL seconds and earlier when a tick arrives for an open trade.
+    """
+
+    def __init__(self, dispatcher: AlertDispatcher, db_collection: AsyncIOMotorCollection = trade_collection):
+        self.dispatcher = dispatcher
+        self.db_collection = db_collection
+        self._dirty = True
+        self._symbols_open = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self.last_run: Optional[datetime] = None
+        self._set_columns([])
+
+    def _set_columns(self, trades: List[Dict]) -> None:
+        self.ids = np.array([t["_id"] for t in trades], dtype=object)
+        self.symbols = np.array([t["symbol"].upper() for t in trades], dtype=object)
+        self.entry = _column(trades, "entry_price")
+        self.stop = _column(trades, "stop_loss")
+        self.target = _column(trades, "target_price")
+        self.is_buy = np.array([t.get("trade_type", "BUY") != "SELL" for t in trades], dtype=bool)
+        self.entry_sent = np.array([bool(t.get("entry_alert_sent")) for t in trades], dtype=bool)
+        self.alert_sent = np.array([bool(t.get("alert_sent")) for t in trades], dtype=bool)
+        self._symbols_open = set(self.symbols.tolist())
+
+    def mark_dirty(self) -> None:
+        """Call after any trade write so the next evaluation reloads OPEN trades."""
+        self._dirty = True
+
+    def on_price(self, symbol: str, price: float) -> None:
+        if symbol.upper() in self._symbols_open and self._loop and self._wake:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    async def load(self) -> None:
+        projection = {
+            "symbol": 1, "entry_price": 1, "stop_loss": 1, "target_price": 1,
+            "trade_type": 1, "entry_alert_sent": 1, "alert_sent": 1
+        }
+        trades = await self.db_collection.find({"status": "OPEN", "alert_sent": {"$ne": True}}, projection).to_list(length=None)
+        self._set_columns(trades)
+        self._dirty = False
+        logger.info(f"Loaded {len(trades)} open trades for alert evaluation")
+
+    async def _prices(self, symbols: List[str]) -> Dict[str, float]:
+        prices = {s: q["ltp"] for s, q in tick_service.table.snapshot(symbols, max_age=TICK_MAX_AGE).items()}
+        remaining = [s for s in symbols if s not in prices]
+        if remaining:
+            quotes = await quote_cache.get_many(remaining)
+            prices.update({s: q["ltp"] for s, q in quotes.items() if q["ltp"] is not None})
+        return prices
+
+    async def evaluate(self) -> List[Dict]:
+        if self._dirty:
+            await self.load()
+        if len(self.ids) == 0:
+            return []
+
+        unique_symbols, inverse = np.unique(self.symbols.astype(str), return_inverse=True)
+        latest = await self._prices(unique_symbols.tolist())
+        price = np.array([latest.get(s, np.nan) for s in unique_symbols], dtype=float)[inverse]
+
+        valid = ~np.isnan(price)
+        buy = self.is_buy
+        with np.errstate(invalid="ignore"):
+            entry_hit = valid & ~self.entry_sent & np.where(buy, price <= self.entry, price >= self.entry)
+            entered = self.entry_sent | entry_hit
+            stop_hit = valid & entered & ~self.alert_sent & np.where(buy, price <= self.stop, price >= self.stop)
+            target_hit = valid & entered & ~self.alert_sent & ~stop_hit & np.where(buy, price >= self.target, price <= self.target)
+        exit_hit = stop_hit | target_hit
+
+        changed = np.flatnonzero(entry_hit | exit_hit)
+        self.last_run = datetime.utcnow()
+        if len(changed) == 0:
+            return []
+
+        operations = []
+        events = []
+        now = self.last_run.isoformat()
+        for i in changed:
+            update = {}
+            if entry_hit[i]:
+                update["entry_alert_sent"] = True
+                events.append(self._event("trade_entry", i, price[i], now))
+            if exit_hit[i]:
+                update["alert_sent"] = True
+                events.append(self._event("trade_stop_loss" if stop_hit[i] else "trade_target", i, price[i], now))
+            operations.append(UpdateOne({"_id": self.ids[i]}, {"$set": update}))
+        await self.db_collection.bulk_write(operations, ordered=False)
+
+        self.entry_sent |= entry_hit
+        self.alert_sent |= exit_hit
+        self.dispatcher.dispatch(events)
+        logger.info(f"Trade alerts: {int(entry_hit.sum())} entries, {int(stop_hit.sum())} stop losses, "
+                    f"{int(target_hit.sum())} targets")
+        return events
+
+    def _event(self, kind: str, i: int, price: float, now: str) -> Dict:
+        return {
+            "type": kind,
+            "trade_id": str(self.ids[i]),
+            "ticker": self.symbols[i],
+            "price": round(float(price), 2),
+            "entry_price": float(self.entry[i]),
+            "stop_loss": None if np.isnan(self.stop[i]) else float(self.stop[i]),
+            "target_price": None if np.isnan(self.target[i]) else float(self.target[i]),
+            "timestamp": now,
+        }
+
+    async def run(self, interval: float = TRADE_ALERT_INTERVAL) -> None:
+        """Evaluate forever: every `interval` seconds, or sooner when woken by a tick."""
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        while True:
+            try:
+                await self.evaluate()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Trade alert evaluation failed: {str(e)}")
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+
+trade_alert_evaluator = TradeAlertEvaluator(alert_dispatcher)
@@ -0,0 +1,155 @@
+import time
+import asyncio
+import logging
+import numpy as np
+import pandas as pd
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from pymongo import UpdateOne
+from motor.motor_asyncio import AsyncIOMotorCollection
+from app.db.database import trade_collection
+from app.services.candle_service import get_candles
+
+logger = logging.getLogger(__name__)
+
+
+def _first(mask: np.ndarray) -> Optional[int]:
+    return int(mask.argmax()) if mask.any() else None
+
+
+def _localize(ts: datetime, index: pd.DatetimeIndex) -> pd.Timestamp:
+    ts = pd.Timestamp(ts)
+    if ts.tzinfo is None:
+        ts = ts.tz_localize("UTC")  # created_at is stored as naive UTC
+    return ts.tz_convert(index.tz) if index.tz is not None else ts.tz_convert(None)
+
+
+def resolve_trades(candles: pd.DataFrame, trades: List[Dict]) -> List[Dict]:
+    """
+    Decide for each trade of one ticker whether stop loss or target was hit first.
+
+    The scan starts at the bar containing `created_at`; the trade is filled on
+    the first bar that trades through the entry price, and from that bar on the
+    first stop or target touch decides the outcome. A bar touching both counts
+    as a stop loss.
+
+    Returns:
+        One result per trade: outcome (TARGET, STOP_LOSS, OPEN or NOT_TRIGGERED),
+        exit_time, exit_price and realized_r.
+    """
+    index = candles.index
+    low = candles["Low"].to_numpy(dtype=float)
+    high = candles["High"].to_numpy(dtype=float)
+
+    results = []
+    for trade in trades:
+        result = {"_id": trade["_id"], "outcome": "NOT_TRIGGERED", "exit_time": None, "exit_price": None, "realized_r": None}
+        results.append(result)
+
+        start = max(int(index.searchsorted(_localize(trade["created_at"], index), side="right")) - 1, 0)
+        entry = trade["entry_price"]
+        stop = trade.get("stop_loss")
+        target = trade.get("target_price")
+        is_buy = trade.get("trade_type", "BUY") != "SELL"
+
+        lows, highs = low[start:], high[start:]
+        fill = _first(lows <= entry if is_buy else highs >= entry)
+        if fill is None:
+            continue
+        result["outcome"] = "OPEN"
+
+        lows, highs = lows[fill:], highs[fill:]
+        no_hit = np.zeros(len(lows), dtype=bool)
+        stop_hit = _first((lows <= stop if is_buy else highs >= stop) if stop else no_hit)
+        target_hit = _first((highs >= target if is_buy else lows <= target) if target else no_hit)
+
+        if stop_hit is not None and (target_hit is None or stop_hit <= target_hit):
+            outcome, exit_at, exit_price = "STOP_LOSS", stop_hit, stop
+        elif target_hit is not None:
+            outcome, exit_at, exit_price = "TARGET", target_hit, target
+        else:
+            continue
+
+        result["outcome"] = outcome
+        result["exit_time"] = index[start + fill + exit_at].to_pydatetime()
+        result["exit_price"] = exit_price
+        if stop and stop != entry:
+            risk = entry - stop if is_buy else stop - entry
+            reward = exit_price - entry if is_buy else entry - exit_price
+            result["realized_r"] = round(reward / risk, 3)
+    return results
+
+
+async def verify_trades(
+    db_collection: AsyncIOMotorCollection = trade_collection,
+    interval: str = "1d",
+    include_verified: bool = False,
+    max_concurrency: int = 8
+) -> Dict:
+    """
+    Verify stored trades against OHLC candles and record their outcome.
+
+    Trades are grouped by symbol; each symbol's candles from its earliest
+    `created_at` are loaded once through the candle store, all of its trades are
+    resolved together, and symbols run in parallel worker threads. Results are
+    written with one unordered `bulk_write`; trades that hit stop loss or target
+    are marked verified.
+
+    Returns:
+        Summary with counts per outcome and timings in seconds.
+    """
+    started = time.perf_counter()
+    query = {"created_at": {"$ne": None}}
+    if not include_verified:
+        query["verified"] = {"$ne": True}
+    projection = {"symbol": 1, "entry_price": 1, "stop_loss": 1, "target_price": 1, "trade_type": 1, "created_at": 1}
+    trades = await db_collection.find(query, projection).to_list(length=None)
+
+    by_symbol: Dict[str, List[Dict]] = {}
+    for trade in trades:
+        by_symbol.setdefault(trade["symbol"].upper(), []).append(trade)
+
+    end_date = datetime.now().date() + timedelta(days=1)
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    def verify_symbol(symbol: str, symbol_trades: List[Dict]) -> List[Dict]:
+        start_date = min(t["created_at"] for t in symbol_trades).date()
+        candles = get_candles(symbol, start_date, end_date, interval)
+        if candles is None:
+            logger.warning(f"No candles to verify {len(symbol_trades)} trades of {symbol}")
+            return []
+        return resolve_trades(candles, symbol_trades)
+
+    async def run(symbol: str, symbol_trades: List[Dict]) -> List[Dict]:
+        async with semaphore:
+            try:
+                return await asyncio.to_thread(verify_symbol, symbol, symbol_trades)
+            except Exception as e:
+                logger.error(f"Error verifying trades of {symbol}: {str(e)}")
+                return []
+
+    resolved = await asyncio.gather(*(run(s, t) for s, t in by_symbol.items()))
+    results = [r for symbol_results in resolved for r in symbol_results]
+    resolve_seconds = time.perf_counter() - started
+
+    now = datetime.utcnow()
+    operations = []
+    summary: Dict[str, int] = {}
+    for r in results:
+        summary[r["outcome"]] = summary.get(r["outcome"], 0) + 1
+        update = {
+            "outcome": r["outcome"],
+            "exit_time": r["exit_time"],
+            "exit_price": r["exit_price"],
+            "realized_r": r["realized_r"],
+            "verified_at": now,
+        }
+        if r["outcome"] in ("TARGET", "STOP_LOSS"):
+            update["verified"] = True
+        operations.append(UpdateOne({"_id": r["_id"]}, {"$set": update}))
+    if operations:
+        await db_collection.bulk_write(operations, ordered=False)
+
+    timings = {"resolve": round(resolve_seconds, 3), "total": round(time.perf_counter() - started, 3)}
+    logger.info(f"Verified {len(results)} trades across {len(by_symbol)} symbols in {timings['total']}s: {summary}")
+    return {"trades": len(results), "symbols": len(by_symbol), "outcomes": summary, "timings": timings}
@@ -0,0 +1,296 @@
+import os
+import time
+import asyncio
+import logging
+import itertools
+import numpy as np
+from collections import Counter
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+from app.services.candle_service import get_candles, shared_array_pool, attach_arrays
+from app.services.backtest_service import simulate_zones, OUTCOME_TARGET, OUTCOME_STOP
+
+logger = logging.getLogger(__name__)
+
+WALKFORWARD_WORKERS = int(os.environ.get("WALKFORWARD_WORKERS", os.cpu_count() or 2))
+
+# Detection thresholds as named on StockRequest, plus the score cut-off for taking a trade
+DEFAULT_PARAMS = {
+    "leginMinBodyPercent": 50,
+    "legoutMinBodyPercent": 50,
+    "baseMaxBodyPercent": 50,
+    "minLeginMovement": 7,
+    "minBaseCandles": 1,
+    "maxBaseCandles": 5,
+    "minTradeScore": 0,
+}
+
+METRICS = ["expectancy_r", "hit_rate", "total_r"]
+
+
+def validate_grid(grid: Dict[str, List[float]]) -> None:
+    """
+    Reject grid parameters detect_zones does not read, which would otherwise be
+    reported as optimized while changing nothing, and parameters without values.
+    """
+    unknown = sorted(set(grid) - set(DEFAULT_PARAMS))
+    if unknown:
+        raise ValueError(f"Unknown grid parameters {unknown}; walk-forward tunes {sorted(DEFAULT_PARAMS)}")
+    empty = sorted(name for name, values in grid.items() if not values)
+    if empty:
+        raise ValueError(f"Grid parameters need at least one value: {empty}")
+
+
+def candle_features(data) -> Dict[str, np.ndarray]:
+    """Per-candle arrays detection needs, computed once per ticker and shared by every configuration."""
+    o = data["Open"].to_numpy(dtype=float)
+    h = data["High"].to_numpy(dtype=float)
+    l = data["Low"].to_numpy(dtype=float)
+    c = data["Close"].to_numpy(dtype=float)
+    index = data.index.tz_convert("UTC") if data.index.tz is not None else data.index
+    body = np.abs(c - o)
+    rng = h - l
+    with np.errstate(divide="ignore", invalid="ignore"):
+        body_pct = np.where(rng > 0, body / rng * 100, 0.0)
+    return {
+        "times": index.as_unit("ns").asi8.copy(),   # pandas may keep us or s resolution
+        "open": o, "high": h, "low": l, "close": c,
+        "body_pct": body_pct,
+        "move_pct": body / c * 100,
+        "range": rng,
+        "green": c > o,
+        "red": c < o,
+        "base_top": np.maximum(o, c),
+    }
+
+
+def detect_zones(f: Dict[str, np.ndarray], lo: int, hi: int, params: Dict) -> Dict[str, np.ndarray]:
+    """
+    Demand zone detection over candles [lo, hi), following the same rules as
+    services.identify_demand_zones but on precomputed feature arrays
+    (benchmarks.parity checks the two agree on the synthetic market).
+
+    Freshness is taken as of the leg-out (always fresh), so nothing after the
+    zone leaks into its score.
+
+    Returns:
+        Zone columns: proximal, distal, trade_score and start_idx (bar after the leg-out).
+    """
+    legin_body = params["leginMinBodyPercent"]
+    legout_body = params["legoutMinBodyPercent"]
+    base_max = params["baseMaxBodyPercent"]
+    min_move = params["minLeginMovement"]  # identify_demand_zones applies it to both legs
+    min_base = params["minBaseCandles"]
+    max_base = params["maxBaseCandles"]
+    body_pct, move_pct, rng = f["body_pct"], f["move_pct"], f["range"]
+    green, red, high, low, close, base_top = f["green"], f["red"], f["high"], f["low"], f["close"], f["base_top"]
+
+    proximal, distal, score, start = [], [], [], []
+    i = lo
+    while i < hi - 2:
+        if not ((red[i] or green[i]) and body_pct[i] >= legin_body and move_pct[i] >= min_move):
+            i += 1
+            continue
+        j = i + 1
+        while j < hi and j - i - 1 < max_base and rng[j] > 0 and body_pct[j] <= base_max:
+            j += 1
+        base_count = j - i - 1
+        if base_count < max(min_base, 1):
+            i = j
+            continue
+        if j >= hi:
+            break
+        if not (green[j] and close[j] > high[i] and body_pct[j] >= legout_body
+                and move_pct[j] >= min_move and close[j] > high[i + 1:j].max()):
+            i = j
+            continue
+        strength = 1.0 if body_pct[j] > 50 else 0.5
+        time_at_base = 2.0 if base_count <= 3 else 1.0
+        proximal.append(base_top[i + 1:j].max())
+        distal.append(low[i + 1:j].min())
+        score.append(3.0 + strength + time_at_base)
+        start.append(j + 1)
+        i = j + 1
+
+    return {
+        "proximal": np.array(proximal, dtype=float),
+        "distal": np.array(distal, dtype=float),
+        "trade_score": np.array(score, dtype=float),
+        "start_idx": np.array(start, dtype=np.int64),
+    }
+
+
+def _metrics(r_values: List[float], outcomes: List[int]) -> Dict:
+    closed = [(r, o) for r, o in zip(r_values, outcomes) if o in (OUTCOME_TARGET, OUTCOME_STOP)]
+    if not closed:
+        return {"trades": 0, "hit_rate": None, "expectancy_r": None, "total_r": 0.0}
+    rs = np.array([r for r, _ in closed])
+    wins = sum(1 for _, o in closed if o == OUTCOME_TARGET)
+    return {
+        "trades": len(closed),
+        "hit_rate": round(wins / len(closed), 4),
+        "expectancy_r": round(float(rs.mean()), 4),
+        "total_r": round(float(rs.sum()), 4),
+    }
+
+
+# Mapped from shared memory in each pool worker by _init_worker
+_FEATURES: Dict[str, Dict[str, np.ndarray]] = {}
+
+
+def _init_worker(descriptor: Dict) -> None:
+    global _FEATURES
+    _FEATURES = attach_arrays(descriptor)
+
+
+def evaluate_config(params: Dict, start_ns: int, end_ns: int, r_multiple: float,
+                    max_holding_bars: Optional[int]) -> Dict:
+    """Detect and simulate one configuration on [start_ns, end_ns) across all tickers."""
+    r_values, outcomes = [], []
+    for f in _FEATURES.values():
+        lo, hi = np.searchsorted(f["times"], [start_ns, end_ns])
+        if hi - lo < 3:
+            continue
+        zones = detect_zones(f, lo, hi, params)
+        keep = zones["trade_score"] >= params["minTradeScore"]
+        if not keep.any():
+            continue
+        result = simulate_zones(
+            f["times"][:hi], f["high"][:hi], f["low"][:hi], f["close"][:hi],
+            zones["proximal"][keep], zones["distal"][keep], zones["start_idx"][keep],
+            r_multiple, max_holding_bars
+        )
+        r_values.extend(result["r"].tolist())
+        outcomes.extend(result["outcome"].tolist())
+    return _metrics(r_values, outcomes)
+
+
+def build_windows(start_date: date, end_date: date, train_days: int, test_days: int,
+                  step_days: Optional[int] = None) -> List[Dict[str, date]]:
+    windows = []
+    step = timedelta(days=step_days or test_days)
+    train_start = start_date
+    while True:
+        train_end = train_start + timedelta(days=train_days)
+        test_end = train_end + timedelta(days=test_days)
+        if test_end > end_date:
+            break
+        windows.append({"train_start": train_start, "train_end": train_end, "test_start": train_end, "test_end": test_end})
+        train_start += step
+    return windows
+
+
+def _ns(d: date) -> int:
+    return int(np.datetime64(d.isoformat(), "ns").astype(np.int64))
+
+
+def _rank(metrics: Dict, metric: str, min_trades: int) -> float:
+    if metrics["trades"] < min_trades or metrics[metric] is None:
+        return float("-inf")
+    return metrics[metric]
+
+
+async def run_walk_forward(
+    tickers: List[str],
+    start_date: date,
+    end_date: date,
+    grid: Dict[str, List[float]],
+    interval: str = "1d",
+    train_days: int = 730,
+    test_days: int = 180,
+    step_days: Optional[int] = None,
+    metric: str = "expectancy_r",
+    min_trades: int = 30,
+    r_multiple: float = 2.0,
+    max_holding_bars: Optional[int] = None,
+    workers: Optional[int] = None
+) -> Dict:
+    """
+    Walk-forward optimization of detection and scoring parameters.
+
+    History is split into rolling train/test windows. Every grid point is
+    evaluated on every train window, the best one by `metric` (with at least
+    `min_trades` closed trades) is re-evaluated on the following test window,
+    and the report shows how often each parameter value was chosen. Candle
+    features are computed once per ticker and published to shared memory, so
+    the process pool running windows and grid points maps a single copy.
+    """
+    if metric not in METRICS:
+        raise ValueError(f"metric must be one of {METRICS}")
+    validate_grid(grid)
+    started = time.perf_counter()
+
+    semaphore = asyncio.Semaphore(16)
+
+    async def load(ticker: str):
+        async with semaphore:
+            try:
+                data = await asyncio.to_thread(get_candles, ticker, start_date, end_date, interval)
+            except Exception as e:
+                logger.error(f"Error loading candles for {ticker}: {str(e)}")
+                return ticker, None
+        return ticker, None if data is None else candle_features(data)
+
+    loaded = await asyncio.gather(*(load(t) for t in tickers))
+    features = {ticker: f for ticker, f in loaded if f is not None}
+    load_seconds = time.perf_counter() - started
+
+    names = list(grid)
+    configs = [{**DEFAULT_PARAMS, **dict(zip(names, values))} for values in itertools.product(*grid.values())]
+    windows = build_windows(start_date, end_date, train_days, test_days, step_days)
+    logger.info(f"Walk-forward: {len(features)} tickers, {len(configs)} configs, {len(windows)} windows")
+
+    loop = asyncio.get_running_loop()
+    async with shared_array_pool(features, _init_worker, workers or WALKFORWARD_WORKERS) as (shared, pool):
+        train_jobs = [
+            [
+                loop.run_in_executor(pool, evaluate_config, config, _ns(w["train_start"]), _ns(w["train_end"]),
+                                     r_multiple, max_holding_bars)
+                for config in configs
+            ]
+            for w in windows
+        ]
+        train_results = [await asyncio.gather(*jobs) for jobs in train_jobs]
+
+        best = []
+        for results in train_results:
+            ranked = max(range(len(configs)), key=lambda k: _rank(results[k], metric, min_trades))
+            best.append(ranked if _rank(results[ranked], metric, min_trades) > float("-inf") else None)
+
+        test_results = await asyncio.gather(*(
+            loop.run_in_executor(pool, evaluate_config, configs[k], _ns(w["test_start"]), _ns(w["test_end"]),
+                                 r_multiple, max_holding_bars)
+            for w, k in zip(windows, best) if k is not None
+        ))
+
+    report_windows = []
+    tests = iter(test_results)
+    chosen = {name: Counter() for name in names}
+    for w, k, results in zip(windows, best, train_results):
+        entry = {key: value.isoformat() for key, value in w.items()}
+        if k is None:
+            entry.update({"best_params": None, "train": None, "test": None})
+        else:
+            params = {name: configs[k][name] for name in names}
+            for name in names:
+                chosen[name][params[name]] += 1
+            entry.update({"best_params": params, "train": results[k], "test": next(tests)})
+        report_windows.append(entry)
+
+    tested = [w["test"] for w in report_windows if w["test"] and w["test"]["trades"]]
+    return {
+        "metric": metric,
+        "windows": report_windows,
+        "stability": {name: {str(v): n for v, n in counts.most_common()} for name, counts in chosen.items()},
+        "recommended": {name: counts.most_common(1)[0][0] for name, counts in chosen.items() if counts},
+        "out_of_sample": {
+            "windows": len(tested),
+            "trades": sum(t["trades"] for t in tested),
+            "mean_expectancy_r": round(float(np.mean([t["expectancy_r"] for t in tested])), 4) if tested else None,
+            "total_r": round(sum(t["total_r"] for t in tested), 4),
+        },
+        "timings": {
+            "load_candles": round(load_seconds, 3),
+            "total": round(time.perf_counter() - started, 3),
+        },
+    }
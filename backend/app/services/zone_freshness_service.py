@@ -0,0 +1,92 @@
+import time
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from dateutil import parser
+from pymongo import UpdateOne
+from motor.motor_asyncio import AsyncIOMotorCollection
+from app.db.database import collection
+from app.models.zone_table import zone_timeframe
+from app.services.zone_index import zone_index, INDEXED_FIELDS
+from app.services.zone_query_cache import zone_query_cache
+from app.services.candle_service import get_candles
+from app.utils.freshness_service import score_freshness
+from app.utils.metrics import observe_stage
+
+logger = logging.getLogger(__name__)
+
+
+def _iso(value) -> str:
+    return value.isoformat() if isinstance(value, datetime) else str(value)
+
+
+async def refresh_freshness(tickers: Optional[List[str]] = None, db_collection: AsyncIOMotorCollection = collection) -> Dict:
+    """
+    Recompute `freshness` of every stored zone that is still fresh, with one
+    candle fetch per (ticker, timeframe) instead of one per zone as at
+    detection time. `trade_score` moves by the same amount, since freshness
+    is one of its terms.
+
+    Returns:
+        Dictionary with zones checked and updated, groups that failed and timings in seconds.
+    """
+    started = time.perf_counter()
+    query = {"freshness": {"$gt": 0}}
+    if tickers:
+        query["ticker"] = {"$in": [t.strip().upper() for t in tickers]}
+    projection = {field: 1 for field in INDEXED_FIELDS}
+    projection["_id"] = 0
+    zones = await db_collection.find(query, projection).to_list(length=None)
+
+    groups: Dict[tuple, List[Dict]] = {}
+    for zone in zones:
+        ticker = zone.get("ticker") or zone["zone_id"].split("-")[0]
+        groups.setdefault((ticker, zone_timeframe(zone)), []).append(zone)
+
+    end_date = datetime.now().date() + timedelta(days=1)
+    operations = []
+    updated = []
+    failed = 0
+    for (ticker, timeframe), group in groups.items():
+        leg_outs = {zone["zone_id"]: parser.parse(_iso(zone["end_timestamp"])) for zone in group}
+        try:
+            candles = await asyncio.to_thread(get_candles, ticker, min(leg_outs.values()).date(), end_date, timeframe)
+        except Exception as e:
+            logger.error(f"Freshness upkeep could not fetch {ticker} ({timeframe}): {str(e)}")
+            failed += 1
+            continue
+        if candles is None or candles.empty:
+            continue
+
+        dates = candles.index.date
+        for zone in group:
+            leg_out = leg_outs[zone["zone_id"]]
+            freshness = score_freshness(
+                candles[dates >= leg_out.date()], ticker, timeframe,
+                zone["proximal_line"], zone["distal_line"], _iso(zone["end_timestamp"])
+            )
+            if freshness == zone["freshness"]:
+                continue
+            trade_score = (zone["trade_score"] or 0) + freshness - (zone["freshness"] or 0)
+            operations.append(UpdateOne(
+                {"zone_id": zone["zone_id"]},
+                {"$set": {"freshness": freshness, "trade_score": trade_score}}
+            ))
+            updated.append({**zone, "freshness": freshness, "trade_score": trade_score})
+
+    if operations:
+        await db_collection.bulk_write(operations, ordered=False)
+        zone_index.upsert_many(updated)
+        zone_query_cache.invalidate_zones(updated)
+
+    seconds = time.perf_counter() - started
+    observe_stage("freshness_upkeep", seconds, items=len(zones))
+    logger.info(f"Freshness upkeep: {len(updated)} of {len(zones)} zones changed in {seconds:.1f}s")
+    return {
+        "checked": len(zones),
+        "updated": len(updated),
+        "groups": len(groups),
+        "failed_groups": failed,
+        "seconds": round(seconds, 3),
+    }
@@ -0,0 +1,145 @@
+import logging
+import threading
+from bisect import bisect_left, bisect_right
+from typing import Callable, Dict, List, Optional
+from motor.motor_asyncio import AsyncIOMotorCollection
+from app.db.database import collection
+
+logger = logging.getLogger(__name__)
+
+INDEXED_FIELDS = [
+    "zone_id", "ticker", "proximal_line", "distal_line", "trade_score", "pattern",
+    "timestamp", "end_timestamp", "timeframes", "base_candles", "freshness", "parent_zone_id",
+    "merged_into"
+]
+
+
+def normalize_ticker(ticker: str) -> str:
+    ticker = ticker.strip().upper()
+    return ticker[:-3] if ticker.endswith(".NS") else ticker
+
+
+class ZoneIntervalIndex:
+    """
+    In-memory index of zone price bands [distal_line, proximal_line] per ticker.
+
+    Each ticker keeps its zones sorted by distal line together with the widest
+    band seen, so a price query only scans zones whose distal line lies in
+    [low - max_width, high] instead of every zone of the ticker. Writes mark the
+    ticker dirty and its sorted arrays are rebuilt on the next query.
+    """
+
+    def __init__(self):
+        self._zones: Dict[str, Dict[str, Dict]] = {}     # ticker -> zone_id -> zone
+        self._ticker_of: Dict[str, str] = {}              # zone_id -> ticker
+        self._sorted: Dict[str, tuple] = {}               # ticker -> (distals, zones, max_width)
+        self._listeners: List[Callable[[str], None]] = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._ticker_of)
+
+    def add_listener(self, listener: Callable[[str], None]) -> None:
+        """Register `listener(ticker)`, called after the zones of a ticker change."""
+        self._listeners.append(listener)
+
+    def tickers(self) -> List[str]:
+        return list(self._zones)
+
+    def _notify(self, tickers) -> None:
+        for ticker in tickers:
+            for listener in self._listeners:
+                listener(ticker)
+
+    async def load(self, db_collection: AsyncIOMotorCollection = collection) -> None:
+        """Rebuild the whole index from MongoDB."""
+        projection = {field: 1 for field in INDEXED_FIELDS}
+        projection["_id"] = 0
+        zones = await db_collection.find({}, projection).to_list(length=None)
+        with self._lock:
+            stale = list(self._zones)
+            self._zones.clear()
+            self._ticker_of.clear()
+            self._sorted.clear()
+        self._notify(stale)
+        self.upsert_many(zones)
+        logger.info(f"Zone index loaded {len(self)} zones for {len(self._zones)} tickers")
+
+    def upsert_many(self, zones: List[Dict]) -> None:
+        changed = set()
+        with self._lock:
+            for zone in zones:
+                entry = {field: zone.get(field) for field in INDEXED_FIELDS}
+                ticker = normalize_ticker(entry["ticker"] or entry["zone_id"].split("-")[0])
+                entry["ticker"] = ticker
+                old_ticker = self._ticker_of.get(entry["zone_id"])
+                if old_ticker and old_ticker != ticker:
+                    self._zones[old_ticker].pop(entry["zone_id"], None)
+                    self._sorted.pop(old_ticker, None)
+                    changed.add(old_ticker)
+                self._zones.setdefault(ticker, {})[entry["zone_id"]] = entry
+                self._ticker_of[entry["zone_id"]] = ticker
+                self._sorted.pop(ticker, None)
+                changed.add(ticker)
+        self._notify(changed)
+
+    def upsert(self, zone: Dict) -> None:
+        self.upsert_many([zone])
+
+    def remove(self, zone_id: str) -> Optional[str]:
+        """Drop a zone; returns the ticker it belonged to, if it was indexed."""
+        with self._lock:
+            ticker = self._ticker_of.pop(zone_id, None)
+            if ticker:
+                self._zones[ticker].pop(zone_id, None)
+                self._sorted.pop(ticker, None)
+        if ticker:
+            self._notify([ticker])
+        return ticker
+
+    def zones_for(self, ticker: str) -> List[Dict]:
+        return list(self._zones.get(normalize_ticker(ticker), {}).values())
+
+    def _arrays(self, ticker: str) -> tuple:
+        arrays = self._sorted.get(ticker)
+        if arrays is None:
+            zones = sorted(self._zones.get(ticker, {}).values(), key=lambda z: z["distal_line"])
+            distals = [z["distal_line"] for z in zones]
+            max_width = max((z["proximal_line"] - z["distal_line"] for z in zones), default=0.0)
+            arrays = (distals, zones, max_width)
+            self._sorted[ticker] = arrays
+        return arrays
+
+    def query(self, ticker: str, price: float, within_percent: float = 0.0, include_breached: bool = False) -> List[Dict]:
+        """
+        Zones of `ticker` that contain `price` or lie within `within_percent` of it.
+        Zones merged into another one (with a `merged_into`) are skipped.
+
+        Returns:
+            Matching zone dicts with `distance_percent` (0 when the price is inside
+            the band), closest first.
+        """
+        ticker = normalize_ticker(ticker)
+        low = price * (1 - within_percent / 100)
+        high = price * (1 + within_percent / 100)
+        with self._lock:
+            distals, zones, max_width = self._arrays(ticker)
+        start = bisect_left(distals, low - max_width)
+        stop = bisect_right(distals, high)
+
+        matches = []
+        for zone in zones[start:stop]:
+            if zone["proximal_line"] < low or zone.get("merged_into"):
+                continue
+            if not include_breached and not (zone["freshness"] or 0) > 0:
+                continue
+            if zone["distal_line"] <= price <= zone["proximal_line"]:
+                distance = 0.0
+            else:
+                distance = min(abs(price - zone["proximal_line"]), abs(price - zone["distal_line"])) / price * 100
+            matches.append({**zone, "distance_percent": round(distance, 4)})
+        matches.sort(key=lambda z: z["distance_percent"])
+        return matches
+
+
+zone_index = ZoneIntervalIndex()
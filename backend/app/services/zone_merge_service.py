@@ -0,0 +1,183 @@
+import os
+import time
+import heapq
+import logging
+from typing import Dict, List, Optional
+from pymongo import UpdateOne, UpdateMany, DeleteMany
+from motor.motor_asyncio import AsyncIOMotorCollection
+from app.db.database import collection, lower_zone_collection
+from app.services.zone_index import zone_index
+from app.services.zone_query_cache import zone_query_cache
+from app.services.confluence_service import INTERVAL_DELTAS
+from app.models.zone_table import zone_timeframe
+
+logger = logging.getLogger(__name__)
+
+# Minimum intersection-over-union of two price bands for them to be the same zone
+MERGE_OVERLAP_RATIO = float(os.environ.get("MERGE_OVERLAP_RATIO", 0.8))
+
+
+def overlap_ratio(a: Dict, b: Dict) -> float:
+    """Intersection over union of the [distal_line, proximal_line] bands of two zones."""
+    intersection = min(a["proximal_line"], b["proximal_line"]) - max(a["distal_line"], b["distal_line"])
+    if intersection < 0:
+        return 0.0
+    union = max(a["proximal_line"], b["proximal_line"]) - min(a["distal_line"], b["distal_line"])
+    return intersection / union if union > 0 else 1.0
+
+
+def cluster_zones(zones: List[Dict], min_overlap: float = MERGE_OVERLAP_RATIO) -> List[List[Dict]]:
+    """
+    Group the zones of one ticker whose bands overlap by at least `min_overlap`.
+
+    Zones are swept in distal line order; a heap keyed by proximal line drops
+    zones the sweep has passed, so each zone is only compared with the bands
+    still open at its distal line. Pairs above the ratio are joined with
+    union-find, so clusters are transitive.
+
+    Returns:
+        Clusters of two or more zones.
+    """
+    ordered = sorted(zones, key=lambda z: z["distal_line"])
+    parent = list(range(len(ordered)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    active: List[tuple] = []   # (proximal_line, position)
+    for i, zone in enumerate(ordered):
+        while active and active[0][0] < zone["distal_line"]:
+            heapq.heappop(active)
+        for _, j in active:
+            if overlap_ratio(ordered[j], zone) >= min_overlap:
+                parent[find(i)] = find(j)
+        heapq.heappush(active, (zone["proximal_line"], i))
+
+    clusters: Dict[int, List[Dict]] = {}
+    for i, zone in enumerate(ordered):
+        clusters.setdefault(find(i), []).append(zone)
+    return [cluster for cluster in clusters.values() if len(cluster) > 1]
+
+
+def _timeframes(zone: Dict) -> List[str]:
+    return zone.get("timeframes") or [zone_timeframe(zone)]
+
+
+def merge_cluster(cluster: List[Dict]) -> tuple:
+    """
+    Pick the canonical zone of a cluster: highest trade_score, then most
+    timeframes, then the earliest zone.
+
+    Returns:
+        (canonical zone, merged timeframes, duplicate zones)
+    """
+    ranked = sorted(cluster, key=lambda z: (-(z["trade_score"] or 0), -len(_timeframes(z)), z["timestamp"]))
+    canonical, duplicates = ranked[0], ranked[1:]
+    timeframes = list(_timeframes(canonical))
+    others = {tf for zone in duplicates for tf in _timeframes(zone)} - set(timeframes)
+    timeframes += sorted(others, key=lambda tf: INTERVAL_DELTAS.get(tf, INTERVAL_DELTAS["1d"]), reverse=True)
+    return canonical, timeframes, duplicates
+
+
+async def merge_zones(
+    tickers: Optional[List[str]] = None,
+    min_overlap: float = MERGE_OVERLAP_RATIO,
+    delete_duplicates: bool = False,
+    dry_run: bool = False,
+    db_collection: AsyncIOMotorCollection = collection,
+    lower_collection: AsyncIOMotorCollection = lower_zone_collection
+) -> Dict:
+    """
+    De-duplicate top-level zones that cover nearly the same price band.
+
+    For every ticker overlapping zones are clustered by `min_overlap`; the
+    canonical zone of each cluster gets the merged `timeframes` list and the
+    others point at it through `merged_into` (or are deleted, with their
+    lower zones, with `delete_duplicates`). Zones already merged into another
+    are left alone, so the pass can be re-run after every scan. All writes go
+    out in one unordered `bulk_write` and the zone index is updated in place.
+
+    Returns:
+        Counts of scanned zones, clusters and merged zones, a sample of the
+        merges and timings in seconds.
+    """
+    started = time.perf_counter()
+    query = {"merged_into": None}
+    if tickers:
+        query["ticker"] = {"$in": tickers}
+    projection = {"_id": 0, "coinciding_lower_zones": 0}
+    zones = await db_collection.find(query, projection).to_list(length=None)
+
+    by_ticker: Dict[str, List[Dict]] = {}
+    for zone in zones:
+        by_ticker.setdefault(zone["ticker"], []).append(zone)
+
+    operations = []
+    updated: List[Dict] = []
+    removed: List[Dict] = []
+    merges = []
+    for ticker, ticker_zones in by_ticker.items():
+        for cluster in cluster_zones(ticker_zones, min_overlap):
+            canonical, timeframes, duplicates = merge_cluster(cluster)
+            duplicate_ids = [zone["zone_id"] for zone in duplicates]
+            merges.append({"zone_id": canonical["zone_id"], "timeframes": timeframes, "merged": duplicate_ids})
+
+            operations.append(UpdateOne({"zone_id": canonical["zone_id"]}, {"$set": {"timeframes": timeframes}}))
+            updated.append({**canonical, "timeframes": timeframes})
+            if delete_duplicates:
+                operations.append(DeleteMany({"zone_id": {"$in": duplicate_ids}}))
+                removed.extend(duplicates)
+            else:
+                operations.append(UpdateMany(
+                    {"zone_id": {"$in": duplicate_ids}},
+                    {"$set": {"merged_into": canonical["zone_id"]}}
+                ))
+                updated.extend({**zone, "merged_into": canonical["zone_id"]} for zone in duplicates)
+
+    if operations and not dry_run:
+        await db_collection.bulk_write(operations, ordered=False)
+        if removed:
+            await lower_collection.delete_many({"parent_zone_id": {"$in": [zone["zone_id"] for zone in removed]}})
+        zone_index.upsert_many(updated)
+        for zone in removed:
+            zone_index.remove(zone["zone_id"])
+        zone_query_cache.invalidate_zones(updated + removed)
+
+    merged = sum(len(m["merged"]) for m in merges)
+    timings = {"total": round(time.perf_counter() - started, 3)}
+    logger.info(f"Zone merge{' (dry run)' if dry_run else ''}: {len(zones)} zones, {len(merges)} clusters, "
+                f"{merged} duplicates {'deleted' if delete_duplicates else 'linked'} in {timings['total']}s")
+    return {
+        "zones": len(zones),
+        "clusters": len(merges),
+        "merged": merged,
+        "deleted": merged if delete_duplicates else 0,
+        "dry_run": dry_run,
+        "merges": merges[:100],
+        "timings": timings,
+    }
+
+
+async def migrate_merge_links(db_collection: AsyncIOMotorCollection = collection) -> int:
+    """
+    Move merge links stored in `parent_zone_id` by earlier merge passes to
+    `merged_into`; `parent_zone_id` of a demand zone is only lower timeframe
+    nesting. Only the merge pass set it on stored zones, so every zone with a
+    parent and no `merged_into` is one of its duplicates. Safe to repeat.
+
+    Returns:
+        Number of zones migrated.
+    """
+    query = {"parent_zone_id": {"$ne": None}, "merged_into": {"$exists": False}}
+    zones = await db_collection.find(query, {"_id": 0, "zone_id": 1, "parent_zone_id": 1}).to_list(length=None)
+    if not zones:
+        return 0
+    await db_collection.bulk_write([
+        UpdateOne({"zone_id": zone["zone_id"]}, {"$set": {"merged_into": zone["parent_zone_id"], "parent_zone_id": None}})
+        for zone in zones
+    ], ordered=False)
+    logger.info(f"Moved the merge links of {len(zones)} zones to merged_into")
+    return len(zones)
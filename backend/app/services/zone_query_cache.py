@@ -0,0 +1,126 @@
+import os
+import re
+import json
+import time
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+from app.models.zone_table import zone_timeframe
+from app.utils.metrics import Counter, Gauge
+
+ZONE_QUERY_CACHE_MAX_BYTES = int(os.environ.get("ZONE_QUERY_CACHE_MAX_BYTES", 32 * 1024 * 1024))
+# Safety net for writes that bypass the app (other instances, manual edits)
+ZONE_QUERY_CACHE_TTL = float(os.environ.get("ZONE_QUERY_CACHE_TTL", 300))
+
+ZONE_QUERY_CACHE_REQUESTS = Counter(
+    "zone_query_cache_requests_total", "Zone list queries served from the cache or MongoDB", ["result"]
+)
+ZONE_QUERY_CACHE_BYTES = Gauge("zone_query_cache_bytes", "Estimated size of the cached zone list pages")
+
+
+class ZoneQueryCache:
+    """
+    LRU cache of `get_all_zones` pages, keyed by the normalized filters, sort
+    and page. Size is bounded by the JSON size of the cached pages.
+
+    Writers report the zones they changed (ticker, timeframes, pattern) and
+    only entries whose filters could match one of them are dropped, every
+    page and sort of that filter at once since totals shift too. A read that
+    overlaps an invalidation is not stored, so a page fetched before a write
+    cannot be cached after it.
+    """
+
+    def __init__(self, max_bytes: int = ZONE_QUERY_CACHE_MAX_BYTES, ttl: float = ZONE_QUERY_CACHE_TTL):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.nbytes = 0
+        self.generation = 0
+        self._entries: "OrderedDict[Tuple, Tuple[Dict, int, float]]" = OrderedDict()   # key -> (result, nbytes, stored_at)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(page: int, limit: int, sort_by: str, sort_order: int, ticker: Optional[str], pattern: Optional[str],
+            timeframe: Optional[str], include_merged: bool, include_lower_zones: bool = False) -> Tuple:
+        return (
+            (ticker or "").strip().upper() or None,
+            pattern.upper() if pattern else None,
+            timeframe.lower() if timeframe else None,
+            bool(include_merged), bool(include_lower_zones), sort_by, int(sort_order), int(page), int(limit),
+        )
+
+    def get(self, key: Tuple) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[2] > self.ttl:
+                self._drop(key)
+                entry = None
+            if entry is None:
+                ZONE_QUERY_CACHE_REQUESTS.inc(result="miss")
+                return None
+            self._entries.move_to_end(key)
+        ZONE_QUERY_CACHE_REQUESTS.inc(result="hit")
+        return entry[0]
+
+    def put(self, key: Tuple, result: Dict, generation: int) -> None:
+        """Store `result` unless zones were invalidated since `generation` was read."""
+        size = len(json.dumps(result, default=str))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if generation != self.generation:
+                return
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (result, size, time.monotonic())
+            self.nbytes += size
+            while self.nbytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+            ZONE_QUERY_CACHE_BYTES.set(self.nbytes)
+
+    def _drop(self, key: Tuple) -> None:
+        _, size, _ = self._entries.pop(key)
+        self.nbytes -= size
+
+    @staticmethod
+    def _matches(key: Tuple, ticker: str, timeframes: List[str], pattern: Optional[str]) -> bool:
+        ticker_filter, pattern_filter, timeframe_filter = key[:3]
+        if ticker_filter:
+            # get_all_zones filters tickers with a case-insensitive regex
+            try:
+                if not re.search(ticker_filter, ticker, re.IGNORECASE):
+                    return False
+            except re.error:
+                return True
+        if pattern_filter and pattern and pattern_filter != pattern.upper():
+            return False
+        if timeframe_filter and timeframes and timeframe_filter not in timeframes:
+            return False
+        return True
+
+    def invalidate_zones(self, zones: Iterable[Dict]) -> int:
+        """Drop the entries that any of `zones` (as stored before or after the write) could appear in."""
+        changes = set()
+        for zone in zones:
+            ticker = (zone.get("ticker") or zone["zone_id"].split("-")[0]).upper()
+            timeframes = tuple(t.lower() for t in zone.get("timeframes") or [zone_timeframe(zone)])
+            changes.add((ticker, timeframes, zone.get("pattern")))
+        if not changes:
+            return 0
+        with self._lock:
+            self.generation += 1
+            stale = [key for key in self._entries
+                     if any(self._matches(key, ticker, timeframes, pattern) for ticker, timeframes, pattern in changes)]
+            for key in stale:
+                self._drop(key)
+            ZONE_QUERY_CACHE_BYTES.set(self.nbytes)
+        return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self.nbytes = 0
+            ZONE_QUERY_CACHE_BYTES.set(0)
+
+
+zone_query_cache = ZoneQueryCache()
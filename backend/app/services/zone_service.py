@@ -1,21 +1,69 @@
+import time
 import logging
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, List, Optional
 from dateutil import parser
 from motor.motor_asyncio import AsyncIOMotorCollection
 from app.models.zone_models import DemandZone, LowerZone
-from app.db.database import collection
+from app.db.database import collection, lower_zone_collection
+from app.services.zone_index import zone_index
+from app.services.lower_zone_service import lower_zone_docs, replace_lower_zones_operations, attach_lower_zones
+from app.services.zone_query_cache import zone_query_cache
+from app.utils.metrics import observe_stage
 
 logger = logging.getLogger(__name__)
 
-async def save_unique_zones(zones_by_ticker: Dict[str, List[DemandZone]], db_collection: AsyncIOMotorCollection = collection) -> None:
+# Set by zone_merge_service.merge_zones; a re-saved zone must not undo it
+MERGE_FIELDS = {"timeframes", "merged_into"}
+
+
+def _zone_update(zone_doc: Dict, stored: Optional[Dict]) -> tuple:
+    """
+    Upsert of a detected zone that keeps what the merge pass stored on it: the
+    detected timeframes are added to the stored ones and `merged_into` is only
+    set on insert.
+
+    Returns:
+        (update document, zone document as stored after the update)
+    """
+    fields = {name: value for name, value in zone_doc.items() if name not in MERGE_FIELDS}
+    update = {"$set": fields, "$setOnInsert": {"merged_into": None}, "$unset": {"coinciding_lower_zones": ""}}
+    stored_timeframes = stored.get("timeframes") if stored else None
+    timeframes = list(stored_timeframes or [])
+    timeframes += [tf for tf in zone_doc.get("timeframes") or [] if tf not in timeframes]
+    if zone_doc.get("timeframes") and (stored is None or isinstance(stored_timeframes, list)):
+        update["$addToSet"] = {"timeframes": {"$each": zone_doc["timeframes"]}}
+    elif timeframes:
+        update["$set"]["timeframes"] = timeframes   # legacy zone stored without a timeframes list
+    else:
+        update["$setOnInsert"]["timeframes"] = None
+    return update, {**fields, "timeframes": timeframes or None, "merged_into": stored.get("merged_into") if stored else None}
+
+
+async def save_unique_zones(
+    zones_by_ticker: Dict[str, Iterable[DemandZone]],
+    db_collection: AsyncIOMotorCollection = collection,
+    lower_collection: AsyncIOMotorCollection = lower_zone_collection
+) -> None:
     """
     Save unique zones to MongoDB, ensuring no duplicates based on zone_id.
+
+    Coinciding lower zones go to their own collection, linked by
+    `parent_zone_id`, with one unordered bulk write for the whole batch; each
+    parent's set of lower zones is replaced, as the embedded array used to be.
+    Zones already stored keep their merged timeframes and `merged_into`.
     
     Args:
-        zones_by_ticker: Dictionary mapping ticker symbols to lists of DemandZone objects.
+        zones_by_ticker: Dictionary mapping ticker symbols to DemandZone objects (lists or iterators, read once).
         db_collection: MongoDB collection to save zones to (defaults to app.db.database.collection).
+        lower_collection: MongoDB collection for lower zones (defaults to app.db.database.lower_zone_collection).
     """
+    started = time.perf_counter()
+    saved = []
+    lower_operations = []
     try:
+        projection = {"_id": 0, "zone_id": 1, "timeframes": 1, "merged_into": 1}
+        cursor = db_collection.find({"ticker": {"$in": list(zones_by_ticker)}}, projection)
+        stored = {doc["zone_id"]: doc for doc in await cursor.to_list(length=None)}
         global_unique_zones = set()  # Track unique zone_ids across all tickers
         for ticker, zones in zones_by_ticker.items():
             for zone in zones:
@@ -40,23 +88,33 @@ async def save_unique_zones(zones_by_ticker: Dict[str, List[DemandZone]], db_col
                         end_timestamp=zone.end_timestamp,
                         base_candles=zone.base_candles,
                         freshness=zone.freshness,
-                        coinciding_lower_zones=lower_zones
+                        parent_zone_id=zone.parent_zone_id
                     )
                     try:
-                        await db_collection.update_one(
-                            {"zone_id": demand_zone.zone_id},
-                            {"$set": demand_zone.model_dump()},
-                            upsert=True
+                        update, zone_doc = _zone_update(
+                            demand_zone.model_dump(exclude={"coinciding_lower_zones"}), stored.get(demand_zone.zone_id)
                         )
+                        await db_collection.update_one({"zone_id": demand_zone.zone_id}, update, upsert=True)
+                        zone_index.upsert(zone_doc)
+                        saved.append(zone_doc)
+                        lower_operations.extend(replace_lower_zones_operations(
+                            demand_zone.zone_id, lower_zone_docs(demand_zone.zone_id, zone_ticker, lower_zones)
+                        ))
                         logger.info(f"Saved/Updated zone {demand_zone.zone_id} for ticker {ticker}")
                     except Exception as e:
                         logger.error(f"Error saving zone {demand_zone.zone_id} for ticker {ticker}: {str(e)}")
+        if lower_operations:
+            await lower_collection.bulk_write(lower_operations, ordered=False)
+        observe_stage("persistence", time.perf_counter() - started, items=len(global_unique_zones))
         logger.info(f"Saved {len(global_unique_zones)} unique zones to database")
     except Exception as e:
         logger.error(f"Error in save_unique_zones: {str(e)}")
         raise
+    finally:
+        zone_query_cache.invalidate_zones(saved)
 
-async def get_zones_by_ticker(tickers: Optional[List[str]] = None, start_date: Optional[str] = None, end_date: Optional[str] = None, db_collection: AsyncIOMotorCollection = collection) -> Dict[str, List[Dict]]:
+async def get_zones_by_ticker(tickers: Optional[List[str]] = None, start_date: Optional[str] = None, end_date: Optional[str] = None, db_collection: AsyncIOMotorCollection = collection,
+                              include_lower_zones: bool = False, lower_collection: AsyncIOMotorCollection = lower_zone_collection) -> Dict[str, List[Dict]]:
     """
     Retrieve demand zones from MongoDB, grouped by ticker.
     
@@ -65,6 +123,8 @@ async def get_zones_by_ticker(tickers: Optional[List[str]] = None, start_date: O
         start_date: Optional start date for zone timestamps (ISO format).
         end_date: Optional end date for zone timestamps (ISO format).
         db_collection: MongoDB collection to query (defaults to app.db.database.collection).
+        include_lower_zones: Join each zone's coinciding lower zones from their collection.
+        lower_collection: MongoDB collection of lower zones (defaults to app.db.database.lower_zone_collection).
     
     Returns:
         Dictionary mapping ticker symbols to lists of DemandZone dictionaries.
@@ -84,6 +144,8 @@ async def get_zones_by_ticker(tickers: Optional[List[str]] = None, start_date: O
 
         zones = await db_collection.find(query).to_list(length=None)
         logger.info(f"Retrieved {len(zones)} zones from database")
+        if include_lower_zones:
+            await attach_lower_zones(zones, lower_collection)
 
         # Group zones by ticker
         zones_by_ticker: Dict[str, List[Dict]] = {}
@@ -119,11 +181,27 @@ async def get_all_zones(
     sort_order: int = -1,
     ticker: Optional[str] = None,
     pattern: Optional[str] = None,
-    timeframe: Optional[str] = None
+    timeframe: Optional[str] = None,
+    include_merged: bool = False,
+    include_lower_zones: bool = False,
+    lower_collection: AsyncIOMotorCollection = lower_zone_collection
 ) -> Dict:
+    # Only the app's own collection is cached; its writers report every change
+    cache_key = None
+    if db_collection is collection and lower_collection is lower_zone_collection:
+        cache_key = zone_query_cache.key(page, limit, sort_by, sort_order, ticker, pattern, timeframe, include_merged,
+                                         include_lower_zones)
+        cached = zone_query_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        generation = zone_query_cache.generation
+
     try:
         # Build query filters
         query = {}
+        if not include_merged:
+            # Duplicates folded into a canonical zone by the merge pass
+            query["merged_into"] = None
         if ticker:
             query["ticker"] = {"$regex": ticker, "$options": "i"}
         if pattern:
@@ -145,6 +223,8 @@ async def get_all_zones(
             .limit(limit)
             
         zones = await cursor.to_list(length=limit)
+        if include_lower_zones:
+            await attach_lower_zones(zones, lower_collection)
         
         logger.info(f"Retrieved {len(zones)} zones from database (page {page}, limit {limit})")
         
@@ -154,30 +234,40 @@ async def get_all_zones(
         zones_data = [DemandZone(**zone).model_dump(by_alias=True) for zone in zones]
         total_count = total
         
-        return {
+        result = {
             "data": zones_data,
             "total": total_count,
             "page": page,
             "total_pages": total_pages
         }
+        if cache_key is not None:
+            zone_query_cache.put(cache_key, result, generation)
+        return result
     except Exception as e:
         logger.error(f"Error in get_all_zones: {str(e)}")
         raise
 
-async def delete_zone(zone_id: str, db_collection: AsyncIOMotorCollection = collection):
+async def delete_zone(zone_id: str, db_collection: AsyncIOMotorCollection = collection,
+                      lower_collection: AsyncIOMotorCollection = lower_zone_collection):
     """
-    Delete a zone by its ID.
+    Delete a zone by its ID, along with its lower zones.
     
     Args:
         zone_id: The ID of the zone to delete
         db_collection: MongoDB collection (defaults to app.db.database.collection)
+        lower_collection: MongoDB collection of lower zones (defaults to app.db.database.lower_zone_collection)
         
     Returns:
         DeleteResult from MongoDB
     """
     try:
         logger.info(f"Deleting zone with ID: {zone_id}")
+        zone = await db_collection.find_one({"zone_id": zone_id}, {"zone_id": 1, "ticker": 1, "timeframes": 1, "pattern": 1, "_id": 0})
         result = await db_collection.delete_one({"zone_id": zone_id})
+        if result.deleted_count:
+            await lower_collection.delete_many({"parent_zone_id": zone_id})
+            zone_index.remove(zone_id)
+            zone_query_cache.invalidate_zones([zone or {"zone_id": zone_id}])
         logger.info(f"Delete result for zone {zone_id}: {result.raw_result}")
         return result
     except Exception as e:
@@ -0,0 +1,76 @@
+import threading
+from collections import OrderedDict
+from typing import Callable, Generic, Hashable, List, Optional, TypeVar
+import pandas as pd
+from app.utils.metrics import Gauge
+
+V = TypeVar("V")
+
+
+def frame_nbytes(data) -> int:
+    """Memory held by a DataFrame or Series, index included."""
+    usage = data.memory_usage(index=True, deep=False)
+    return int(usage.sum()) if isinstance(usage, pd.Series) else int(usage)
+
+
+class ByteLRU(Generic[V]):
+    """
+    Thread-safe LRU mapping bounded by the summed `sizeof` of its values.
+    Storing past `max_bytes` evicts the least recently used entries; a value
+    larger than the whole bound is not stored.
+    """
+
+    def __init__(self, max_bytes: int, sizeof: Callable[[V], int], gauge: Optional[Gauge] = None):
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.gauge = gauge
+        self.nbytes = 0
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()   # key -> (value, nbytes)
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[V]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key: Hashable, value: V) -> None:
+        size = self.sizeof(value)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            if size <= self.max_bytes:
+                self._entries[key] = (value, size)
+                self.nbytes += size
+                while self.nbytes > self.max_bytes:
+                    self._drop(next(iter(self._entries)))
+            self._report()
+
+    def pop(self, key: Hashable) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._report()
+
+    def keys(self) -> List[Hashable]:
+        with self._lock:
+            return list(self._entries)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+            self._report()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _drop(self, key: Hashable) -> None:
+        _, size = self._entries.pop(key)
+        self.nbytes -= size
+
+    def _report(self) -> None:
+        if self.gauge is not None:
+            self.gauge.set(self.nbytes)
@@ -1,3 +1,4 @@
+import time
 import logging
 from datetime import datetime, timedelta
 import pandas as pd
@@ -5,6 +6,7 @@ from fastapi import HTTPException
 from datetime import date
 from typing import List, Dict
 import yfinance as yf
+from app.utils.metrics import PROVIDER_FETCH_SECONDS, PROVIDER_FETCH_ROWS, PROVIDER_FETCH_ERRORS, stage
 
 logger = logging.getLogger(__name__)
 
@@ -16,6 +18,7 @@ def fetch_stock_data(ticker: str, start_date: date, end_date: date, interval: st
             ticker = f"{ticker}.NS"
         
         stock = yf.Ticker(ticker)
+        started = time.perf_counter()
         data = stock.history(
                 start=start_date, 
                 end=end_date, 
@@ -23,7 +26,10 @@ def fetch_stock_data(ticker: str, start_date: date, end_date: date, interval: st
                 auto_adjust=False, 
                 actions=False
                 )
+        PROVIDER_FETCH_SECONDS.observe(time.perf_counter() - started, interval=interval, source="freshness")
+        PROVIDER_FETCH_ROWS.inc(len(data), interval=interval, source="freshness")
         if data.empty:
+            PROVIDER_FETCH_ERRORS.inc(interval=interval, source="freshness")
             logger.error(f"No data found for ticker {ticker}")
             raise HTTPException(status_code=404, detail="No data found for the given ticker")
         return data
@@ -33,6 +39,11 @@ def fetch_stock_data(ticker: str, start_date: date, end_date: date, interval: st
 
 
 async def get_freshness(ticker: str, time_frame: str, proximal_line: float, distal_line: float, leg_out_date: str) -> float:
+    with stage("freshness", time_frame, items=1):
+        return await _get_freshness(ticker, time_frame, proximal_line, distal_line, leg_out_date)
+
+
+async def _get_freshness(ticker: str, time_frame: str, proximal_line: float, distal_line: float, leg_out_date: str) -> float:
     try:
         # Fetch candles from leg_out_date to present
         start_date = datetime.fromisoformat(leg_out_date).date()
@@ -43,34 +54,43 @@ async def get_freshness(ticker: str, time_frame: str, proximal_line: float, dist
             logger.warning(f"No candles found for freshness check: {ticker} ({time_frame})")
             return 3.0  # No data, assume fresh
 
-        approach_count = 0
-        is_breached = False
+        return score_freshness(candles, ticker, time_frame, proximal_line, distal_line, leg_out_date)
+    except Exception as e:
+        logger.error(f"Error checking freshness for {ticker} ({time_frame}): {str(e)}")
+        return 3.0
+
+
+def score_freshness(candles: pd.DataFrame, ticker: str, time_frame: str, proximal_line: float, distal_line: float, leg_out_date: str) -> float:
+    """
+    Freshness score from the candles since the leg-out: 3.0 untouched, 1.5
+    approached once or twice, 0.0 approached more often or closed below the
+    distal line.
+    """
+    approach_count = 0
+    is_breached = False
 
-        # Check each candle for approach or breach
-        for index, candle in candles.iterrows():
-            # Skip the leg-out candle
-            if index.isoformat() == leg_out_date:
-                continue
+    # Check each candle for approach or breach
+    for index, candle in candles.iterrows():
+        # Skip the leg-out candle
+        if index.isoformat() == leg_out_date:
+            continue
 
-            # Approach: Price enters zone
-            if candle['Low'] <= proximal_line and candle['High'] >= distal_line:
-                approach_count += 1
-                logger.info(f"Price approached zone: {ticker} ({time_frame}), Date: {index}, Low={candle['Low']}, High={candle['High']}")
+        # Approach: Price enters zone
+        if candle['Low'] <= proximal_line and candle['High'] >= distal_line:
+            approach_count += 1
+            logger.info(f"Price approached zone: {ticker} ({time_frame}), Date: {index}, Low={candle['Low']}, High={candle['High']}")
 
-            # Breach: Price closes below distal_line
-            if candle['Close'] < distal_line:
-                is_breached = True
-                logger.info(f"Zone breached: {ticker} ({time_frame}), Date: {index}, Close={candle['Close']}, Distal={distal_line}")
-                break
+        # Breach: Price closes below distal_line
+        if candle['Close'] < distal_line:
+            is_breached = True
+            logger.info(f"Zone breached: {ticker} ({time_frame}), Date: {index}, Close={candle['Close']}, Distal={distal_line}")
+            break
 
-        # Assign freshness score
-        if is_breached:
-            return 0.0
-        if approach_count == 0:
-            return 3.0
-        if approach_count <= 2:
-            return 1.5
+    # Assign freshness score
+    if is_breached:
         return 0.0
-    except Exception as e:
-        logger.error(f"Error checking freshness for {ticker} ({time_frame}): {str(e)}")
-        return 3.0
\ No newline at end of file
+    if approach_count == 0:
+        return 3.0
+    if approach_count <= 2:
+        return 1.5
+    return 0.0
@@ -0,0 +1,185 @@
+import os
+import sys
+import time
+import asyncio
+import logging
+import threading
+import traceback
+from collections import deque
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from app.utils.metrics import Counter, Histogram, route_of
+
+logger = logging.getLogger(__name__)
+
+LOOP_WATCHDOG_ENABLED = os.environ.get("LOOP_WATCHDOG_ENABLED", "true").lower() == "true"
+LOOP_STALL_THRESHOLD = float(os.environ.get("LOOP_STALL_THRESHOLD", 0.25))
+LOOP_HEARTBEAT_INTERVAL = float(os.environ.get("LOOP_HEARTBEAT_INTERVAL", 0.05))
+LOOP_STALL_HISTORY = int(os.environ.get("LOOP_STALL_HISTORY", 200))
+STACK_LIMIT = 40
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LOOP_LAG_SECONDS = Histogram(
+    "event_loop_lag_seconds", "How late the event loop heartbeat woke up",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+)
+LOOP_STALLS = Counter(
+    "event_loop_stalls_total", "Callbacks that blocked the event loop past the stall threshold", ["route"]
+)
+LOOP_STALL_SECONDS = Counter(
+    "event_loop_stall_seconds_total", "Time the event loop spent blocked in stalls", ["route"]
+)
+
+
+def blocking_site(stack: List[traceback.FrameSummary]) -> str:
+    """Innermost frame in the app's own code: the call that blocked, as far as we can fix it."""
+    for frame in reversed(stack):
+        if frame.filename.startswith(APP_DIR):
+            return f"{os.path.relpath(frame.filename, os.path.dirname(APP_DIR))}:{frame.lineno} in {frame.name}"
+    return f"{os.path.basename(stack[-1].filename)}:{stack[-1].lineno} in {stack[-1].name}" if stack else "unknown"
+
+
+class LoopWatchdog:
+    """
+    Detects event loop stalls. A heartbeat coroutine stamps the time every
+    `interval`; a watchdog thread notices when the next stamp is overdue by
+    `threshold` (the heartbeat's own lag measure) and captures the loop thread's stack while it is still
+    blocked, with the route of the request whose task is running. When the
+    heartbeat resumes, the stall is logged, counted per route and kept in a
+    bounded history.
+    """
+
+    def __init__(self, threshold: float = LOOP_STALL_THRESHOLD, interval: float = LOOP_HEARTBEAT_INTERVAL,
+                 history: int = LOOP_STALL_HISTORY):
+        self.threshold = threshold
+        self.interval = interval
+        self.stalls = deque(maxlen=history)
+        self._by_route: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self._scopes: Dict[asyncio.Task, dict] = {}   # request task -> ASGI scope, see LoopWatchdogMiddleware
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+        self._beat = 0.0
+        self._pending: Optional[Dict] = None
+        self._stop = threading.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._heartbeat())
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+        logger.info(f"Loop watchdog started: stall threshold {self.threshold}s")
+
+    async def stop(self) -> None:
+        self._stop.set()
+        if self._task:
+            self._task.cancel()
+        if self._thread:
+            await asyncio.to_thread(self._thread.join)
+
+    def track(self, task: asyncio.Task, scope: dict) -> None:
+        self._scopes[task] = scope
+
+    def untrack(self, task: asyncio.Task) -> None:
+        self._scopes.pop(task, None)
+
+    async def _heartbeat(self) -> None:
+        self._beat = time.monotonic()
+        while True:
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            previous, self._beat = self._beat, now
+            pending, self._pending = self._pending, None
+            if pending is not None and pending.pop("beat") != previous:
+                pending = None   # captured during an earlier gap
+            lag = max(0.0, now - previous - self.interval)
+            LOOP_LAG_SECONDS.observe(lag)
+            if lag >= self.threshold:
+                self._finish_stall(lag, pending)
+
+    def _current_route(self) -> str:
+        task = asyncio.current_task(self._loop)
+        if task is None:
+            return "callback"
+        scope = self._scopes.get(task)
+        if scope is None:
+            return f"task:{task.get_name()}"
+        return route_of(scope) or scope.get("path", "unmatched")
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.interval / 2):
+            beat = self._beat
+            # Same measure as the heartbeat's lag: time past the beat that is due
+            if self._pending is None and time.monotonic() - beat - self.interval >= self.threshold:
+                frame = sys._current_frames().get(self._loop_thread)
+                stack = traceback.extract_stack(frame, limit=STACK_LIMIT) if frame is not None else []
+                self._pending = {
+                    "beat": beat,
+                    "route": self._current_route(),
+                    "site": blocking_site(stack),
+                    "stack": "".join(traceback.format_list(stack)),
+                }
+
+    def _finish_stall(self, seconds: float, pending: Optional[Dict]) -> None:
+        # Stalls just over the threshold can end before the watchdog looks
+        pending = pending or {"route": "unknown", "site": "unknown", "stack": ""}
+        route = pending["route"]
+        LOOP_STALLS.inc(route=route)
+        LOOP_STALL_SECONDS.inc(seconds, route=route)
+        stall = {
+            "at": datetime.now(timezone.utc).isoformat(),
+            "seconds": round(seconds, 4),
+            **pending,
+        }
+        with self._lock:
+            self.stalls.append(stall)
+            entry = self._by_route.setdefault(route, {"route": route, "count": 0, "total_seconds": 0.0,
+                                                      "max_seconds": 0.0, "sites": {}})
+            entry["count"] += 1
+            entry["total_seconds"] += seconds
+            entry["max_seconds"] = max(entry["max_seconds"], seconds)
+            entry["sites"][pending["site"]] = entry["sites"].get(pending["site"], 0) + 1
+        logger.warning(f"Event loop blocked for {seconds:.3f}s serving {route} at {pending['site']}\n{pending['stack']}")
+
+    def report(self, recent: int = 20) -> Dict:
+        """Routes ranked by total time blocked, each with the blocking sites seen, plus the latest stalls."""
+        with self._lock:
+            routes = sorted(self._by_route.values(), key=lambda e: e["total_seconds"], reverse=True)
+            return {
+                "threshold_seconds": self.threshold,
+                "routes": [{
+                    **entry,
+                    "total_seconds": round(entry["total_seconds"], 4),
+                    "max_seconds": round(entry["max_seconds"], 4),
+                    "sites": sorted(({"site": s, "count": c} for s, c in entry["sites"].items()),
+                                    key=lambda s: s["count"], reverse=True),
+                } for entry in routes],
+                "recent": list(self.stalls)[-recent:][::-1] if recent else [],
+            }
+
+
+loop_watchdog = LoopWatchdog()
+
+
+class LoopWatchdogMiddleware:
+    """Registers each request's task with the watchdog so stalls can be attributed to its route."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        task = asyncio.current_task()
+        loop_watchdog.track(task, scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            loop_watchdog.untrack(task)
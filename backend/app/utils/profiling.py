@@ -0,0 +1,247 @@
+import os
+import sys
+import hmac
+import time
+import uuid
+import marshal
+import pstats
+import cProfile
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+from app.utils.metrics import route_of, stage_recorder
+
+# Profiling is off unless a token is configured; requests opt in with both headers
+PROFILE_ADMIN_TOKEN = os.environ.get("PROFILE_ADMIN_TOKEN", "")
+PROFILE_MAX_STORED = int(os.environ.get("PROFILE_MAX_STORED", 50))
+PROFILE_SAMPLE_INTERVAL = float(os.environ.get("PROFILE_SAMPLE_INTERVAL", 0.005))
+PROFILE_TOP_FUNCTIONS = 25
+
+PROFILE_HEADER = b"x-profile"
+TOKEN_HEADER = b"x-profile-token"
+REQUEST_ID_HEADER = b"x-request-id"
+MODES = ("cprofile", "sample")
+
+# Leaf frames of threads that are waiting rather than working
+IDLE_FRAMES = {("selectors.py", "select"), ("threading.py", "wait"), ("queue.py", "get"), ("thread.py", "_worker")}
+
+
+def token_matches(token: Optional[str]) -> bool:
+    return bool(PROFILE_ADMIN_TOKEN) and token is not None and hmac.compare_digest(token, PROFILE_ADMIN_TOKEN)
+
+
+def _label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """
+    Samples the Python stacks of every other thread at a fixed interval, so
+    work pushed to executors is seen too. Samples are folded into collapsed
+    stacks (flamegraph / speedscope input).
+    """
+
+    def __init__(self, interval: float = PROFILE_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.stacks: Dict[Tuple[str, ...], int] = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                code = frame.f_code
+                if (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_label(frame.f_code))
+                    frame = frame.f_back
+                key = tuple(reversed(stack))
+                self.stacks[key] = self.stacks.get(key, 0) + 1
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def top_functions(self, limit: int = PROFILE_TOP_FUNCTIONS) -> List[Dict]:
+        own: Dict[str, int] = {}
+        total: Dict[str, int] = {}
+        for stack, count in self.stacks.items():
+            own[stack[-1]] = own.get(stack[-1], 0) + count
+            for name in set(stack):
+                total[name] = total.get(name, 0) + count
+        ranked = sorted(total, key=lambda name: (own.get(name, 0), total[name]), reverse=True)[:limit]
+        return [{
+            "function": name,
+            "self_seconds": round(own.get(name, 0) * self.interval, 4),
+            "total_seconds": round(total[name] * self.interval, 4),
+            "samples": total[name],
+        } for name in ranked]
+
+    def dump(self) -> bytes:
+        lines = [";".join(stack) + f" {count}" for stack, count in sorted(self.stacks.items())]
+        return ("\n".join(lines) + "\n").encode()
+
+
+def cprofile_top_functions(profiler: cProfile.Profile, limit: int = PROFILE_TOP_FUNCTIONS) -> List[Dict]:
+    stats = pstats.Stats(profiler).stats
+    ranked = sorted(stats.items(), key=lambda item: item[1][2], reverse=True)[:limit]
+    return [{
+        "function": f"{name} ({os.path.basename(filename)}:{line})",
+        "calls": calls,
+        "self_seconds": round(own, 4),
+        "total_seconds": round(cumulative, 4),
+    } for (filename, line, name), (_, calls, own, cumulative, _) in ranked]
+
+
+def cprofile_dump(profiler: cProfile.Profile) -> bytes:
+    """Same bytes `Profile.dump_stats` writes, loadable with pstats or snakeviz."""
+    profiler.create_stats()
+    return marshal.dumps(profiler.stats)
+
+
+class ProfileStore:
+    """Most recent request profiles by request id, oldest evicted first."""
+
+    def __init__(self, max_size: int = PROFILE_MAX_STORED):
+        self.max_size = max_size
+        self._profiles: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, request_id: str, summary: Dict, data: bytes) -> None:
+        with self._lock:
+            self._profiles[request_id] = {"summary": summary, "data": data}
+            self._profiles.move_to_end(request_id)
+            while len(self._profiles) > self.max_size:
+                self._profiles.popitem(last=False)
+
+    def summaries(self) -> List[Dict]:
+        with self._lock:
+            return [entry["summary"] for entry in reversed(self._profiles.values())]
+
+    def get(self, request_id: str) -> Optional[Dict]:
+        with self._lock:
+            return self._profiles.get(request_id)
+
+
+profile_store = ProfileStore()
+
+# One profiled request at a time: cProfile is per interpreter, and overlapping
+# samplers would attribute each other's work twice
+_active = threading.Lock()
+
+
+def _header(scope, name: bytes) -> Optional[str]:
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware profiling requests that send `X-Profile: cprofile|sample`
+    with a matching `X-Profile-Token`. Requests without the header pass
+    straight through. The response carries `X-Profile-Id`; the profile is
+    kept in `profile_store` with the top functions and the time per pipeline
+    stage recorded through `metrics.observe_stage`.
+
+    cprofile is deterministic but only sees the event loop thread (it suits
+    /demand-zones); sample also sees executor threads (/multi-demand-zones).
+    Both see whatever else the process runs meanwhile.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not PROFILE_ADMIN_TOKEN:
+            await self.app(scope, receive, send)
+            return
+        mode = _header(scope, PROFILE_HEADER)
+        if mode is None:
+            await self.app(scope, receive, send)
+            return
+
+        mode = mode.strip().lower()
+        mode = "cprofile" if mode in ("", "1", "true") else mode
+        if mode not in MODES or not token_matches(_header(scope, TOKEN_HEADER)):
+            await self.app(scope, receive, send)
+            return
+
+        if not _active.acquire(blocking=False):
+            await self.app(scope, receive, self._with_headers(send, [(b"x-profile-status", b"busy")]))
+            return
+
+        request_id = _header(scope, REQUEST_ID_HEADER) or uuid.uuid4().hex
+        stages: Dict[str, Dict] = {}
+        stages_lock = threading.Lock()
+        status = {"code": 500}
+
+        def record(name: str, seconds: float, interval: str, items: int) -> None:
+            # Stages observed in executor threads report here too (to_thread copies the context)
+            with stages_lock:
+                entry = stages.setdefault(name, {"seconds": 0.0, "calls": 0, "items": 0})
+                entry["seconds"] += seconds
+                entry["calls"] += 1
+                entry["items"] += items
+
+        extra = [(b"x-profile-id", request_id.encode("latin-1"))]
+        inner_send = self._with_headers(send, extra)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await inner_send(message)
+
+        token = stage_recorder.set(record)
+        profiler = cProfile.Profile() if mode == "cprofile" else None
+        sampler = StackSampler() if mode == "sample" else None
+        started_at = datetime.now(timezone.utc)
+        started = time.perf_counter()
+        try:
+            if profiler:
+                profiler.enable()
+            else:
+                sampler.start()
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                duration = time.perf_counter() - started
+                if profiler:
+                    profiler.disable()
+                else:
+                    sampler.stop()
+                stage_recorder.reset(token)
+                # Stored on failures too; those are often the requests worth profiling
+                profile_store.put(request_id, {
+                    "request_id": request_id,
+                    "mode": mode,
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "query": scope.get("query_string", b"").decode("latin-1"),
+                    "route": route_of(scope),
+                    "status": status["code"],
+                    "started_at": started_at.isoformat(),
+                    "duration_seconds": round(duration, 4),
+                    "stages": {name: {**entry, "seconds": round(entry["seconds"], 4)} for name, entry in stages.items()},
+                    "top_functions": cprofile_top_functions(profiler) if profiler else sampler.top_functions(),
+                }, cprofile_dump(profiler) if profiler else sampler.dump())
+        finally:
+            _active.release()
+
+    @staticmethod
+    def _with_headers(send, headers: List[Tuple[bytes, bytes]]):
+        async def wrapper(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": list(message.get("headers", [])) + headers}
+            await send(message)
+        return wrapper
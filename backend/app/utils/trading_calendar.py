@@ -0,0 +1,161 @@
+import os
+import json
+import math
+import logging
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, Optional, Tuple, Union
+from zoneinfo import ZoneInfo
+
+logger = logging.getLogger(__name__)
+
+IST = ZoneInfo("Asia/Kolkata")
+SESSION_OPEN = time(9, 15)
+SESSION_CLOSE = time(15, 30)
+NSE_HOLIDAYS_FILE = os.environ.get(
+    "NSE_HOLIDAYS_FILE",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "data", "nse_holidays.json")
+)
+
+INTRADAY_MINUTES = {"1m": 1, "2m": 2, "5m": 5, "15m": 15, "30m": 30, "60m": 60, "90m": 90, "1h": 60}
+
+
+def _as_date(value: Union[date, datetime, str]) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, str):
+        return date.fromisoformat(value[:10])
+    return value
+
+
+class TradingCalendar:
+    """
+    NSE equity sessions: weekdays other than exchange holidays, 09:15-15:30 IST.
+
+    Years missing from the holiday list count every weekday as a session, so a
+    stale list costs extra provider calls but never hides data; each such
+    year is logged once.
+    """
+
+    def __init__(self, holidays: Dict[date, str], tz: ZoneInfo = IST,
+                 open_time: time = SESSION_OPEN, close_time: time = SESSION_CLOSE):
+        self.holidays = holidays
+        self.years = {day.year for day in holidays}
+        self.tz = tz
+        self.open_time = open_time
+        self.close_time = close_time
+        self.session_minutes = (datetime.combine(date.min, close_time) - datetime.combine(date.min, open_time)).seconds // 60
+        self._warned = set()
+
+    @classmethod
+    def from_file(cls, path: str = NSE_HOLIDAYS_FILE) -> "TradingCalendar":
+        try:
+            with open(path) as f:
+                data = json.load(f)
+            holidays = {
+                date.fromisoformat(entry["date"]): entry["name"]
+                for entries in data["holidays"].values() for entry in entries
+            }
+        except (OSError, ValueError, KeyError) as e:
+            logger.error(f"Could not load trading holidays from {path}: {str(e)}")
+            holidays = {}
+        return cls(holidays)
+
+    def _now(self, at: Optional[datetime] = None) -> datetime:
+        return (at or datetime.now(self.tz)).astimezone(self.tz)
+
+    def is_trading_day(self, day: Union[date, datetime, str]) -> bool:
+        day = _as_date(day)
+        if day.weekday() >= 5:
+            return False
+        if day.year not in self.years and day.year not in self._warned:
+            self._warned.add(day.year)
+            logger.warning(f"No NSE holiday list for {day.year}; treating every weekday as a session")
+        return day not in self.holidays
+
+    def holiday(self, day: Union[date, datetime, str]) -> Optional[str]:
+        return self.holidays.get(_as_date(day))
+
+    def session(self, day: date) -> Tuple[datetime, datetime]:
+        """Open and close of `day`'s session as aware datetimes."""
+        return datetime.combine(day, self.open_time, self.tz), datetime.combine(day, self.close_time, self.tz)
+
+    def next_trading_day(self, day: date) -> date:
+        day += timedelta(days=1)
+        while not self.is_trading_day(day):
+            day += timedelta(days=1)
+        return day
+
+    def previous_trading_day(self, day: date) -> date:
+        day -= timedelta(days=1)
+        while not self.is_trading_day(day):
+            day -= timedelta(days=1)
+        return day
+
+    def trading_days(self, start: Union[date, datetime, str], end: Union[date, datetime, str]) -> List[date]:
+        """Sessions in [start, end)."""
+        start, end = _as_date(start), _as_date(end)
+        return [start + timedelta(days=i) for i in range((end - start).days) if self.is_trading_day(start + timedelta(days=i))]
+
+    def is_open(self, at: Optional[datetime] = None) -> bool:
+        now = self._now(at)
+        if not self.is_trading_day(now.date()):
+            return False
+        session_open, session_close = self.session(now.date())
+        return session_open <= now < session_close
+
+    def last_completed_session(self, at: Optional[datetime] = None) -> date:
+        now = self._now(at)
+        today = now.date()
+        if self.is_trading_day(today) and now >= self.session(today)[1]:
+            return today
+        return self.previous_trading_day(today)
+
+    def default_end_date(self, at: Optional[datetime] = None) -> date:
+        """
+        Exclusive end date covering every completed session. It stays put from
+        one close to the next, so repeated default requests hit the candle
+        store instead of asking the provider for bars that cannot exist yet.
+        """
+        return self.last_completed_session(at) + timedelta(days=1)
+
+    def was_open_between(self, since: datetime, until: Optional[datetime] = None) -> bool:
+        """Whether the market was open at any moment in (since, until]; if not, no quote or bar can have changed."""
+        since = since.astimezone(self.tz)
+        until = self._now(until)
+        day = since.date()
+        while day <= until.date():
+            if self.is_trading_day(day):
+                session_open, session_close = self.session(day)
+                if session_open < until and session_close > since:
+                    return True
+            day += timedelta(days=1)
+        return False
+
+    def expected_bars(self, start: Union[date, datetime, str], end: Union[date, datetime, str], interval: str,
+                      at: Optional[datetime] = None) -> int:
+        """Bars a provider should have for [start, end) as of `at`, counting the running session's bars so far."""
+        now = self._now(at)
+        days = [day for day in self.trading_days(start, end) if day < now.date()
+                or (day == now.date() and now >= self.session(day)[0])]
+        if interval in INTRADAY_MINUTES:
+            step = INTRADAY_MINUTES[interval]
+            full = math.ceil(self.session_minutes / step)
+            count = 0
+            for day in days:
+                elapsed = (now - self.session(day)[0]).total_seconds() / 60 if day == now.date() else self.session_minutes
+                count += min(full, int(elapsed // step) + 1)
+            return count
+        if interval == "1d":
+            return len(days)
+        if interval == "5d":
+            return math.ceil(len(days) / 5)
+        if interval == "1wk":
+            return len({day.isocalendar()[:2] for day in days})
+        if interval == "1mo":
+            return len({(day.year, day.month) for day in days})
+        if interval == "3mo":
+            return len({(day.year, (day.month - 1) // 3) for day in days})
+        raise ValueError(f"Unknown interval {interval}")
+
+
+trading_calendar = TradingCalendar.from_file()
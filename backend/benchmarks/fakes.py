@@ -0,0 +1,264 @@
+import time
+import copy
+import threading
+from contextlib import ExitStack, contextmanager
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+from unittest import mock
+import pandas as pd
+from fastapi import HTTPException
+from pymongo import UpdateOne, UpdateMany, DeleteOne, DeleteMany, InsertOne
+from benchmarks.synthetic import SyntheticMarket
+
+# Modules that bound fetch_stock_data at import time
+PROVIDER_TARGETS = [
+    "app.services.services.fetch_stock_data",
+    "app.services.candle_service.fetch_stock_data",
+    "app.controllers.ohlcData.fetch_stock_data",
+]
+QUOTE_TARGETS = [
+    "app.services.price_cache.download_quotes",
+    "app.services.quote_service.download_quotes",
+]
+FRESHNESS_TARGET = "app.utils.freshness_service.fetch_stock_data"
+
+
+class FakeProvider:
+    """
+    Stand-in for the yfinance download: serves SyntheticMarket candles with an
+    optional per-call latency, and counts calls per interval.
+    """
+
+    def __init__(self, market: SyntheticMarket, latency: float = 0.0):
+        self.market = market
+        self.latency = latency
+        self.calls: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def fetch(self, ticker: str, start_date: date, end_date: date, interval: str) -> Optional[pd.DataFrame]:
+        with self._lock:
+            self.calls[interval] = self.calls.get(interval, 0) + 1
+        if self.latency:
+            time.sleep(self.latency)
+        data = self.market.slice(ticker, start_date, end_date, interval)
+        return None if data.empty else data.copy()
+
+    def fetch_strict(self, ticker: str, start_date: date, end_date: date, interval: str) -> pd.DataFrame:
+        """Variant matching freshness_service, which raises instead of returning None."""
+        data = self.fetch(ticker, start_date, end_date, interval)
+        if data is None:
+            raise HTTPException(status_code=404, detail="No data found for the given ticker")
+        return data
+
+    def download_quotes(self, symbols: List[str], start: Optional[str] = None, end: Optional[str] = None) -> Dict[str, Dict]:
+        """Stand-in for quote_service.download_quotes: last daily bar of each symbol."""
+        with self._lock:
+            self.calls["quotes"] = self.calls.get("quotes", 0) + 1
+        if self.latency:
+            time.sleep(self.latency)
+        quotes = {}
+        for symbol in symbols:
+            data = self.market.series(symbol, "1d")
+            if end:
+                data = data[data.index.date < date.fromisoformat(end)]
+            if data.empty:
+                continue
+            last = data.iloc[-1]
+            quotes[symbol] = {
+                "ltp": round(float(last["Close"]), 2),
+                "day_low": round(float(last["Low"]), 2),
+                "day_high": round(float(last["High"]), 2),
+                "bar_time": data.index[-1].isoformat(),
+            }
+        return quotes
+
+    @contextmanager
+    def installed(self):
+        """Route every provider call of the app through this fake while the block runs."""
+        with ExitStack() as stack:
+            for target in PROVIDER_TARGETS:
+                stack.enter_context(mock.patch(target, self.fetch))
+            stack.enter_context(mock.patch(FRESHNESS_TARGET, self.fetch_strict))
+            for target in QUOTE_TARGETS:
+                stack.enter_context(mock.patch(target, self.download_quotes))
+            yield self
+
+
+def _matches(doc: Dict, query: Dict) -> bool:
+    for field, condition in query.items():
+        value = doc.get(field)
+        if isinstance(condition, dict):
+            for op, operand in condition.items():
+                if op == "$in" and value not in operand:
+                    return False
+                if op == "$nin" and value in operand:
+                    return False
+                if op == "$exists" and (field in doc) != bool(operand):
+                    return False
+                if op == "$ne" and value == operand:
+                    return False
+                if op == "$gte" and not (value is not None and value >= operand):
+                    return False
+                if op == "$lt" and not (value is not None and value < operand):
+                    return False
+                if op == "$lte" and not (value is not None and value <= operand):
+                    return False
+        elif isinstance(value, list) and not isinstance(condition, list):
+            if condition not in value:
+                return False
+        elif value != condition:
+            return False
+    return True
+
+
+class _Result:
+    def __init__(self, **counts):
+        self.__dict__.update(counts)
+        self.raw_result = counts
+
+
+class _Cursor:
+    def __init__(self, docs: List[Dict]):
+        self._docs = docs
+
+    def sort(self, field: str, direction: int = 1) -> "_Cursor":
+        self._docs.sort(key=lambda d: (d.get(field) is None, d.get(field)), reverse=direction < 0)
+        return self
+
+    def skip(self, count: int) -> "_Cursor":
+        self._docs = self._docs[count:]
+        return self
+
+    def limit(self, count: int) -> "_Cursor":
+        if count:
+            self._docs = self._docs[:count]
+        return self
+
+    async def to_list(self, length: Optional[int] = None) -> List[Dict]:
+        return self._docs if length is None else self._docs[:length]
+
+
+# Unique index of the lower_zones collection
+LOWER_ZONE_KEY = ("parent_zone_id", "zone_id")
+
+
+class InMemoryCollection:
+    """
+    Async stand-in for the Motor collections used by the zone services:
+    equality, $in/$nin/$ne/$gte/$lt/$lte/$exists filters, $set/$unset updates
+    with upsert, and bulk_write of the pymongo operations the services emit.
+    `key` names the fields of the unique index init_db creates.
+    """
+
+    def __init__(self, key: Tuple[str, ...] = ("zone_id",)):
+        self.docs: List[Dict] = []
+        self.writes = 0
+        self.key = key
+        self._by_key: Dict[Tuple, Dict] = {}
+
+    def _index(self, doc: Dict) -> None:
+        if all(field in doc for field in self.key):
+            self._by_key[tuple(doc[field] for field in self.key)] = doc
+
+    def _insert(self, doc: Dict) -> None:
+        self.docs.append(doc)
+        self._index(doc)
+
+    def _candidates(self, query: Dict) -> List[Dict]:
+        values = tuple(query.get(field) for field in self.key)
+        if all(isinstance(value, str) for value in values):
+            doc = self._by_key.get(values)
+            return [doc] if doc is not None else []
+        return self.docs
+
+    def _project(self, doc: Dict, projection: Optional[Dict]) -> Dict:
+        if not projection:
+            return copy.deepcopy(doc)
+        included = [f for f, v in projection.items() if v and f != "_id"]
+        if included:
+            return {f: copy.deepcopy(doc[f]) for f in included if f in doc}
+        return {f: copy.deepcopy(v) for f, v in doc.items() if projection.get(f, 1)}
+
+    def find(self, query: Optional[Dict] = None, projection: Optional[Dict] = None) -> _Cursor:
+        return _Cursor([self._project(d, projection) for d in self.docs if _matches(d, query or {})])
+
+    async def find_one(self, query: Optional[Dict] = None, projection: Optional[Dict] = None) -> Optional[Dict]:
+        docs = await self.find(query, projection).to_list(1)
+        return docs[0] if docs else None
+
+    async def count_documents(self, query: Dict) -> int:
+        return sum(1 for d in self.docs if _matches(d, query))
+
+    def _update(self, query: Dict, update: Dict, upsert: bool = False, many: bool = False) -> _Result:
+        self.writes += 1
+        matched = 0
+        for doc in self._candidates(query):
+            if _matches(doc, query):
+                doc.update(copy.deepcopy(update.get("$set", {})))
+                for field, values in update.get("$addToSet", {}).items():
+                    target = doc.setdefault(field, [])
+                    target.extend(v for v in values["$each"] if v not in target)
+                for field in update.get("$unset", {}):
+                    doc.pop(field, None)
+                matched += 1
+                if not many:
+                    break
+        if not matched and upsert:
+            doc = {k: v for k, v in query.items() if not isinstance(v, dict)}
+            doc.update(copy.deepcopy(update.get("$set", {})))
+            doc.update(copy.deepcopy(update.get("$setOnInsert", {})))
+            for field, values in update.get("$addToSet", {}).items():
+                doc[field] = list(dict.fromkeys(values["$each"]))
+            self._insert(doc)
+            return _Result(matched_count=0, modified_count=0, upserted_count=1)
+        return _Result(matched_count=matched, modified_count=matched, upserted_count=0)
+
+    def _delete(self, query: Dict, many: bool = False) -> int:
+        self.writes += 1
+        kept, deleted = [], 0
+        for doc in self.docs:
+            if _matches(doc, query) and (many or not deleted):
+                deleted += 1
+            else:
+                kept.append(doc)
+        self.docs = kept
+        self._by_key = {}
+        for doc in kept:
+            self._index(doc)
+        return deleted
+
+    async def update_one(self, query: Dict, update: Dict, upsert: bool = False) -> _Result:
+        return self._update(query, update, upsert)
+
+    async def update_many(self, query: Dict, update: Dict, upsert: bool = False) -> _Result:
+        return self._update(query, update, upsert, many=True)
+
+    async def insert_many(self, docs: List[Dict], ordered: bool = True) -> _Result:
+        self.writes += 1
+        for doc in copy.deepcopy(docs):
+            self._insert(doc)
+        return _Result(inserted_count=len(docs))
+
+    async def delete_one(self, query: Dict) -> _Result:
+        return _Result(deleted_count=self._delete(query))
+
+    async def delete_many(self, query: Dict) -> _Result:
+        return _Result(deleted_count=self._delete(query, many=True))
+
+    async def bulk_write(self, operations: List, ordered: bool = True) -> _Result:
+        matched = upserted = deleted = inserted = 0
+        for op in operations:
+            if isinstance(op, (UpdateOne, UpdateMany)):
+                result = self._update(op._filter, op._doc, op._upsert, many=isinstance(op, UpdateMany))
+                matched += result.matched_count
+                upserted += result.upserted_count
+            elif isinstance(op, (DeleteOne, DeleteMany)):
+                deleted += self._delete(op._filter, many=isinstance(op, DeleteMany))
+            elif isinstance(op, InsertOne):
+                self._insert(copy.deepcopy(op._doc))
+                inserted += 1
+        return _Result(matched_count=matched, modified_count=matched, upserted_count=upserted,
+                       deleted_count=deleted, inserted_count=inserted)
+
+    async def create_indexes(self, indexes: List) -> List[str]:
+        return []
@@ -0,0 +1,375 @@
+"""
+Mixed-load HTTP test of the FastAPI app.
+
+The app is started in-process with uvicorn on a background thread, with the
+market data provider replaced by the seeded FakeProvider. It talks to the MongoDB
+at --mongo-uri, which should be a local or throwaway instance: the scan
+scenario writes SYN* zones, and they are deleted again at the end. Virtual
+users of each profile (dashboard, trade journal polling, charts, scanner) hit
+the app over keep-alive HTTP/1.1 connections. A probe on the server's event loop
+measures how late its timers fire, which shows when a handler blocks the loop.
+
+    cd backend
+    python -m benchmarks.loadtest --scenario mixed --duration 60
+    python -m benchmarks.loadtest --url http://127.0.0.1:8000 --scenario read
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+from unittest import mock
+from urllib.parse import urlparse, urlencode
+
+from benchmarks.synthetic import SyntheticMarket
+from benchmarks.fakes import FakeProvider
+
+
+class HttpConnection:
+    """Minimal keep-alive HTTP/1.1 client on asyncio streams (Content-Length and chunked bodies)."""
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+
+    async def _connect(self) -> None:
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+
+    async def close(self) -> None:
+        if self._writer:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except OSError:
+                pass
+            self._writer = None
+
+    async def request(self, method: str, path: str, body: Optional[Dict] = None) -> Tuple[int, bytes]:
+        if self._writer is None:
+            await self._connect()
+        payload = json.dumps(body).encode() if body is not None else b""
+        head = (
+            f"{method} {path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(payload)}\r\n\r\n"
+        )
+        try:
+            self._writer.write(head.encode() + payload)
+            await self._writer.drain()
+            return await self._read_response()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            await self.close()
+            raise
+
+    async def _read_response(self) -> Tuple[int, bytes]:
+        status_line = await self._reader.readuntil(b"\r\n")
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = await self._reader.readuntil(b"\r\n")
+            if line == b"\r\n":
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await self._reader.readuntil(b"\r\n")).split(b";")[0], 16)
+                if size == 0:
+                    await self._reader.readuntil(b"\r\n")
+                    break
+                chunks.append(await self._reader.readexactly(size))
+                await self._reader.readexactly(2)
+            body = b"".join(chunks)
+        else:
+            body = await self._reader.readexactly(int(headers.get("content-length", 0)))
+
+        if headers.get("connection", "").lower() == "close":
+            await self.close()
+        return status, body
+
+
+@dataclass
+class Call:
+    name: str
+    method: str
+    path: Callable[[random.Random], str]
+    body: Optional[Callable[[random.Random], Dict]] = None
+    weight: float = 1.0
+
+
+@dataclass
+class Profile:
+    name: str
+    users: int
+    think_seconds: float
+    calls: List[Call]
+
+
+@dataclass
+class Results:
+    latencies: Dict[str, List[float]] = field(default_factory=dict)
+    errors: Dict[str, int] = field(default_factory=dict)
+    statuses: Dict[str, Dict[int, int]] = field(default_factory=dict)
+
+    def record(self, name: str, seconds: float, status: Optional[int]) -> None:
+        self.latencies.setdefault(name, []).append(seconds)
+        codes = self.statuses.setdefault(name, {})
+        codes[status or 0] = codes.get(status or 0, 0) + 1
+        if status is None or status >= 500:
+            self.errors[name] = self.errors.get(name, 0) + 1
+
+
+def build_profiles(tickers: List[str], scale: float) -> Dict[str, Profile]:
+    today = datetime.now().date()
+
+    def users(n: int) -> int:
+        return max(1, round(n * scale))
+
+    def all_zones(r: random.Random) -> str:
+        query = {"page": r.randint(1, 5), "limit": 20, "sort_by": r.choice(["timestamp", "trade_score"])}
+        if r.random() < 0.3:
+            query["ticker"] = r.choice(tickers)
+        return f"/zones/all-zones?{urlencode(query)}"
+
+    def ohlc(r: random.Random) -> str:
+        interval = r.choice(["1d", "1d", "1h"])
+        days = 365 if interval == "1d" else 30
+        query = {
+            "ticker": r.choice(tickers), "interval": interval,
+            "start_date": (today - timedelta(days=days)).isoformat(), "end_date": today.isoformat(),
+        }
+        return f"/ohlc-data?{urlencode(query)}"
+
+    def realtime(r: random.Random) -> Dict:
+        return {"tickers": r.sample(tickers, min(len(tickers), 15))}
+
+    def scan(r: random.Random) -> Dict:
+        return {
+            "start_date": (today - timedelta(days=365)).isoformat(), "end_date": today.isoformat(),
+            "higher_interval": "1d", "lower_interval": "1h", "detectLowerZones": r.random() < 0.5,
+        }
+
+    return {
+        "dashboard": Profile("dashboard", users(8), 0.5, [
+            Call("GET /zones/all-zones", "GET", all_zones, weight=3),
+            Call("GET /zones/actionable", "GET", lambda r: "/zones/actionable?limit=50"),
+        ]),
+        "journal": Profile("journal", users(4), 2.0, [
+            Call("POST /trades/realtime-data", "POST", lambda r: "/trades/realtime-data", realtime),
+        ]),
+        "charts": Profile("charts", users(4), 1.0, [
+            Call("GET /ohlc-data", "GET", ohlc),
+        ]),
+        "scanner": Profile("scanner", 1, 5.0, [
+            Call("POST /multi-demand-zones", "POST", lambda r: "/multi-demand-zones", scan),
+        ]),
+    }
+
+
+SCENARIOS = {
+    "mixed": ["dashboard", "journal", "charts", "scanner"],
+    "read": ["dashboard", "journal", "charts"],
+    "scan": ["dashboard", "scanner"],
+}
+
+
+async def virtual_user(profile: Profile, host: str, port: int, deadline: float, seed: int, results: Results) -> None:
+    r = random.Random(seed)
+    connection = HttpConnection(host, port)
+    weights = [call.weight for call in profile.calls]
+    # Stagger start so users of a profile do not fire in lockstep
+    await asyncio.sleep(r.uniform(0, profile.think_seconds))
+    try:
+        while time.monotonic() < deadline:
+            call = r.choices(profile.calls, weights)[0]
+            started = time.perf_counter()
+            status = None
+            try:
+                status, _ = await connection.request(call.method, call.path(r), call.body(r) if call.body else None)
+            except (OSError, asyncio.IncompleteReadError, ValueError):
+                pass
+            results.record(call.name, time.perf_counter() - started, status)
+            await asyncio.sleep(r.expovariate(1 / profile.think_seconds))
+    finally:
+        await connection.close()
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(q / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return None if seconds is None else round(seconds * 1000, 2)
+
+
+def summarize(results: Results, lag: List[float], elapsed: float) -> Dict:
+    endpoints = {}
+    for name, values in sorted(results.latencies.items()):
+        endpoints[name] = {
+            "requests": len(values),
+            "errors": results.errors.get(name, 0),
+            "statuses": {str(code): count for code, count in sorted(results.statuses[name].items())},
+            "throughput_rps": round(len(values) / elapsed, 2),
+            "p50_ms": _ms(percentile(values, 50)),
+            "p95_ms": _ms(percentile(values, 95)),
+            "p99_ms": _ms(percentile(values, 99)),
+            "max_ms": _ms(max(values)),
+        }
+    return {
+        "duration_seconds": round(elapsed, 2),
+        "requests": sum(e["requests"] for e in endpoints.values()),
+        "throughput_rps": round(sum(e["requests"] for e in endpoints.values()) / elapsed, 2),
+        "endpoints": endpoints,
+        "event_loop_lag": {
+            "samples": len(lag),
+            "p50_ms": _ms(percentile(lag, 50)),
+            "p99_ms": _ms(percentile(lag, 99)),
+            "max_ms": _ms(max(lag)) if lag else None,
+            "over_100ms": sum(1 for value in lag if value > 0.1),
+        } if lag else None,
+    }
+
+
+class InProcessServer:
+    """Runs the app with uvicorn on its own thread and event loop."""
+
+    def __init__(self, host: str, port: int):
+        import uvicorn
+        from main import app
+        self.server = uvicorn.Server(uvicorn.Config(app, host=host, port=port, log_level="warning", lifespan="on"))
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread = threading.Thread(target=self._run, name="loadtest-server", daemon=True)
+
+    def _run(self) -> None:
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_until_complete(self.server.serve())
+
+    def start(self, timeout: float = 30) -> None:
+        self._thread.start()
+        deadline = time.monotonic() + timeout
+        while not self.server.started:
+            if time.monotonic() > deadline or not self._thread.is_alive():
+                raise RuntimeError("Server did not start")
+            time.sleep(0.05)
+
+    def stop(self) -> None:
+        self.server.should_exit = True
+        self._thread.join(timeout=30)
+
+
+async def lag_probe(interval: float, samples: List[float], stop: threading.Event) -> None:
+    """Runs on the server loop: records how late each `interval` sleep wakes up."""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, time.perf_counter() - started - interval))
+
+
+async def run_load(profiles: List[Profile], host: str, port: int, duration: float, seed: int) -> Tuple[Results, float]:
+    results = Results()
+    deadline = time.monotonic() + duration
+    started = time.perf_counter()
+    users = [
+        virtual_user(profile, host, port, deadline, seed * 1000 + p * 100 + u, results)
+        for p, profile in enumerate(profiles) for u in range(profile.users)
+    ]
+    await asyncio.gather(*users)
+    return results, time.perf_counter() - started
+
+
+async def cleanup_synthetic_zones(prefix: str) -> int:
+    from app.db.database import collection, lower_zone_collection
+    result = await collection.delete_many({"ticker": {"$regex": f"^{prefix}"}})
+    await lower_zone_collection.delete_many({"ticker": {"$regex": f"^{prefix}"}})
+    return result.deleted_count
+
+
+def main(args: argparse.Namespace) -> Dict:
+    tickers = [f"SYN{i:04d}" for i in range(args.tickers)]
+    all_profiles = build_profiles(tickers, args.users_scale)
+    profiles = [all_profiles[name] for name in SCENARIOS[args.scenario]]
+    lag: List[float] = []
+
+    if args.url:
+        target = urlparse(args.url)
+        print(f"Running '{args.scenario}' for {args.duration}s against {args.url} (no loop lag probe)")
+        results, elapsed = asyncio.run(run_load(profiles, target.hostname, target.port or 80, args.duration, args.seed))
+        return {"scenario": args.scenario, "target": args.url, **summarize(results, lag, elapsed)}
+
+    os.environ["MONGODB_URI"] = args.mongo_uri
+    os.environ.setdefault("SCHEDULER_ENABLED", "false")   # keep scheduled scans out of the measurement
+    provider = FakeProvider(SyntheticMarket(seed=args.seed), latency=args.provider_latency / 1000)
+    with provider.installed(), \
+            mock.patch("app.controllers.controllers.load_tickers_from_json", return_value=tickers[:args.scan_tickers]):
+        server = InProcessServer(args.host, args.port)
+        server.start()
+        stop = threading.Event()
+        probe = asyncio.run_coroutine_threadsafe(lag_probe(args.lag_interval / 1000, lag, stop), server.loop)
+        try:
+            print(f"Running '{args.scenario}' for {args.duration}s: "
+                  + ", ".join(f"{p.users} {p.name}" for p in profiles))
+            results, elapsed = asyncio.run(run_load(profiles, args.host, args.port, args.duration, args.seed))
+        finally:
+            stop.set()
+            probe.result(timeout=5)
+            if "scanner" in SCENARIOS[args.scenario]:
+                deleted = asyncio.run_coroutine_threadsafe(cleanup_synthetic_zones("SYN"), server.loop).result(timeout=30)
+                print(f"Removed {deleted} synthetic zones")
+            server.stop()
+
+    summary = summarize(results, lag, elapsed)
+    summary["provider_calls"] = dict(provider.calls)
+    return {"scenario": args.scenario, "target": "in-process", **summary}
+
+
+def print_report(report: Dict) -> None:
+    print(f"\n{'endpoint':<30}{'reqs':>7}{'err':>5}{'rps':>8}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}  (ms)")
+    for name, e in report["endpoints"].items():
+        print(f"{name:<30}{e['requests']:>7}{e['errors']:>5}{e['throughput_rps']:>8}"
+              f"{e['p50_ms']:>9}{e['p95_ms']:>9}{e['p99_ms']:>9}{e['max_ms']:>9}")
+    lag = report.get("event_loop_lag")
+    if lag:
+        print(f"\nevent loop lag: p50 {lag['p50_ms']} ms, p99 {lag['p99_ms']} ms, max {lag['max_ms']} ms, "
+              f"{lag['over_100ms']} of {lag['samples']} samples over 100 ms")
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="mixed")
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--users-scale", type=float, default=1.0, help="multiplies the users of every profile but the scanner")
+    parser.add_argument("--tickers", type=int, default=50)
+    parser.add_argument("--scan-tickers", type=int, default=20, help="tickers in each /multi-demand-zones scan")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--provider-latency", type=float, default=50.0, help="simulated provider latency per call, ms")
+    parser.add_argument("--lag-interval", type=float, default=10.0, help="event loop probe period, ms")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--mongo-uri", default="mongodb://localhost:27017")
+    parser.add_argument("--url", help="load an already running server instead of starting one")
+    parser.add_argument("--out", help="write the JSON report here")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args(sys.argv[1:])
+    report = main(args)
+    print_report(report)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.out}")
@@ -0,0 +1,136 @@
+"""
+Parity check of walk-forward zone detection against identify_demand_zones.
+
+walkforward_service.detect_zones re-implements the detection rules on
+precomputed arrays, so it can drift from services.identify_demand_zones when
+either changes. This runs both on the seeded SyntheticMarket for the default
+parameters and for each value of the default walk-forward grid, one parameter
+at a time, and lists the zones found by only one of them. Exits non-zero on
+any difference:
+
+    cd backend
+    python -m benchmarks.parity --tickers 10 --days 730
+"""
+import io
+import sys
+import asyncio
+import argparse
+from contextlib import redirect_stdout
+from datetime import timedelta
+from typing import Dict, List, Set, Tuple
+
+import pandas as pd
+
+from benchmarks.synthetic import SyntheticMarket
+from benchmarks.fakes import FakeProvider
+from app.models.models import WalkForwardRequest
+from app.services.services import identify_demand_zones
+from app.services.walkforward_service import DEFAULT_PARAMS, candle_features, detect_zones
+
+# Zones are compared on (proximal, distal, leg-out ns, score without freshness)
+Zone = Tuple[float, float, int, float]
+
+
+def param_sets() -> List[Dict]:
+    """DEFAULT_PARAMS, then every value of the default grid applied to it on its own."""
+    sets = [dict(DEFAULT_PARAMS)]
+    for name, values in WalkForwardRequest.model_fields["grid"].default.items():
+        sets.extend({**DEFAULT_PARAMS, name: value} for value in values if value != DEFAULT_PARAMS[name])
+    return sets
+
+
+def detection_kwargs(params: Dict) -> Dict:
+    """identify_demand_zones arguments for walk-forward `params`; detect_zones uses one movement for both legs."""
+    return {
+        "legin_min_body_percent": params["leginMinBodyPercent"],
+        "legout_min_body_percent": params["legoutMinBodyPercent"],
+        "base_max_body_percent": params["baseMaxBodyPercent"],
+        "min_base_candles": params["minBaseCandles"],
+        "max_base_candles": params["maxBaseCandles"],
+        "min_legin_movement": params["minLeginMovement"],
+        "min_legout_movement": params["minLeginMovement"],
+    }
+
+
+def _ns(timestamp: str) -> int:
+    return pd.Timestamp(timestamp).tz_convert("UTC").value
+
+
+async def reference_zones(data: pd.DataFrame, ticker: str, interval: str, params: Dict) -> Set[Zone]:
+    zones = await identify_demand_zones(data=data, ticker=ticker, time_frame=interval, **detection_kwargs(params))
+    return {
+        (round(float(zone["proximal_line"]), 6), round(float(zone["distal_line"]), 6), _ns(zone["end_timestamp"]),
+         round(float(zone["trade_score"] - zone["freshness"]), 6))
+        for zone in zones
+    }
+
+
+def walk_forward_zones(features: Dict, params: Dict) -> Set[Zone]:
+    zones = detect_zones(features, 0, len(features["times"]), params)
+    return {
+        (round(proximal, 6), round(distal, 6), int(features["times"][start - 1]), round(score - 3.0, 6))
+        for proximal, distal, score, start in zip(
+            zones["proximal"].tolist(), zones["distal"].tolist(), zones["trade_score"].tolist(), zones["start_idx"].tolist()
+        )
+    }
+
+
+async def check_parity(market: SyntheticMarket, provider: FakeProvider, tickers: List[str],
+                       interval: str, start, end) -> Dict:
+    """
+    Zones of both detectors per ticker and parameter set.
+
+    Returns:
+        Counts of configurations and zones compared, and the mismatches found.
+    """
+    mismatches = []
+    compared = 0
+    sets = param_sets()
+    with provider.installed(), redirect_stdout(io.StringIO()):
+        for ticker in tickers:
+            data = market.slice(ticker, start, end, interval)
+            if data is None or data.empty:
+                continue
+            features = candle_features(data)
+            for params in sets:
+                expected = await reference_zones(data, ticker, interval, params)
+                actual = walk_forward_zones(features, params)
+                compared += len(expected)
+                if expected != actual:
+                    mismatches.append({
+                        "ticker": ticker,
+                        "params": params,
+                        "only_identify_demand_zones": sorted(expected - actual),
+                        "only_detect_zones": sorted(actual - expected),
+                    })
+    return {"tickers": len(tickers), "param_sets": len(sets), "zones": compared, "mismatches": mismatches}
+
+
+async def main(args: argparse.Namespace) -> Dict:
+    market = SyntheticMarket(seed=args.seed, zone_density=args.density)
+    provider = FakeProvider(market)
+    tickers = [f"SYN{i:04d}" for i in range(args.tickers)]
+    end = market.today + timedelta(days=1)
+    start = end - timedelta(days=args.days)
+    return await check_parity(market, provider, tickers, args.interval, start, end)
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--tickers", type=int, default=10)
+    parser.add_argument("--days", type=int, default=730)
+    parser.add_argument("--density", type=float, default=0.02, help="planted zone sequences per bar")
+    parser.add_argument("--interval", default="1d")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    result = asyncio.run(main(parse_args(sys.argv[1:])))
+    for mismatch in result["mismatches"]:
+        print(f"{mismatch['ticker']} {mismatch['params']}")
+        print(f"  only identify_demand_zones: {mismatch['only_identify_demand_zones']}")
+        print(f"  only detect_zones:          {mismatch['only_detect_zones']}")
+    print(f"Compared {result['zones']} zones over {result['tickers']} tickers x {result['param_sets']} parameter sets: "
+          f"{len(result['mismatches'])} mismatches")
+    sys.exit(1 if result["mismatches"] else 0)
@@ -0,0 +1,248 @@
+"""
+Offline benchmarks for zone detection, the multi-ticker scan and zone persistence.
+
+Candles come from a seeded SyntheticMarket through FakeProvider, so runs need
+no network and are repeatable; persistence runs against an in-memory
+collection, or a local MongoDB with --mongo-uri. Results are written as JSON
+(one file per commit by default) and can be compared with a previous run:
+
+    cd backend
+    python -m benchmarks.run --tickers 50 --repeat 3
+    python -m benchmarks.run --compare benchmarks/results/<baseline>.json
+"""
+import os
+import io
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+import statistics
+import subprocess
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta
+from functools import partial
+from typing import Awaitable, Callable, Dict, List
+from unittest import mock
+
+from benchmarks.synthetic import SyntheticMarket
+from benchmarks.fakes import FakeProvider, InMemoryCollection, LOWER_ZONE_KEY
+from app.models.models import DemandZone, MultiStockRequest
+from app.services.services import identify_demand_zones
+from app.services.zone_service import save_unique_zones
+from app.services.candle_service import clear_candles
+from app.controllers.controllers import find_multi_demand_zones_controller
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+# Lower is better for these; everything else reported is higher-is-better throughput
+LOWER_IS_BETTER = {"seconds_min", "seconds_median", "seconds_mean"}
+
+
+def _git(*args: str) -> str:
+    try:
+        return subprocess.run(["git", *args], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+async def measure(run: Callable[[], Awaitable[Dict]], repeat: int) -> Dict:
+    """Run `run` `repeat` times; timings are aggregated, counters come from the last run."""
+    seconds: List[float] = []
+    counters: Dict = {}
+    for _ in range(repeat):
+        started = time.perf_counter()
+        counters = await run()
+        seconds.append(time.perf_counter() - started)
+    result = {
+        "seconds_min": round(min(seconds), 4),
+        "seconds_median": round(statistics.median(seconds), 4),
+        "seconds_mean": round(statistics.mean(seconds), 4),
+        "runs": repeat,
+        **counters,
+    }
+    for name, count in counters.items():
+        if isinstance(count, (int, float)) and name in ("candles", "zones", "tickers"):
+            result[f"{name}_per_second"] = round(count / min(seconds), 2) if min(seconds) else None
+    return result
+
+
+async def bench_detection(market: SyntheticMarket, provider: FakeProvider, tickers: List[str],
+                          interval: str, start, end, repeat: int) -> Dict:
+    frames = {ticker: market.slice(ticker, start, end, interval) for ticker in tickers}
+
+    async def run() -> Dict:
+        zones = 0
+        with provider.installed(), redirect_stdout(io.StringIO()):
+            for ticker, data in frames.items():
+                zones += len(await identify_demand_zones(data=data, ticker=ticker, time_frame=interval))
+        return {"candles": sum(len(data) for data in frames.values()), "zones": zones}
+
+    return await measure(run, repeat)
+
+
+async def bench_scan(provider: FakeProvider, tickers: List[str], interval: str, lower_interval: str,
+                     start, end, detect_lower: bool, repeat: int) -> Dict:
+    async def run() -> Dict:
+        clear_candles()
+        provider.calls.clear()
+        collection = InMemoryCollection()
+        lower_collection = InMemoryCollection(key=LOWER_ZONE_KEY)
+        save = partial(save_unique_zones, db_collection=collection, lower_collection=lower_collection)
+        with provider.installed(), redirect_stdout(io.StringIO()), \
+                mock.patch("app.controllers.controllers.load_tickers_from_json", return_value=tickers), \
+                mock.patch("app.controllers.controllers.save_unique_zones", save):
+            results = await find_multi_demand_zones_controller(MultiStockRequest(
+                start_date=start, end_date=end, higher_interval=interval,
+                lower_interval=lower_interval, detectLowerZones=detect_lower
+            ))
+        return {
+            "tickers": len(results),
+            "zones": sum(len(zones) for zones in results.values()),
+            "provider_calls": dict(provider.calls),
+        }
+
+    return await measure(run, repeat)
+
+
+async def bench_persistence(market: SyntheticMarket, provider: FakeProvider, tickers: List[str], interval: str,
+                            start, end, mongo_uri: str, repeat: int) -> Dict:
+    zones_by_ticker = {}
+    with provider.installed(), redirect_stdout(io.StringIO()):
+        for ticker in tickers:
+            zones = await identify_demand_zones(data=market.slice(ticker, start, end, interval), ticker=ticker, time_frame=interval)
+            zones_by_ticker[ticker] = [
+                DemandZone(**{**zone, "timeframes": [interval], "timestamp": zone["start_timestamp"]}) for zone in zones
+            ]
+    count = sum(len(zones) for zones in zones_by_ticker.values())
+
+    if mongo_uri:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        client = AsyncIOMotorClient(mongo_uri)
+        collection = client["stock_zones_bench"]["demand_zones"]
+        lower_collection = client["stock_zones_bench"]["lower_zones"]
+        target = "mongodb"
+    else:
+        collection = lower_collection = None
+        target = "memory"
+
+    async def fresh_collections():
+        if mongo_uri:
+            await collection.drop()
+            await lower_collection.drop()
+            return collection, lower_collection
+        return InMemoryCollection(), InMemoryCollection(key=LOWER_ZONE_KEY)
+
+    async def run(upsert_existing: bool) -> Dict:
+        db_collection, db_lower_collection = await fresh_collections()
+        if upsert_existing:
+            await save_unique_zones(zones_by_ticker, db_collection=db_collection, lower_collection=db_lower_collection)
+        started = time.perf_counter()
+        await save_unique_zones(zones_by_ticker, db_collection=db_collection, lower_collection=db_lower_collection)
+        return {"zones": count, "write_seconds": round(time.perf_counter() - started, 4), "target": target}
+
+    # Only the save itself is of interest, so time it inside run and report that
+    results = {}
+    for name, upsert_existing in (("insert", False), ("upsert", True)):
+        writes = [await run(upsert_existing) for _ in range(repeat)]
+        seconds = [w["write_seconds"] for w in writes]
+        results[name] = {
+            "seconds_min": min(seconds),
+            "seconds_median": round(statistics.median(seconds), 4),
+            "seconds_mean": round(statistics.mean(seconds), 4),
+            "runs": repeat,
+            "zones": count,
+            "zones_per_second": round(count / min(seconds), 2) if min(seconds) else None,
+            "target": target,
+        }
+    return results
+
+
+def compare(current: Dict, baseline: Dict) -> List[str]:
+    """Relative change of every shared numeric metric; positive means better."""
+    lines = [f"{'benchmark':<28}{'metric':<22}{'baseline':>14}{'current':>14}{'change':>10}"]
+
+    def walk(prefix: str, cur: Dict, base: Dict):
+        for name, value in cur.items():
+            old = base.get(name) if isinstance(base, dict) else None
+            if isinstance(value, dict):
+                walk(f"{prefix}.{name}" if prefix else name, value, old or {})
+            elif isinstance(value, (int, float)) and isinstance(old, (int, float)) and old and name != "runs":
+                change = (value - old) / old * 100
+                if name in LOWER_IS_BETTER:
+                    change = -change
+                lines.append(f"{prefix:<28}{name:<22}{old:>14}{value:>14}{change:>+9.1f}%")
+
+    walk("", current["benchmarks"], baseline.get("benchmarks", {}))
+    return lines
+
+
+async def main(args: argparse.Namespace) -> Dict:
+    market = SyntheticMarket(seed=args.seed, zone_density=args.density)
+    provider = FakeProvider(market, latency=args.provider_latency / 1000)
+    tickers = [f"SYN{i:04d}" for i in range(args.tickers)]
+    end = market.today + timedelta(days=1)
+    start = end - timedelta(days=args.days)
+
+    benchmarks = {}
+    print(f"Detection: {len(tickers)} tickers x {args.days} days of {args.interval}")
+    benchmarks["detection"] = await bench_detection(market, provider, tickers, args.interval, start, end, args.repeat)
+    print(f"Scan: multi-demand-zones controller, lower zones {'on' if args.lower else 'off'}")
+    benchmarks["scan"] = await bench_scan(
+        provider, tickers, args.interval, args.lower_interval, start, end, args.lower, args.repeat
+    )
+    print(f"Persistence: save_unique_zones against {'MongoDB' if args.mongo_uri else 'in-memory collection'}")
+    benchmarks["persistence"] = await bench_persistence(
+        market, provider, tickers, args.interval, start, end, args.mongo_uri, args.repeat
+    )
+
+    return {
+        "meta": {
+            "commit": _git("rev-parse", "--short", "HEAD"),
+            "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "params": {
+                "seed": args.seed, "tickers": args.tickers, "days": args.days, "density": args.density,
+                "interval": args.interval, "lower_interval": args.lower_interval, "lower": args.lower,
+                "provider_latency_ms": args.provider_latency, "repeat": args.repeat,
+            },
+        },
+        "benchmarks": benchmarks,
+    }
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--tickers", type=int, default=20)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--density", type=float, default=0.02, help="planted zone sequences per bar")
+    parser.add_argument("--interval", default="1d")
+    parser.add_argument("--lower-interval", default="1h")
+    parser.add_argument("--lower", action=argparse.BooleanOptionalAction, default=True, help="detect lower timeframe zones in the scan")
+    parser.add_argument("--provider-latency", type=float, default=0.0, help="simulated provider latency per call, ms")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--mongo-uri", default="", help="benchmark persistence against this MongoDB instead of memory")
+    parser.add_argument("--out", help="results file (default: benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", help="previous results file to compare against")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args(sys.argv[1:])
+    results = asyncio.run(main(args))
+
+    out = args.out or os.path.join(RESULTS_DIR, f"{results['meta']['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(results, f, indent=2)
+    print(json.dumps(results["benchmarks"], indent=2))
+    print(f"Results written to {out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            print("\n".join(compare(results, json.load(f))))
@@ -0,0 +1,139 @@
+import zlib
+import numpy as np
+import pandas as pd
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Optional, Tuple
+
+TZ = "Asia/Kolkata"
+
+# How much history the fake provider keeps per interval, like the provider's own limits
+HISTORY_DAYS = {
+    "1m": 7, "2m": 30, "5m": 30, "15m": 60, "30m": 60, "60m": 365, "90m": 60, "1h": 365,
+    "1d": 5 * 365, "5d": 10 * 365, "1wk": 10 * 365, "1mo": 20 * 365, "3mo": 20 * 365,
+}
+INTRADAY_MINUTES = {"1m": 1, "2m": 2, "5m": 5, "15m": 15, "30m": 30, "60m": 60, "90m": 90, "1h": 60}
+SESSION_OPEN = time(9, 15)
+SESSION_MINUTES = 375
+
+
+def bar_index(start: date, end: date, interval: str) -> pd.DatetimeIndex:
+    """NSE-like bar timestamps in [start, end): weekday sessions for intraday, weekday or period starts otherwise."""
+    days = pd.bdate_range(start, end - timedelta(days=1), tz=TZ)
+    if interval in INTRADAY_MINUTES:
+        step = INTRADAY_MINUTES[interval]
+        offsets = pd.to_timedelta(np.arange(0, SESSION_MINUTES, step), unit="m")
+        session = pd.Timedelta(hours=SESSION_OPEN.hour, minutes=SESSION_OPEN.minute)
+        return pd.DatetimeIndex([day + session + offset for day in days for offset in offsets])
+    if interval == "1wk":
+        return days[days.weekday == 0]
+    if interval in ("1mo", "3mo"):
+        firsts = days.to_series().groupby([days.year, days.month]).min()
+        index = pd.DatetimeIndex(firsts.values)
+        return index if interval == "1mo" else index[index.month % 3 == 1]
+    if interval == "5d":
+        return days[::5]
+    return days
+
+
+def generate_ohlc(
+    index: pd.DatetimeIndex,
+    seed: int = 42,
+    zone_density: float = 0.02,
+    start_price: float = 500.0,
+    volatility: float = 0.012,
+    move_range: Tuple[float, float] = (0.08, 0.12),
+    max_base_candles: int = 4
+) -> pd.DataFrame:
+    """
+    Seeded OHLCV series shaped like the provider's frames.
+
+    A random walk with wicks is interrupted, with probability `zone_density`
+    per bar, by a leg-in / base / leg-out sequence: a wide-bodied candle moving
+    `move_range` of price (down for DBR, up for RBR), 1..`max_base_candles`
+    narrow-bodied candles, and a wide green candle closing above the base and
+    the leg-in high. With the default StockRequest thresholds most planted
+    sequences are detected as zones, so density controls the zone count.
+    """
+    rng = np.random.default_rng(seed)
+    n = len(index)
+    o = np.empty(n)
+    h = np.empty(n)
+    l = np.empty(n)
+    c = np.empty(n)
+    price = start_price
+
+    def candle(i: int, open_: float, close: float, wick: float) -> None:
+        o[i], c[i] = open_, close
+        h[i] = max(open_, close) * (1 + wick * rng.random())
+        l[i] = min(open_, close) * (1 - wick * rng.random())
+
+    i = 0
+    while i < n:
+        remaining = n - i
+        if remaining >= 3 + max_base_candles and rng.random() < zone_density:
+            move = rng.uniform(*move_range)
+            drop = rng.random() < 0.5
+            legin_close = price * (1 - move) if drop else price * (1 + move)
+            candle(i, price, legin_close, 0.004)
+            legin_high = h[i]
+            price = legin_close
+            i += 1
+            base_start = i
+            for _ in range(rng.integers(1, max_base_candles + 1)):
+                close = price * (1 + rng.normal(0, volatility / 4))
+                candle(i, price, close, 0.01)
+                # keep the body under a third of the range
+                spread = abs(close - price) * 3 + price * 0.002
+                h[i] = max(h[i], max(price, close) + spread / 2)
+                l[i] = min(l[i], min(price, close) - spread / 2)
+                price = close
+                i += 1
+            base_high = h[base_start:i].max()
+            target = max(legin_high, base_high, price * (1 + rng.uniform(*move_range))) * (1 + rng.uniform(0.005, 0.02))
+            candle(i, price, target, 0.003)
+            price = target
+            i += 1
+            continue
+
+        close = price * (1 + rng.normal(0, volatility))
+        candle(i, price, close, volatility)
+        price = close
+        i += 1
+
+    volume = rng.integers(10_000, 1_000_000, n).astype(float)
+    return pd.DataFrame({"Open": o, "High": h, "Low": l, "Close": c, "Volume": volume}, index=index)
+
+
+class SyntheticMarket:
+    """
+    Deterministic candles per (ticker, interval): each series spans the
+    interval's history window up to tomorrow and is seeded from the ticker,
+    interval and market seed, so overlapping requests see the same bars.
+    """
+
+    def __init__(self, seed: int = 42, zone_density: float = 0.02, today: Optional[date] = None):
+        self.seed = seed
+        self.zone_density = zone_density
+        self.today = today or datetime.now().date()
+        self._series: Dict[Tuple[str, str], pd.DataFrame] = {}
+
+    def series(self, ticker: str, interval: str) -> pd.DataFrame:
+        ticker = ticker.upper()
+        if ticker.endswith(".NS"):
+            ticker = ticker[:-3]
+        key = (ticker, interval)
+        data = self._series.get(key)
+        if data is None:
+            end = self.today + timedelta(days=1)
+            start = end - timedelta(days=HISTORY_DAYS.get(interval, 365))
+            seed = zlib.crc32(f"{ticker}|{interval}|{self.seed}".encode())
+            start_price = 50 + zlib.crc32(ticker.encode()) % 2000
+            data = self._series[key] = generate_ohlc(
+                bar_index(start, end, interval), seed=seed, zone_density=self.zone_density, start_price=start_price
+            )
+        return data
+
+    def slice(self, ticker: str, start_date: date, end_date: date, interval: str) -> pd.DataFrame:
+        data = self.series(ticker, interval)
+        dates = data.index.date
+        return data[(dates >= start_date) & (dates < end_date)]
@@ -1,6 +1,6 @@
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response
 from pathlib import Path
 from app.routes import router
 import logging
@@ -11,6 +11,22 @@ from app.routers.trades import router as trade_router
 from fastapi.middleware.cors import CORSMiddleware
 from app.routers import symbols
 from app.routers import kotak
+from app.routers import backtest
+from app.routers import admin
+from app.routers import scheduler as scheduler_router
+from app.services.zone_index import zone_index
+from app.services.lower_zone_service import migrate_embedded_lower_zones
+from app.services.zone_merge_service import migrate_merge_links
+from app.services.ranking_service import zone_ranking
+from app.services.tick_service import tick_service, build_feed
+from app.services.alert_service import alert_dispatcher, zone_alert_engine
+from app.services.scheduler import scheduler, SCHEDULER_ENABLED
+from app.controllers.scheduled_jobs import register_jobs
+from app.services.trade_alert_service import trade_alert_evaluator, TRADE_ALERTS_ENABLED
+from app.utils.profiling import ProfilingMiddleware
+from app.utils.loop_watchdog import loop_watchdog, LoopWatchdogMiddleware, LOOP_WATCHDOG_ENABLED
+from app.utils.metrics import MetricsMiddleware, render as render_metrics, CONTENT_TYPE as METRICS_CONTENT_TYPE
+import asyncio
 
 # Configure logging at the start of the module or main app
 logging.basicConfig(
@@ -32,6 +48,9 @@ app.include_router(zones_router)
 app.include_router(trade_router)
 app.include_router(symbols.router)
 app.include_router(kotak.router)
+app.include_router(backtest.router)
+app.include_router(admin.router)
+app.include_router(scheduler_router.router)
 
 app.add_middleware(
     CORSMiddleware,
@@ -40,6 +59,9 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(LoopWatchdogMiddleware)
+app.add_middleware(ProfilingMiddleware)
+app.add_middleware(MetricsMiddleware)
 
 
 # Mount static files directory
@@ -51,7 +73,40 @@ async def root():
     index_path = Path("static/index.html")
     return FileResponse(index_path)
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return Response(content=render_metrics(), media_type=METRICS_CONTENT_TYPE)
+
 @app.on_event("startup")
 async def startup_event():
+    if LOOP_WATCHDOG_ENABLED:
+        loop_watchdog.start()
     await init_db()
-    print("MongoDB initialized with unique index on zone_id")
\ No newline at end of file
+    print("MongoDB initialized with unique index on zone_id")
+    await migrate_embedded_lower_zones()
+    await migrate_merge_links()
+    await zone_index.load()
+    await zone_ranking.load_prices()
+    alert_dispatcher.attach(asyncio.get_running_loop())
+    tick_service.add_listener(zone_alert_engine.on_price)
+    tick_service.add_listener(trade_alert_evaluator.on_price)
+    tick_service.add_listener(zone_ranking.on_price)
+    if TRADE_ALERTS_ENABLED:
+        app.state.trade_alert_task = asyncio.create_task(trade_alert_evaluator.run())
+    feed = build_feed()
+    if feed:
+        try:
+            await tick_service.start(feed)
+        except Exception as e:
+            logger.error(f"Tick ingestion not started: {str(e)}")
+    register_jobs(scheduler)
+    if SCHEDULER_ENABLED:
+        await scheduler.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    if getattr(app.state, "trade_alert_task", None):
+        app.state.trade_alert_task.cancel()
+    await scheduler.stop()
+    await tick_service.stop()
+    await loop_watchdog.stop()
\ No newline at end of file